@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from config import get_user_collection, get_settings_collection
+from database import get_user_collection, get_settings_collection
 from utils.security import (
     verify_password, 
     create_access_token, 
@@ -22,7 +22,7 @@ class PasswordReset(BaseModel):
 async def register(user: UserCreate):
     users_collection = get_user_collection()
     
-    if users_collection.find_one({"email": user.email}):
+    if await users_collection.find_one({"email": user.email}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -37,14 +37,15 @@ async def register(user: UserCreate):
     # Remove plain password before storing
     del user_dict["password"]
     
-    result = users_collection.insert_one(user_dict)
+    result = await users_collection.insert_one(user_dict)
     settings_collection = get_settings_collection()
-    settings_collection.insert_one(
+    await settings_collection.insert_one(
         {"user_id": str(result.inserted_id),
         "created_at": datetime.now(),
         "number_of_questions_to_generate": 10,
         "phase1_ranking_number": 20,
         "phase2_ranking_number": 10,
+        "cross_encoder_shortlist_number": 0,
         "updated_at": datetime.now()}
         )
     
@@ -65,7 +66,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         print("USER Collection Found")
     
     print("USER Login")
-    user = users_collection.find_one({"email": form_data.username})
+    user = await users_collection.find_one({"email": form_data.username})
 
     
     if not user or not verify_password(form_data.password, user["hashed_password"]):
@@ -91,7 +92,7 @@ async def reset_password(reset_data: PasswordReset):
     users_collection = get_user_collection()
     
     # Fetch user by email
-    user = users_collection.find_one({"email": reset_data.email})
+    user = await users_collection.find_one({"email": reset_data.email})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -128,7 +129,7 @@ async def reset_password(reset_data: PasswordReset):
     
     # Update password
     new_hashed_password = get_password_hash(reset_data.new_password)
-    result = users_collection.update_one(
+    result = await users_collection.update_one(
         {"_id": user["_id"]},
         {"$set": {
             "hashed_password": new_hashed_password,
@@ -1,26 +1,141 @@
 import os
+import threading
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from datetime import datetime
 from pathlib import Path
 import json
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-config_path = BASE_DIR / 'config.json'
+# KANDIDEX_CONFIG points at another config file (e.g. the test suite's)
+config_path = Path(os.environ.get("KANDIDEX_CONFIG", BASE_DIR / 'config.json'))
 
 with open(config_path) as config_file:
     config = json.load(config_file)
 
 MONGODB_URL = config["MONGODB_URI"]
 DB_NAME = config.get("MONGODB_DB_NAME", "KandidexDB")
+MONGODB_MAX_POOL_SIZE = int(config.get("MONGODB_MAX_POOL_SIZE", 100))
+MONGODB_MIN_POOL_SIZE = int(config.get("MONGODB_MIN_POOL_SIZE", 0))
+MONGODB_CONNECT_TIMEOUT_MS = int(config.get("MONGODB_CONNECT_TIMEOUT_MS", 5000))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(config.get("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGODB_SOCKET_TIMEOUT_MS = int(config.get("MONGODB_SOCKET_TIMEOUT_MS", 30000))
+MONGODB_WRITE_CONCERN = config.get("MONGODB_WRITE_CONCERN")  # e.g. "majority" or 1; None keeps the driver default
+MONGODB_READ_CONCERN = config.get("MONGODB_READ_CONCERN")  # e.g. "majority"; None keeps the driver default
 JWT_SECRET = config["JWT_SECRET_KEY"]
 JWT_ALGORITHM = config["JWT_ALGORITHM"]
 ACCESS_TOKEN_EXPIRE = int(config.get("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 OPENAI_API_KEY = config["OPENAI_API_KEY"]
+OPENAI_BASE_URL = config.get("OPENAI_BASE_URL")  # e.g. a local fake server for testing
+
+# OpenAI rate limiting
+OPENAI_REQUESTS_PER_MINUTE = int(config.get("OPENAI_REQUESTS_PER_MINUTE", 500))
+OPENAI_TOKENS_PER_MINUTE = int(config.get("OPENAI_TOKENS_PER_MINUTE", 200000))
+OPENAI_MAX_CONCURRENCY = int(config.get("OPENAI_MAX_CONCURRENCY", 16))
+OPENAI_MAX_RETRIES = int(config.get("OPENAI_MAX_RETRIES", 5))
+
+# Model settings
+BI_ENCODER_MODEL = config.get("BI_ENCODER_MODEL", "all-MiniLM-L6-v2")
+BI_ENCODER_MAX_SEQ_LENGTH = int(config.get("BI_ENCODER_MAX_SEQ_LENGTH", 512))
+# Bump when the bi-encoder weights change so cached embeddings are not reused
+EMBEDDING_MODEL_VERSION = str(config.get("EMBEDDING_MODEL_VERSION", "1"))
+EMBED_BATCH_SIZE = int(config.get("EMBED_BATCH_SIZE", 32))
+# Bi-encoder inference backend: "torch" or "onnx" (CPU, see scripts/export_onnx_encoder.py)
+ENCODER_BACKEND = config.get("ENCODER_BACKEND", "torch")
+ONNX_MODEL_DIR = config.get("ONNX_MODEL_DIR", str(BASE_DIR / "data" / "onnx" / BI_ENCODER_MODEL.replace("/", "_")))
+ONNX_QUANTIZED = bool(config.get("ONNX_QUANTIZED", True))  # dynamic int8 weights
+# Per worker; 0 uses every core, so set it to cores / workers under gunicorn
+ONNX_INTRA_OP_THREADS = int(config.get("ONNX_INTRA_OP_THREADS", 0))
+# Optional cross-encoder re-ranking of a wider bi-encoder shortlist, e.g.
+# "cross-encoder/ms-marco-MiniLM-L-6-v2"; "" (the default) does not load one
+CROSS_ENCODER_MODEL = config.get("CROSS_ENCODER_MODEL", "")
+CROSS_ENCODER_MAX_LENGTH = int(config.get("CROSS_ENCODER_MAX_LENGTH", 512))
+CROSS_ENCODER_BATCH_SIZE = int(config.get("CROSS_ENCODER_BATCH_SIZE", 16))
+# Resume embeddings are stored packed as "float32" or "float16"
+EMBEDDING_STORAGE_DTYPE = config.get("EMBEDDING_STORAGE_DTYPE", "float32")
+
+# Resume text sent to the LLM is condensed to this many tokens (stored per resume)
+RESUME_TOKEN_BUDGET = int(config.get("RESUME_TOKEN_BUDGET", 1500))
+LLM_TOKENIZER_ENCODING = config.get("LLM_TOKENIZER_ENCODING", "o200k_base")  # gpt-4o family
+
+# PDF extraction settings
+PDF_WORKERS = int(config.get("PDF_WORKERS", os.cpu_count() or 1))
+PDF_EXTRACTION_TIMEOUT = float(config.get("PDF_EXTRACTION_TIMEOUT_SECONDS", 30))
+PDF_MAX_PAGES = int(config.get("PDF_MAX_PAGES", 50))
+PDF_MAX_IN_FLIGHT = int(config.get("PDF_MAX_IN_FLIGHT", PDF_WORKERS * 2))
+SPOOL_DIR = config.get("SPOOL_DIR")  # None uses the system temp directory
+
+# Vector index backing /find_alternatives (shared by the workers on a host)
+VECTOR_INDEX_DIR = config.get("VECTOR_INDEX_DIR", str(BASE_DIR / "data" / "vector_index"))
+VECTOR_INDEX_NPROBE = int(config.get("VECTOR_INDEX_NPROBE", 16))
+# Users with at most this many indexed resumes are searched exactly
+VECTOR_INDEX_EXACT_ROWS = int(config.get("VECTOR_INDEX_EXACT_ROWS", 20000))
+
+# Talent clusters (mini-batch k-means over resume embeddings)
+CLUSTER_COUNT = int(config.get("CLUSTER_COUNT", 32))
+CLUSTER_SAMPLE_SIZE = int(config.get("CLUSTER_SAMPLE_SIZE", 50000))
+CLUSTER_REFIT_HOURS = float(config.get("CLUSTER_REFIT_HOURS", 24))  # 0 disables background refits
+CLUSTER_RELOAD_SECONDS = float(config.get("CLUSTER_RELOAD_SECONDS", 300))
+
+# Background ranking jobs (per worker)
+RANK_JOB_CONCURRENCY = int(config.get("RANK_JOB_CONCURRENCY", 2))
+RANK_PROGRESS_FLUSH_SECONDS = float(config.get("RANK_PROGRESS_FLUSH_SECONDS", 1))
+
+# Activity log writer
+ACTIVITY_LOG_BATCH_SIZE = int(config.get("ACTIVITY_LOG_BATCH_SIZE", 100))
+ACTIVITY_LOG_FLUSH_SECONDS = float(config.get("ACTIVITY_LOG_FLUSH_SECONDS", 2))
+ACTIVITY_LOG_MAX_QUEUE = int(config.get("ACTIVITY_LOG_MAX_QUEUE", 10000))
+ACTIVITY_LOG_FLUSH_RETRIES = int(config.get("ACTIVITY_LOG_FLUSH_RETRIES", 3))
+
+# LLM result cache
+LLM_CACHE_TTL_DAYS = int(config.get("LLM_CACHE_TTL_DAYS", 30))
+
+# One pooled synchronous client per process, created lazily. Request handlers
+# use the async client in database.py; this one serves code that already runs
+# off the event loop (worker threads, startup tasks, scripts). Forked children
+# (gunicorn workers) drop the inherited reference and build their own.
+_client = None
+_client_lock = threading.Lock()
+
+def mongo_client_options() -> dict:
+    """Pool, timeout and concern settings shared by the sync and async clients."""
+    options = {
+        "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": MONGODB_MIN_POOL_SIZE,
+        "connectTimeoutMS": MONGODB_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGODB_SOCKET_TIMEOUT_MS
+    }
+    if MONGODB_WRITE_CONCERN is not None:
+        options["w"] = MONGODB_WRITE_CONCERN
+    if MONGODB_READ_CONCERN is not None:
+        options["readConcernLevel"] = MONGODB_READ_CONCERN
+    return options
+
+def get_client() -> MongoClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(MONGODB_URL, connect=False, **mongo_client_options())
+    return _client
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+def _reset_client_after_fork():
+    # The parent's sockets and monitor threads are not usable in the child
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_client_after_fork)
 
 def get_db():
-    client = MongoClient(MONGODB_URL)
-    return client[DB_NAME]
+    return get_client()[DB_NAME]
 
 # Collection helpers
 def get_user_collection():
@@ -43,13 +158,9 @@ def get_activity_logs_collection():
 
 def get_settings_collection():
     return get_db().settings
-# Activity logging
-def log_activity(user_id: str, activity_type: str, details: str, ref_id: str = None):
-    activity = {
-        "user_id": user_id,
-        "type": activity_type,
-        "ref_id": ref_id,
-        "timestamp": datetime.now(),
-        "details": details
-    }
-    get_activity_logs_collection().insert_one(activity)
\ No newline at end of file
+
+def get_llm_cache_collection():
+    return get_db().llm_cache
+
+def get_clusters_collection():
+    return get_db().clusters
@@ -0,0 +1,59 @@
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import MONGODB_URL, DB_NAME, mongo_client_options
+
+# Async data-access layer used by the routers. Every call is awaited so Mongo
+# I/O overlaps with LLM calls and other requests instead of blocking the loop.
+_client = None
+
+def get_client() -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(MONGODB_URL, **mongo_client_options())
+    return _client
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+def _reset_client_after_fork():
+    global _client
+    _client = None
+
+os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+def get_db():
+    return get_client()[DB_NAME]
+
+# Collection helpers
+def get_user_collection():
+    return get_db().users
+
+def get_job_details_collection():
+    return get_db().job_details
+
+def get_resumes_collection():
+    return get_db().resumes
+
+def get_batches_collection():
+    return get_db().batch
+
+def get_screening_runs_collection():
+    return get_db().screening_runs
+
+def get_activity_logs_collection():
+    return get_db().activity_logs
+
+def get_settings_collection():
+    return get_db().settings
+
+def get_llm_cache_collection():
+    return get_db().llm_cache
+
+def get_clusters_collection():
+    return get_db().clusters
+
+def get_screening_run_rankings_collection():
+    return get_db().screening_run_rankings
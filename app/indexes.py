@@ -0,0 +1,201 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+from config import get_db
+from ml.embedding_codec import HAS_EMBEDDING, EMBEDDING_MODEL_KEY
+
+# Declarative index registry. Every index the app relies on is listed here
+# with the query it serves; ensure_indexes() reconciles the database with it
+# at startup (create missing ones, rebuild ones whose options changed) and
+# never drops indexes it does not manage. HOT_QUERIES are the same query
+# shapes, checked with explain() by scripts/check_indexes.py.
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        # MongoDB's default name, so indexes created before the registry are adopted
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+INDEXES = [
+    # Login, registration and password reset look users up by email
+    IndexSpec("users", [("email", 1)], unique=True),
+    # One settings document per user, read at the start of every ranking run
+    IndexSpec("settings", [("user_id", 1)], unique=True),
+    # Screening history: filter by user and date range, newest first, keyset on _id
+    IndexSpec("screening_runs", [("user_id", 1), ("created_at", -1), ("_id", -1)]),
+    # Duplicate check of appended files against the run's batches
+    IndexSpec("resumes", [("batch_id", 1), ("content_hash", 1)]),
+    # Resume cache lookup of uploaded PDFs by content hash
+    IndexSpec("resumes", [("content_hash", 1)]),
+    # Cluster-only alternate search
+    IndexSpec("resumes", [("user_id", 1), ("cluster_id", 1)]),
+    # Stored run windows: analyses are updated per resume, and the phase-1
+    # slice is read by similarity or, for re-ranked runs, by cross-encoder score
+    IndexSpec("screening_run_rankings", [("run_id", 1), ("resume_id", 1)], unique=True),
+    IndexSpec("screening_run_rankings", [("run_id", 1), ("similarity", -1), ("seq", 1)]),
+    IndexSpec("screening_run_rankings", [("run_id", 1), ("rerank_score", -1), ("similarity", -1), ("seq", 1)]),
+    # Expired LLM results are evicted by the TTL monitor
+    IndexSpec("llm_cache", [("expires_at", 1)], expire_after_seconds=0)
+]
+
+# A rebuilt index is built next to the old one under this alternate name
+# (and back under the plain name on the next rebuild); existing indexes are
+# matched by key pattern, so either name is adopted
+REBUILD_SUFFIX = "_rebuild"
+INDEX_NOT_FOUND = 27
+INDEX_CONFLICT_CODES = {85, 86}  # IndexOptionsConflict, IndexKeySpecsConflict
+
+def _keys(info: dict) -> List[Tuple[str, int]]:
+    return [(field, int(direction)) for field, direction in info["key"]]
+
+def _matches(spec: IndexSpec, info: dict) -> bool:
+    return (
+        _keys(info) == spec.keys
+        and bool(info.get("unique", False)) == spec.unique
+        and info.get("expireAfterSeconds") == spec.expire_after_seconds
+    )
+
+def _existing(spec: IndexSpec, indexes: Dict[str, dict]) -> Optional[Tuple[str, dict]]:
+    """(name, info) of the index on the spec's keys, preferring one that already matches."""
+    candidates = [(name, info) for name, info in indexes.items() if _keys(info) == spec.keys]
+    candidates.sort(key=lambda item: not _matches(spec, item[1]))
+    return candidates[0] if candidates else None
+
+def _options(spec: IndexSpec, name: str) -> dict:
+    options = {"name": name}
+    if spec.unique:
+        options["unique"] = True
+    if spec.expire_after_seconds is not None:
+        options["expireAfterSeconds"] = spec.expire_after_seconds
+    return options
+
+def _modify_in_place(db, spec: IndexSpec, name: str, info: dict) -> bool:
+    """
+    collMod the options a server cannot build a second index for (TTL, or
+    unique on MongoDB 6+, which fails while duplicates exist). Returns False
+    when the change cannot be made in place.
+    """
+    if bool(info.get("unique", False)) and not spec.unique:
+        return False
+    if "expireAfterSeconds" in info and spec.expire_after_seconds is None:
+        return False
+    change = {"name": name}
+    if info.get("expireAfterSeconds") != spec.expire_after_seconds:
+        change["expireAfterSeconds"] = spec.expire_after_seconds
+    if spec.unique and not info.get("unique", False):
+        db.command("collMod", spec.collection, index={"name": name, "prepareUnique": True})
+        change["unique"] = True
+    db.command("collMod", spec.collection, index=change)
+    return True
+
+def _rebuild(db, spec: IndexSpec, name: str, info: dict) -> bool:
+    """
+    Replace the index `name` whose options differ from the spec. The old
+    index is only dropped once its replacement is built; returns False when
+    the index was left as it is.
+    """
+    collection = db[spec.collection]
+    replacement = spec.name if name != spec.name else f"{spec.name}{REBUILD_SUFFIX}"
+    try:
+        collection.create_index(spec.keys, **_options(spec, replacement))
+    except OperationFailure as e:
+        if e.code not in INDEX_CONFLICT_CODES:
+            raise
+        # The server keeps one index per key pattern: change the options in place
+        return _modify_in_place(db, spec, name, info)
+    try:
+        collection.drop_index(name)
+    except OperationFailure as e:
+        # Another worker finished the same rebuild first
+        if e.code != INDEX_NOT_FOUND:
+            raise
+    return True
+
+def ensure_indexes() -> Dict[str, int]:
+    """
+    Create or rebuild the registry's indexes; returns counts of created,
+    rebuilt, unchanged and failed indexes. Failures (e.g. Mongo unreachable,
+    or duplicate emails blocking a unique index) are logged, leave existing
+    indexes in place and do not stop startup.
+    """
+    db = get_db()
+    counts = {"created": 0, "rebuilt": 0, "unchanged": 0, "failed": 0}
+    existing = {}
+    for spec in INDEXES:
+        try:
+            if spec.collection not in existing:
+                existing[spec.collection] = db[spec.collection].index_information()
+            found = _existing(spec, existing[spec.collection])
+            if found is None:
+                db[spec.collection].create_index(spec.keys, **_options(spec, spec.name))
+                counts["created"] += 1
+            elif _matches(spec, found[1]):
+                counts["unchanged"] += 1
+            elif _rebuild(db, spec, *found):
+                counts["rebuilt"] += 1
+            else:
+                print(f"Index {spec.collection}.{found[0]} conflicts with the registry and cannot be changed "
+                      f"in place; left unchanged")
+                counts["failed"] += 1
+        except PyMongoError as e:
+            print(f"Index {spec.collection}.{spec.name} could not be built: {type(e).__name__}: {str(e)}")
+            counts["failed"] += 1
+    print(f"Indexes: {counts}")
+    return counts
+
+# --- Explain check ---
+# Query shapes as the app issues them, with placeholder values
+_USER_ID = "000000000000000000000000"
+_RUN_FILTER = {"user_id": _USER_ID, "status": {"$in": [None, "completed"]}}
+
+HOT_QUERIES = [
+    ("users by email", "users", {"email": "explain@example.com"}, None),
+    ("settings by user", "settings", {"user_id": _USER_ID}, None),
+    ("screening history page", "screening_runs",
+     dict(_RUN_FILTER, created_at={"$gte": datetime(2020, 1, 1)}), [("created_at", -1), ("_id", -1)]),
+    ("screening history after cursor", "screening_runs",
+     {"$and": [_RUN_FILTER, {"$or": [{"created_at": {"$lt": datetime(2020, 1, 1)}},
+                                     {"created_at": datetime(2020, 1, 1), "_id": {"$lt": ObjectId()}}]}]},
+     [("created_at", -1), ("_id", -1)]),
+    ("resumes of a run's batches by content hash", "resumes",
+     {"batch_id": {"$in": [_USER_ID]}, "content_hash": {"$in": ["0" * 64]}}, None),
+    ("resume cache lookup", "resumes",
+     {"content_hash": {"$in": ["0" * 64]}, "embedding_model": EMBEDDING_MODEL_KEY, **HAS_EMBEDDING}, None),
+    ("resumes of a talent cluster", "resumes", {"user_id": _USER_ID, "cluster_id": 0}, None),
+    ("run window by similarity", "screening_run_rankings", {"run_id": _USER_ID},
+     [("similarity", -1), ("seq", 1)]),
+    ("run window by cross-encoder score", "screening_run_rankings",
+     {"run_id": _USER_ID, "rerank_score": {"$ne": None}}, [("rerank_score", -1), ("similarity", -1), ("seq", 1)])
+]
+
+SCAN_STAGES = {"COLLSCAN"}
+INDEX_STAGES = {"IXSCAN", "IDHACK", "EXPRESS_IXSCAN", "COUNT_SCAN", "DISTINCT_SCAN"}
+
+def _stages(plan: dict) -> Iterator[str]:
+    """Stage names of a (classic or SBE) query plan tree."""
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+def explain_hot_queries() -> List[Tuple[str, bool, List[str]]]:
+    """(query, uses an index without a collection scan, winning plan stages) per hot query."""
+    db = get_db()
+    results = []
+    for label, collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query).limit(10)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = list(_stages(cursor.explain()["queryPlanner"]["winningPlan"]))
+        indexed = bool(INDEX_STAGES & set(stages)) and not SCAN_STAGES & set(stages)
+        results.append((label, indexed, stages))
+    return results
@@ -1,7 +1,14 @@
+import asyncio
 from fastapi import FastAPI
-from routers import alternates, questions, ranking, screening_runs, settings
+from routers import alternates, questions, ranking, screening_runs, settings, health
 from auth import auth as auth_router
 from fastapi.middleware.cors import CORSMiddleware
+from ml import model_registry
+from utils import pdf_pool
+from services import activity_log, ranking_service, clustering
+from config import close_client
+import database
+import indexes
 
 origins = [
     "http://localhost:5173",
@@ -24,3 +31,26 @@ app.include_router(ranking.router)
 app.include_router(auth_router.router)
 app.include_router(screening_runs.router)
 app.include_router(settings.router)
+app.include_router(health.router)
+
+@app.on_event("startup")
+async def startup():
+    # Load models in the background so /health/live answers immediately;
+    # /health/ready turns green once they are resident.
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, model_registry.load_models)
+    pdf_pool.get_extraction_pool()
+    await loop.run_in_executor(None, indexes.ensure_indexes)
+    activity_log.get_writer().start()
+    clustering.start_refit_task()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Mark interrupted ranking jobs failed and drain queued activity events
+    # before the Mongo clients are closed
+    await ranking_service.shutdown_jobs()
+    await clustering.stop_refit_task()
+    await activity_log.get_writer().stop()
+    pdf_pool.shutdown_extraction_pool()
+    close_client()
+    database.close_client()
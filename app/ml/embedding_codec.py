@@ -0,0 +1,43 @@
+import numpy as np
+from typing import Dict, List
+from bson import Binary
+from config import EMBEDDING_STORAGE_DTYPE, BI_ENCODER_MODEL, EMBEDDING_MODEL_VERSION
+
+# Resume embeddings are stored as packed little-endian floats in a BSON
+# Binary next to their dtype and dimension, instead of an array of boxed
+# doubles. Documents written before the switch still hold a plain list and
+# decode through the slow path until scripts/migrate_embeddings.py runs.
+
+# Stored embeddings are only reusable if they came from the same model build
+EMBEDDING_MODEL_KEY = f"{BI_ENCODER_MODEL}@{EMBEDDING_MODEL_VERSION}"
+
+STORAGE_DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+
+def encode_embedding(embedding, dtype: str = EMBEDDING_STORAGE_DTYPE) -> Dict:
+    """Resume document fields holding one packed embedding."""
+    vector = np.asarray(embedding, dtype=STORAGE_DTYPES[dtype]).ravel()
+    return {
+        "embedding": Binary(vector.tobytes()),
+        "embedding_dtype": dtype,
+        "embedding_dim": int(vector.shape[0])
+    }
+
+def decode_embedding(doc: Dict) -> np.ndarray:
+    """
+    float32 vector from a resume document. Packed float32 is a zero-copy,
+    read-only view of the BSON bytes; float16 and legacy lists are converted.
+    """
+    embedding = doc["embedding"]
+    if isinstance(embedding, (bytes, Binary)):
+        vector = np.frombuffer(embedding, dtype=STORAGE_DTYPES[doc.get("embedding_dtype", "float32")])
+        return vector if vector.dtype == np.float32 else vector.astype(np.float32)
+    return np.asarray(embedding, dtype=np.float32)
+
+def decode_matrix(docs: List[Dict]) -> np.ndarray:
+    """(n, dim) float32 matrix of the embeddings of `docs`."""
+    if not docs:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack([decode_embedding(doc) for doc in docs])
+
+# Matches documents with a usable embedding in either representation
+HAS_EMBEDDING = {"$or": [{"embedding_dim": {"$gt": 0}}, {"embedding.0": {"$exists": True}}]}
@@ -0,0 +1,75 @@
+import torch
+from typing import List, Tuple
+from sentence_transformers import SentenceTransformer, CrossEncoder, util
+from config import EMBED_BATCH_SIZE, CROSS_ENCODER_BATCH_SIZE
+
+def token_lengths(bi_encoder: SentenceTransformer, texts: List[str]) -> List[int]:
+    """Token count of each text, capped at the encoder's max sequence length."""
+    encoded = bi_encoder.tokenizer(
+        texts,
+        add_special_tokens=True,
+        truncation=True,
+        max_length=bi_encoder.max_seq_length
+    )
+    return [len(ids) for ids in encoded["input_ids"]]
+
+def encode_texts(bi_encoder: SentenceTransformer, texts: List[str], device: str,
+                 batch_size: int = EMBED_BATCH_SIZE) -> torch.Tensor:
+    """
+    Encode texts in length-bucketed batches.
+    Texts are sorted by token length so each batch pads to a similar length,
+    and the returned embedding matrix is in the original input order.
+    """
+    if not texts:
+        return torch.empty((0, bi_encoder.get_sentence_embedding_dimension()), device=device)
+
+    lengths = token_lengths(bi_encoder, texts)
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+    buckets = []
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        buckets.append(bi_encoder.encode(
+            [texts[i] for i in bucket],
+            batch_size=batch_size,
+            convert_to_tensor=True,
+            device=device
+        ))
+
+    sorted_embs = torch.cat(buckets)
+    embeddings = torch.empty_like(sorted_embs)
+    embeddings[torch.tensor(order, device=sorted_embs.device)] = sorted_embs
+    return embeddings
+
+def top_k_by_similarity(query_emb: torch.Tensor, embeddings: torch.Tensor,
+                        k: int) -> Tuple[List[float], List[int]]:
+    """
+    Cosine similarity of every embedding against the query in one matrix op.
+    Returns (all similarities in input order, indices of the top-k best first).
+    """
+    if embeddings.shape[0] == 0:
+        return [], []
+    similarities = util.cos_sim(query_emb, embeddings)[0]
+    top = torch.topk(similarities, k=min(k, similarities.shape[0]))
+    return similarities.cpu().tolist(), top.indices.cpu().tolist()
+
+def cross_encoder_scores(cross_encoder: CrossEncoder, query: str, texts: List[str],
+                         batch_size: int = CROSS_ENCODER_BATCH_SIZE) -> List[float]:
+    """
+    Relevance of each text to the query, scored as (query, text) pairs in
+    batches. Pairs are sorted by length so batches pad to similar lengths;
+    scores are returned in input order.
+    """
+    if not texts:
+        return []
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    sorted_scores = cross_encoder.predict(
+        [(query, texts[i]) for i in order],
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    )
+    scores = [0.0] * len(texts)
+    for position, i in enumerate(order):
+        scores[i] = float(sorted_scores[position])
+    return scores
@@ -0,0 +1,106 @@
+import numpy as np
+from typing import Optional
+
+# Vectorized mini-batch k-means (Sculley, "Web-scale k-means clustering").
+# Each step assigns one random mini-batch and moves every touched centroid
+# toward the batch mean with a per-centroid learning rate of
+# batch_count / total_count, which is the per-sample update applied in bulk.
+# With spherical=True vectors and centroids are unit length and assignment is
+# by cosine similarity, which is what the sentence embeddings are compared by.
+
+def normalize_rows(X: np.ndarray) -> np.ndarray:
+    X = np.asarray(X, dtype=np.float32)
+    return X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+
+class MiniBatchKMeans:
+    def __init__(self, n_clusters: int, batch_size: int = 1024, max_iter: int = 100,
+                 tol: float = 1e-4, spherical: bool = True, seed: int = 0):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.tol = tol
+        self.spherical = spherical
+        self.rng = np.random.default_rng(seed)
+        self.centroids: Optional[np.ndarray] = None
+        self.counts: Optional[np.ndarray] = None
+
+    def _prepare(self, X: np.ndarray) -> np.ndarray:
+        return normalize_rows(X) if self.spherical else np.asarray(X, dtype=np.float32)
+
+    def _init_centroids(self, X: np.ndarray):
+        """k-means++ seeding on (a sample of) X."""
+        sample = X[self.rng.choice(X.shape[0], min(X.shape[0], max(10 * self.n_clusters, 2048)), replace=False)]
+        centroids = np.empty((self.n_clusters, X.shape[1]), dtype=np.float32)
+        centroids[0] = sample[self.rng.integers(sample.shape[0])]
+        closest = self._distances(sample, centroids[:1])[:, 0]
+        for i in range(1, self.n_clusters):
+            total = closest.sum()
+            if total <= 0:
+                centroids[i] = sample[self.rng.integers(sample.shape[0])]
+            else:
+                centroids[i] = sample[self.rng.choice(sample.shape[0], p=closest / total)]
+            closest = np.minimum(closest, self._distances(sample, centroids[i:i + 1])[:, 0])
+        self.centroids = centroids
+        self.counts = np.zeros(self.n_clusters, dtype=np.int64)
+
+    def _distances(self, X: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        if self.spherical:
+            return np.maximum(1.0 - X @ centroids.T, 0.0)
+        sq = (X ** 2).sum(axis=1)[:, None] - 2.0 * X @ centroids.T + (centroids ** 2).sum(axis=1)[None, :]
+        return np.maximum(sq, 0.0)
+
+    def _assign(self, X: np.ndarray) -> np.ndarray:
+        if self.spherical:
+            return np.argmax(X @ self.centroids.T, axis=1)
+        return np.argmin(self._distances(X, self.centroids), axis=1)
+
+    def partial_fit(self, X: np.ndarray) -> float:
+        """One mini-batch update. Returns the largest centroid shift."""
+        X = self._prepare(X)
+        if self.centroids is None:
+            if X.shape[0] < self.n_clusters:
+                raise ValueError(f"Need at least {self.n_clusters} vectors to initialise {self.n_clusters} clusters")
+            self._init_centroids(X)
+        labels = self._assign(X)
+        batch_counts = np.bincount(labels, minlength=self.n_clusters)
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, labels, X)
+
+        touched = batch_counts > 0
+        self.counts += batch_counts
+        rate = (batch_counts[touched] / self.counts[touched])[:, None].astype(np.float32)
+        previous = self.centroids[touched]
+        updated = (1.0 - rate) * previous + rate * (sums[touched] / batch_counts[touched][:, None])
+        if self.spherical:
+            updated = normalize_rows(updated)
+        self.centroids[touched] = updated
+        return float(np.abs(updated - previous).max()) if touched.any() else 0.0
+
+    def fit(self, X: np.ndarray) -> "MiniBatchKMeans":
+        """Fit on X with random mini-batches until centroids stop moving."""
+        X = self._prepare(X)
+        self.centroids = None
+        for _ in range(self.max_iter):
+            batch = X[self.rng.choice(X.shape[0], min(self.batch_size, X.shape[0]), replace=False)]
+            if self.partial_fit(batch) < self.tol and self.counts.min() > 0:
+                break
+        self._reseed_empty(X)
+        return self
+
+    def _reseed_empty(self, X: np.ndarray):
+        """Clusters that never received a point restart at random data points."""
+        empty = np.flatnonzero(self.counts == 0)
+        if empty.shape[0]:
+            self.centroids[empty] = X[self.rng.choice(X.shape[0], empty.shape[0], replace=False)]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            raise RuntimeError("MiniBatchKMeans is not fitted")
+        return self._assign(self._prepare(X))
+
+    @classmethod
+    def from_centroids(cls, centroids: np.ndarray, spherical: bool = True) -> "MiniBatchKMeans":
+        model = cls(centroids.shape[0], spherical=spherical)
+        model.centroids = np.array(centroids, dtype=np.float32)
+        model.counts = np.zeros(centroids.shape[0], dtype=np.int64)
+        return model
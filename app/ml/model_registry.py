@@ -0,0 +1,128 @@
+import threading
+import time
+import torch
+from typing import Dict, Optional
+from sentence_transformers import SentenceTransformer, CrossEncoder
+from config import (
+    BI_ENCODER_MODEL,
+    BI_ENCODER_MAX_SEQ_LENGTH,
+    CROSS_ENCODER_MODEL,
+    CROSS_ENCODER_MAX_LENGTH,
+    ENCODER_BACKEND,
+    ONNX_MODEL_DIR,
+    ONNX_QUANTIZED,
+    ONNX_INTRA_OP_THREADS
+)
+
+# Process-wide model registry. Models are loaded once per worker at startup
+# and shared by every request instead of being rebuilt inside the handlers.
+_models: Dict[str, object] = {}
+_device: Optional[str] = None
+_ready = threading.Event()
+_load_lock = threading.Lock()
+_load_error: Optional[str] = None
+_cross_encoder_error: Optional[str] = None
+
+WARMUP_TEXT = "Warm-up sentence used to initialise the encoder kernels."
+
+# --- Device Handling ---
+def get_device():
+    """Dynamically determine the best available device with error handling"""
+    try:
+        # Check CUDA availability
+        if torch.cuda.is_available():
+            print("CUDA is available - using GPU")
+            # Test a small operation to verify functionality
+            test_tensor = torch.tensor([1.0]).cuda()
+            if test_tensor.device.type == 'cuda':
+                print("GPU operations verified")
+                return "cuda"
+            else:
+                print("CUDA test failed - falling back to CPU")
+                return "cpu"
+        return "cpu"
+    except Exception as e:
+        print(f"CUDA initialization failed: {str(e)} - Using CPU")
+        return "cpu"
+
+def _load_bi_encoder(device: str):
+    if ENCODER_BACKEND == "onnx":
+        from ml.onnx_encoder import OnnxEncoder
+        bi_encoder = OnnxEncoder(ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, intra_op_threads=ONNX_INTRA_OP_THREADS)
+        # Embeddings are stored under EMBEDDING_MODEL_KEY, which names BI_ENCODER_MODEL
+        source_model = bi_encoder.config.get("source_model")
+        if source_model != BI_ENCODER_MODEL:
+            raise ValueError(f"ONNX export in {ONNX_MODEL_DIR} is of {source_model}, "
+                             f"not BI_ENCODER_MODEL {BI_ENCODER_MODEL}; re-export it")
+    else:
+        bi_encoder = SentenceTransformer(BI_ENCODER_MODEL, device=device)
+    bi_encoder.max_seq_length = BI_ENCODER_MAX_SEQ_LENGTH
+    # Warm-up encode so the first real request does not pay for lazy init
+    bi_encoder.encode([WARMUP_TEXT], convert_to_tensor=True, device=device)
+    return bi_encoder
+
+def _load_cross_encoder(device: str) -> CrossEncoder:
+    cross_encoder = CrossEncoder(CROSS_ENCODER_MODEL, max_length=CROSS_ENCODER_MAX_LENGTH, device=device)
+    cross_encoder.predict([(WARMUP_TEXT, WARMUP_TEXT)])
+    return cross_encoder
+
+def load_models():
+    """
+    Load and warm up every inference model for this worker (idempotent).
+    Only the bi-encoder is required for readiness; if the optional
+    cross-encoder fails to load, re-ranking is skipped as if unconfigured.
+    """
+    global _device, _load_error, _cross_encoder_error
+    with _load_lock:
+        if _ready.is_set():
+            return
+        start = time.time()
+        try:
+            # The ONNX backend is CPU-only; embeddings come back as CPU tensors
+            _device = "cpu" if ENCODER_BACKEND == "onnx" else get_device()
+            print(f"Loading models on device: {_device}")
+            _models["bi_encoder"] = _load_bi_encoder(_device)
+        except Exception as e:
+            _load_error = str(e)
+            print(f"Model loading failed: {_load_error}")
+            raise
+        _load_error = None
+        if CROSS_ENCODER_MODEL:
+            try:
+                _models["cross_encoder"] = _load_cross_encoder(_device)
+                _cross_encoder_error = None
+            except Exception as e:
+                _cross_encoder_error = str(e)
+                print(f"Cross-encoder {CROSS_ENCODER_MODEL} failed to load, re-ranking disabled: {_cross_encoder_error}")
+        _ready.set()
+        print(f"Models loaded and warmed up in {time.time() - start:.2f} seconds")
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+def get_status() -> Dict:
+    return {
+        "ready": is_ready(),
+        "device": _device,
+        "encoder_backend": ENCODER_BACKEND,
+        "models": sorted(_models.keys()),
+        "error": _load_error,
+        "cross_encoder_error": _cross_encoder_error
+    }
+
+def get_model_device() -> str:
+    if not is_ready():
+        raise RuntimeError("Models are not loaded yet")
+    return _device
+
+def get_bi_encoder():
+    """SentenceTransformer, or OnnxEncoder with the same encode interface."""
+    if not is_ready():
+        raise RuntimeError("Models are not loaded yet")
+    return _models["bi_encoder"]
+
+def get_cross_encoder() -> Optional[CrossEncoder]:
+    """The re-ranking cross-encoder, or None when CROSS_ENCODER_MODEL is empty or failed to load."""
+    if not is_ready():
+        raise RuntimeError("Models are not loaded yet")
+    return _models.get("cross_encoder")
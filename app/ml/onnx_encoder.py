@@ -0,0 +1,71 @@
+import os
+import json
+import numpy as np
+import torch
+from typing import List, Union
+
+# CPU inference backend for the bi-encoder on ONNX Runtime. It implements the
+# part of the SentenceTransformer interface the pipeline uses (tokenizer,
+# max_seq_length, get_sentence_embedding_dimension, encode), so it can be
+# swapped in by ENCODER_BACKEND=onnx. Model directories are produced by
+# scripts/export_onnx_encoder.py. onnxruntime is only imported when this
+# backend is selected.
+
+ENCODER_CONFIG_FILE = "encoder_config.json"
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model.int8.onnx"
+
+class OnnxEncoder:
+    def __init__(self, model_dir: str, quantized: bool = True, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, ENCODER_CONFIG_FILE)) as f:
+            self.config = json.load(f)
+        model_file = os.path.join(model_dir, INT8_MODEL_FILE if quantized else FP32_MODEL_FILE)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads  # 0 lets ONNX Runtime use every core
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = self.config["max_seq_length"]
+        self.quantized = quantized
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dim"]
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.config["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.config["normalize"]:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_tensor: bool = False, device: str = None, **kwargs):
+        """Same contract as SentenceTransformer.encode for the options the app uses."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+            hidden = self.session.run(None, feeds)[0]
+            batches.append(self._pool(hidden, encoded["attention_mask"]))
+        embeddings = (np.concatenate(batches) if batches
+                      else np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32))
+        if single:
+            embeddings = embeddings[0]
+        return torch.from_numpy(embeddings) if convert_to_tensor else embeddings
@@ -0,0 +1,318 @@
+import os
+import json
+import math
+import uuid
+import shutil
+import fcntl
+import threading
+import contextlib
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from bson import ObjectId
+from config import VECTOR_INDEX_DIR, VECTOR_INDEX_NPROBE, VECTOR_INDEX_EXACT_ROWS
+from ml.embedding_codec import EMBEDDING_MODEL_KEY
+from ml.kmeans import MiniBatchKMeans
+
+# IVF-flat index over every stored resume embedding.
+#
+# Rows live in flat memory-mapped files (normalized float32 vectors, 12-byte
+# ObjectIds, owner codes and coarse list ids), so all workers on a host share
+# the same page-cache pages. meta.json holds the row count, the owner table
+# and a generation id that changes whenever the index is rebuilt. Any worker
+# may append rows under an exclusive file lock (next to the directory, so a
+# rebuilt directory can be swapped in); readers notice the new meta.json and
+# remap. Until coarse centroids are trained (scripts/build_vector_index.py)
+# every query is an exact scan. Training also writes the inverted lists (row
+# order by list id and each list's bounds) for the rows it assigned, so a
+# remap only opens files; rows appended after training carry their list id
+# and are probed by scanning that tail until the next rebuild.
+
+META_FILE = "meta.json"
+CENTROIDS_FILE = "centroids.npy"
+LIST_ORDER_FILE = "list_order.npy"
+LIST_BOUNDS_FILE = "list_bounds.npy"
+GROW_ROWS = 65536
+
+def default_nlist(rows: int) -> int:
+    """
+    Coarse lists for `rows` vectors. With 4 * sqrt(rows) lists the default
+    nprobe scans ~0.4% of 1M rows (global search p50 ~2 ms on one core in
+    benchmarks/vector_index.py, ~15 ms with sqrt(rows)); training takes
+    longer but runs offline.
+    """
+    return max(1, int(4 * math.sqrt(rows)))
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k best scores, best first."""
+    if k >= scores.shape[0]:
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])]
+
+class _Mapping:
+    """Read-only view of one generation of the index files."""
+
+    def __init__(self, path: str, meta: dict):
+        self.meta = meta
+        self.generation = meta["generation"]
+        self.count = meta["count"]
+        self.dim = meta["dim"]
+        capacity = meta["capacity"]
+        self.user_codes = {user_id: code for code, user_id in enumerate(meta["users"])}
+        self.vectors = self.ids = self.users = self.lists = None
+        if capacity:
+            self.vectors = np.memmap(os.path.join(path, "vectors.f32"), np.float32, "r", shape=(capacity, self.dim))
+            self.ids = np.memmap(os.path.join(path, "ids.u8"), np.uint8, "r", shape=(capacity, 12))
+            self.users = np.memmap(os.path.join(path, "users.i32"), np.int32, "r", shape=(capacity,))
+            self.lists = np.memmap(os.path.join(path, "lists.i32"), np.int32, "r", shape=(capacity,))
+        centroids_path = os.path.join(path, CENTROIDS_FILE)
+        self.centroids = np.load(centroids_path) if meta["nlist"] and os.path.exists(centroids_path) else None
+        # Inverted lists of the first `listed` rows: row order by list id and
+        # each list's bounds in it (indexes trained before they were stored
+        # have none, so every row is probed as tail)
+        self.list_order = self.list_bounds = None
+        self.listed = 0
+        order_path, bounds_path = os.path.join(path, LIST_ORDER_FILE), os.path.join(path, LIST_BOUNDS_FILE)
+        if self.centroids is not None and os.path.exists(order_path) and os.path.exists(bounds_path):
+            self.list_order = np.load(order_path, mmap_mode="r")
+            self.list_bounds = np.load(bounds_path)
+            self.listed = min(self.list_order.shape[0], self.count)
+
+    def probe_rows(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probes = _top_k(self.centroids @ query, min(nprobe, self.centroids.shape[0]))
+        rows = [] if self.list_order is None else [
+            self.list_order[self.list_bounds[p]:self.list_bounds[p + 1]] for p in probes
+        ]
+        if self.listed < self.count:
+            # Rows appended since training
+            tail = np.asarray(self.lists[self.listed:self.count])
+            rows.append(np.flatnonzero(np.isin(tail, probes)) + self.listed)
+        return np.concatenate(rows)
+
+class VectorIndex:
+    def __init__(self, path: str = VECTOR_INDEX_DIR, model_key: Optional[str] = None):
+        self.path = path
+        self.model_key = model_key
+        self.lock = threading.Lock()
+        self.mapping: Optional[_Mapping] = None
+        self.meta_stat = None
+
+    # --- Files ---
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(self._file(META_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, meta: dict):
+        tmp = self._file(f"{META_FILE}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._file(META_FILE))
+
+    @contextlib.contextmanager
+    def _writer_lock(self):
+        """Exclusive across threads and worker processes."""
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock, open(f"{os.path.normpath(self.path)}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_array(self, name: str, array: np.ndarray):
+        tmp = self._file(f"{name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, self._file(name))
+
+    def _grow(self, meta: dict, rows: int):
+        capacity = max(rows, meta["capacity"] * 2, GROW_ROWS)
+        for name, row_bytes in (("vectors.f32", 4 * meta["dim"]), ("ids.u8", 12),
+                                ("users.i32", 4), ("lists.i32", 4)):
+            with open(self._file(name), "ab") as f:
+                f.truncate(capacity * row_bytes)
+        meta["capacity"] = capacity
+
+    def _open_rw(self, meta: dict) -> Tuple[np.memmap, ...]:
+        capacity, dim = meta["capacity"], meta["dim"]
+        return (
+            np.memmap(self._file("vectors.f32"), np.float32, "r+", shape=(capacity, dim)),
+            np.memmap(self._file("ids.u8"), np.uint8, "r+", shape=(capacity, 12)),
+            np.memmap(self._file("users.i32"), np.int32, "r+", shape=(capacity,)),
+            np.memmap(self._file("lists.i32"), np.int32, "r+", shape=(capacity,))
+        )
+
+    # --- Reads ---
+    def _current(self) -> Optional[_Mapping]:
+        """Mapping of the latest index files, remapped only when meta.json changed."""
+        try:
+            stat = os.stat(self._file(META_FILE))
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            if key != self.meta_stat:
+                meta = self._read_meta()
+                if meta is None:
+                    return None
+                self.mapping = _Mapping(self.path, meta)
+                self.meta_stat = key
+            return self.mapping
+
+    def check_model(self, mapping: _Mapping):
+        if self.model_key and mapping.meta.get("model") != self.model_key:
+            raise RuntimeError("Vector index was built with a different embedding model; rebuild it")
+
+    def search(self, query: np.ndarray, k: int, user_id: Optional[str] = None,
+               exclude_ids: Sequence[str] = (), nprobe: int = VECTOR_INDEX_NPROBE) -> List[Tuple[str, float]]:
+        """
+        Top-k (resume_id, cosine similarity) for `query`, best first.
+        With `user_id` only that user's resumes are considered; small
+        per-user pools are scanned exactly instead of probing coarse lists.
+        """
+        mapping = self._current()
+        if mapping is None or not mapping.count:
+            return []
+        self.check_model(mapping)
+        query = _normalize(query).ravel()
+        count = mapping.count
+
+        code = None
+        rows = None
+        if user_id is not None:
+            code = mapping.user_codes.get(user_id)
+            if code is None:
+                return []
+            user_rows = np.flatnonzero(mapping.users[:count] == code)
+            if mapping.centroids is None or user_rows.shape[0] <= VECTOR_INDEX_EXACT_ROWS:
+                rows = user_rows
+        if rows is None:
+            if mapping.centroids is None:
+                rows = np.arange(count)
+            else:
+                rows = mapping.probe_rows(query, nprobe)
+                if code is not None:
+                    rows = rows[mapping.users[rows] == code]
+        if not rows.shape[0]:
+            return []
+
+        scores = mapping.vectors[rows] @ query
+        # A rebuild can briefly append a row twice, so ids are also deduplicated
+        seen = set(exclude_ids)
+        results = []
+        for position in _top_k(scores, k + len(seen) + 8):
+            resume_id = str(ObjectId(mapping.ids[rows[position]].tobytes()))
+            if resume_id in seen:
+                continue
+            seen.add(resume_id)
+            results.append((resume_id, float(scores[position])))
+            if len(results) == k:
+                break
+        return results
+
+    def get_stats(self) -> Dict:
+        mapping = self._current()
+        if mapping is None:
+            return {"rows": 0, "nlist": 0}
+        return {"rows": mapping.count, "nlist": mapping.meta["nlist"], "model": mapping.meta.get("model")}
+
+    # --- Writes ---
+    def add(self, resume_ids: List[str], user_ids: List[str], embeddings: np.ndarray):
+        """Append rows. Creates an empty (untrained) index on first use."""
+        if not resume_ids:
+            return
+        vectors = _normalize(embeddings)
+        with self._writer_lock():
+            meta = self._read_meta()
+            if meta is None:
+                meta = {"generation": uuid.uuid4().hex, "model": self.model_key, "dim": int(vectors.shape[1]),
+                        "count": 0, "capacity": 0, "nlist": 0, "users": []}
+            if self.model_key and meta.get("model") != self.model_key:
+                print("Vector index model mismatch, skipping incremental add; rebuild the index")
+                return
+            start, end = meta["count"], meta["count"] + len(resume_ids)
+            if end > meta["capacity"]:
+                self._grow(meta, end)
+            user_codes = {user_id: code for code, user_id in enumerate(meta["users"])}
+            for user_id in user_ids:
+                if user_id not in user_codes:
+                    user_codes[user_id] = len(meta["users"])
+                    meta["users"].append(user_id)
+
+            vec_map, id_map, user_map, list_map = self._open_rw(meta)
+            vec_map[start:end] = vectors
+            id_map[start:end] = np.frombuffer(b"".join(ObjectId(r).binary for r in resume_ids),
+                                              dtype=np.uint8).reshape(-1, 12)
+            user_map[start:end] = [user_codes[u] for u in user_ids]
+            centroids_path = self._file(CENTROIDS_FILE)
+            if meta["nlist"] and os.path.exists(centroids_path):
+                list_map[start:end] = np.argmax(vectors @ np.load(centroids_path).T, axis=1)
+            else:
+                list_map[start:end] = -1
+            for array in (vec_map, id_map, user_map, list_map):
+                array.flush()
+            meta["count"] = end
+            # Rows are durable before the new count becomes visible to readers
+            self._write_meta(meta)
+
+    def train(self, nlist: int, sample_size: int = 100000, iterations: int = 100, seed: int = 0):
+        """
+        Fit `nlist` coarse centroids on a sample of the stored rows, assign
+        every row to its nearest list and store the inverted lists. Meant for
+        a freshly built directory; readers pick up the new generation on
+        their next query.
+        """
+        with self._writer_lock():
+            meta = self._read_meta()
+            if meta is None or not meta["count"] or nlist <= 0:
+                return
+            vec_map, _, _, list_map = self._open_rw(meta)
+            count = meta["count"]
+            rng = np.random.default_rng(seed)
+            sample = np.asarray(vec_map[np.sort(rng.choice(count, min(count, sample_size), replace=False))])
+            kmeans = MiniBatchKMeans(min(nlist, sample.shape[0]), batch_size=max(4096, 4 * nlist),
+                                     max_iter=iterations, seed=seed).fit(sample)
+            centroids = kmeans.centroids
+            for start in range(0, count, GROW_ROWS):
+                end = min(count, start + GROW_ROWS)
+                list_map[start:end] = np.argmax(np.asarray(vec_map[start:end]) @ centroids.T, axis=1)
+            list_map.flush()
+            lists = np.asarray(list_map[:count])
+            order = np.argsort(lists, kind="stable").astype(np.int64)
+            self._save_array(LIST_ORDER_FILE, order)
+            self._save_array(LIST_BOUNDS_FILE, np.searchsorted(lists[order], np.arange(centroids.shape[0] + 1)))
+            self._save_array(CENTROIDS_FILE, centroids)
+            meta["nlist"] = int(centroids.shape[0])
+            meta["generation"] = uuid.uuid4().hex
+            self._write_meta(meta)
+
+def swap_in(build_path: str, path: str = VECTOR_INDEX_DIR):
+    """Atomically replace the index at `path` with the one built at `build_path`."""
+    with VectorIndex(path)._writer_lock():
+        old_path = f"{os.path.normpath(path)}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(build_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+def get_index() -> VectorIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex(VECTOR_INDEX_DIR, model_key=EMBEDDING_MODEL_KEY)
+        return _index
@@ -0,0 +1,61 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, List, Optional
+
+class Candidate(BaseModel):
+    id: str
+    name: str
+    file_name: str
+    fitScore: Optional[float]
+    overall_similarity: float
+    llm_fit_score: Optional[float]
+    analysis_status: str = "completed"
+    analysis_error: Optional[str] = None
+    total_experience: float
+    skills: Dict[str, List[str]]
+    education_highlights: str
+    experience_highlights: str
+    summary: str
+    justification: str
+    email: str
+    mobile_number: str
+    resume_content: str
+
+class RankingResponse(BaseModel):
+    run_id: str
+    user_id: str
+    candidates: List[Candidate]
+
+class RankingJobResponse(BaseModel):
+    run_id: str
+    status: str
+
+class RankingJobStatus(BaseModel):
+    run_id: str
+    user_id: str
+    status: str  # queued | running | completed | failed
+    progress: Dict
+    error: Optional[str] = None
+    job_details_id: Optional[str] = None
+    batch_id: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    candidates: Optional[List[Dict]] = None
+
+class RankingAppendResponse(BaseModel):
+    run_id: str
+    user_id: str
+    resumes_added: int
+    duplicates_skipped: int
+    entered_shortlist: List[str]  # new resume ids that entered the phase-1 window
+    ordering: List[str]  # the run's top phase2 resume ids after the append
+    candidates: List[Dict]  # stored screening candidates of the run
+
+class RankingResliceResponse(BaseModel):
+    run_id: str
+    user_id: str
+    phase1_limit: int
+    phase2_limit: int
+    newly_analyzed: List[str]  # resume ids analyzed because the phase-1 window grew
+    ordering: List[str]  # the run's top phase2 resume ids after the re-slice
+    candidates: List[Dict]  # stored screening candidates of the run
@@ -1,8 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from services.alternates_service import find_alternatives
 
 router = APIRouter(prefix="/find_alternatives", tags=["Alternatives"])
 
-@router.get("/{employee_id}")
-async def get_alternatives(employee_id: str):
-    return await find_alternatives(employee_id)
\ No newline at end of file
+@router.get("/{resume_id}")
+async def get_alternatives(
+    resume_id: str,
+    user_id: str = Query(..., description="Only resumes uploaded by this user are searched"),
+    k: int = Query(10, ge=1, le=100, description="Number of alternatives to return"),
+    cluster_only: bool = Query(False, description="Only search the resume's talent cluster")
+):
+    return await find_alternatives(resume_id, user_id, k, cluster_only)
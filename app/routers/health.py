@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ml import model_registry, vector_index
+from services import resume_cache, llm_cache, activity_log, clustering
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+@router.get("/live")
+async def liveness():
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness():
+    """Only reports ready once every model is resident and warmed up."""
+    status = model_registry.get_status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content={"status": "loading", **status})
+    return {"status": "ready", **status}
+
+@router.get("/stats")
+async def cache_stats():
+    """Per-worker cache and background-writer counters."""
+    return {
+        "resume_cache": resume_cache.get_stats(),
+        "llm_cache": llm_cache.get_stats(),
+        "activity_log": activity_log.get_stats(),
+        "vector_index": vector_index.get_index().get_stats(),
+        "clusters": clustering.get_stats()
+    }
@@ -1,24 +1,23 @@
 from fastapi import APIRouter, HTTPException, Form, Query
 from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, List, Literal
-from openai import OpenAI
 import os
 import json
 import re
-from config import (
+import asyncio
+from database import (
     get_screening_runs_collection,
     get_resumes_collection,
-    get_job_details_collection,
-    log_activity
+    get_job_details_collection
 )
+from services.activity_log import log_activity
 from bson import ObjectId
 from datetime import datetime
-from config import OPENAI_API_KEY
+from services.openai_limiter import chat_completion
+from utils import condense
 
 router = APIRouter(prefix="/questions", tags=["generate_questions"])
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
 class Question(BaseModel):
     question: str
     skill_type: Literal["soft skill", "hard skill"]
@@ -51,12 +50,22 @@ def sanitize_json(raw_json: str) -> str:
     sanitized = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', sanitized)
     return sanitized
 
-def update_screening_run_with_questions(run_id: str, resume_id: str, questions: List[dict]):
+async def get_condensed_content(resume_doc: dict) -> str:
+    """Token-budgeted resume text; condensed and stored now for resumes ranked before condensation."""
+    if resume_doc.get("condensed_version") == condense.condense_stamp():
+        return resume_doc["condensed_content"]
+    fields = await asyncio.get_running_loop().run_in_executor(
+        None, condense.condensed_fields, resume_doc.get("content", "")
+    )
+    await get_resumes_collection().update_one({"_id": resume_doc["_id"]}, {"$set": fields})
+    return fields["condensed_content"]
+
+async def update_screening_run_with_questions(run_id: str, resume_id: str, questions: List[dict]):
     # Find and update the specific candidate in the screening run
     screening_runs = get_screening_runs_collection()
     
     # Find the run and candidate
-    run = screening_runs.find_one({"_id": ObjectId(run_id)})
+    run = await screening_runs.find_one({"_id": ObjectId(run_id)}, {"candidates.resume_id": 1})
     if not run:
         raise HTTPException(404, "Screening run not found")
     
@@ -78,7 +87,7 @@ def update_screening_run_with_questions(run_id: str, resume_id: str, questions:
         }
     }
     
-    screening_runs.update_one({"_id": ObjectId(run_id)}, update_query)
+    await screening_runs.update_one({"_id": ObjectId(run_id)}, update_query)
 
 @router.post("/")
 async def generate_questions(
@@ -93,25 +102,26 @@ async def generate_questions(
     include_coding: bool = Query(False, description="Should hard skills include coding questions?")
 ):
     # Get resume content
-    resume_doc = get_resumes_collection().find_one({"_id": ObjectId(resume_id)})
+    resume_doc = await get_resumes_collection().find_one({"_id": ObjectId(resume_id)})
     if not resume_doc:
         raise HTTPException(404, "Resume not found")
     
     # Get screening run to find job details
-    screening_run = get_screening_runs_collection().find_one(
-        {"_id": ObjectId(screening_run_id)}
+    screening_run = await get_screening_runs_collection().find_one(
+        {"_id": ObjectId(screening_run_id)},
+        {"job_details_id": 1}
     )
     if not screening_run:
         raise HTTPException(404, "Screening run not found")
     
     # Get job description from job details
-    job_details = get_job_details_collection().find_one(
+    job_details = await get_job_details_collection().find_one(
         {"_id": ObjectId(screening_run["job_details_id"])}
     )
     if not job_details:
         raise HTTPException(404, "Job details not found")
     
-    resume_content = resume_doc.get("content", "")
+    resume_content = await get_condensed_content(resume_doc)
     candidate_name = resume_doc.get("candidate_name", "Candidate")
     job_description = job_details["job_description"]
 
@@ -126,7 +136,7 @@ async def generate_questions(
 
               ### INPUTS:
               - Candidate Name: {candidate_name}
-              - Resume Content: {resume_content[:2000]} [truncated]
+              - Resume Content: {resume_content}
               - Job Description: {job_description}
               - Number of Questions (optional, default = 5): {num_questions}
               - Include Soft Skills Questions? (optional, \"yes\" or \"no\", default = \"no\"): {soft_skills_flag_str}
@@ -185,7 +195,7 @@ async def generate_questions(
               Only use \"soft skill\" or \"hard skill\" for the "skill_type" field. Do not include commentary—just return the JSON.
               """
 
-    response = openai_client.chat.completions.create(
+    response = await chat_completion(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.0,
@@ -204,7 +214,7 @@ async def generate_questions(
         questions_dict = [q.dict() for q in validated.questions]
         
         # Update screening run
-        update_screening_run_with_questions(
+        await update_screening_run_with_questions(
             run_id=screening_run_id,
             resume_id=resume_id,
             questions=questions_dict
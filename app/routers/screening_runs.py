@@ -1,9 +1,12 @@
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
-from typing import List, Optional
-from config import get_screening_runs_collection, get_job_details_collection
+from typing import List, Literal, Optional, Tuple, Union
+from database import get_screening_runs_collection
 from bson import ObjectId
+from bson.errors import InvalidId
+import base64
+import binascii
 import math
 
 router = APIRouter(prefix="/screening_runs", tags=["screening_runs"])
@@ -23,8 +26,11 @@ class ScreeningCandidate(BaseModel):
     resume_id: str = Field(..., description="Unique identifier for the resume")
     candidate_name: str = Field(..., description="Name of the candidate")
     file_name: str = Field(..., description="Original filename of the resume")
-    ai_fit_score: float = Field(..., description="AI-generated fit score for the candidate")
+    ai_fit_score: Optional[float] = Field(None, description="AI-generated fit score for the candidate (null if analysis failed)")
+    analysis_status: str = Field("completed", description="Whether the LLM analysis completed or failed")
+    analysis_error: Optional[str] = Field(None, description="Error reported when the LLM analysis failed")
     skill_similarity: float = Field(..., description="Similarity score between candidate skills and job requirements")
+    rerank_score: Optional[float] = Field(None, description="Cross-encoder relevance score when re-ranking was enabled")
     candidate_summary: str = Field(..., description="Brief summary of the candidate")
     skill_assessment: SkillAssessment = Field(..., description="Detailed skill assessment")
     experience_highlights: str = Field(..., description="Key experience highlights")
@@ -33,7 +39,17 @@ class ScreeningCandidate(BaseModel):
     ai_justification: str = Field(..., description="AI justification for the fit score")
     resume_content_preview: str = Field(..., description="Preview of resume content")
     questions_generated: bool = Field(..., description="Flag indicating if questions were generated")
-    generated_questions: List[GeneratedQuestion] = Field(..., description="List of generated interview questions")
+    generated_questions: List[GeneratedQuestion] = Field(default_factory=list, description="List of generated interview questions")
+
+class ScreeningCandidateSummary(BaseModel):
+    resume_id: str = Field(..., description="Unique identifier for the resume")
+    candidate_name: str = Field(..., description="Name of the candidate")
+    file_name: str = Field(..., description="Original filename of the resume")
+    ai_fit_score: Optional[float] = Field(None, description="AI-generated fit score for the candidate (null if analysis failed)")
+    analysis_status: str = Field("completed", description="Whether the LLM analysis completed or failed")
+    skill_similarity: float = Field(..., description="Similarity score between candidate skills and job requirements")
+    rerank_score: Optional[float] = Field(None, description="Cross-encoder relevance score when re-ranking was enabled")
+    questions_generated: bool = Field(False, description="Flag indicating if questions were generated")
 
 class ScreeningRunResponse(BaseModel):
     id: str = Field(..., description="Unique identifier for the screening run")
@@ -41,29 +57,112 @@ class ScreeningRunResponse(BaseModel):
     job_role: Optional[str] = Field(None, description="Job role from job details")
     job_description: Optional[str] = Field(None, description="Job description from job details")
     batch_id: str = Field(..., description="Batch identifier for the run")
+    batch_ids: List[str] = Field(default_factory=list, description="All batches screened by the run (several for batch re-ranks)")
     run_start_time: datetime = Field(..., description="Start time of the screening run")
     run_end_time: datetime = Field(..., description="End time of the screening run")
     time_taken: float = Field(..., description="Duration of the run in seconds")
     created_at: datetime = Field(..., description="Creation timestamp of the run")
     candidates: List[ScreeningCandidate] = Field(..., description="List of screened candidates")
 
+class ScreeningRunSummary(BaseModel):
+    id: str = Field(..., description="Unique identifier for the screening run")
+    job_details_id: str = Field(..., description="Identifier for the job details")
+    job_role: Optional[str] = Field(None, description="Job role from job details")
+    batch_id: str = Field(..., description="Batch identifier for the run")
+    batch_ids: List[str] = Field(default_factory=list, description="All batches screened by the run (several for batch re-ranks)")
+    run_start_time: datetime = Field(..., description="Start time of the screening run")
+    run_end_time: datetime = Field(..., description="End time of the screening run")
+    time_taken: float = Field(..., description="Duration of the run in seconds")
+    created_at: datetime = Field(..., description="Creation timestamp of the run")
+    candidates: List[ScreeningCandidateSummary] = Field(..., description="Screened candidates without analysis details")
+
 class PaginatedScreeningRunResponse(BaseModel):
-    total: int = Field(..., description="Total number of screening runs")
-    page: int = Field(..., description="Current page number")
     limit: int = Field(..., description="Number of items per page")
-    total_pages: int = Field(..., description="Total number of pages")
-    results: List[ScreeningRunResponse] = Field(..., description="List of screening runs")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page; null on the last page")
+    total: Optional[int] = Field(None, description="Total number of matching screening runs (without a cursor, or with include_total=true)")
+    page: Optional[int] = Field(None, description="Deprecated: current page number (requests without a cursor)")
+    total_pages: Optional[int] = Field(None, description="Deprecated: total number of pages (requests without a cursor)")
+    results: List[Union[ScreeningRunResponse, ScreeningRunSummary]] = Field(..., description="List of screening runs")
+
+# --- History Query ---
+# One aggregation per page: filter and keyset on (created_at, _id) so deep
+# pages cost the same as the first, join the job details with $lookup and
+# project only the fields the view returns. Stored windows, progress counters
+# and leases never leave the database.
+
+SUMMARY_CANDIDATE_FIELDS = ("resume_id", "candidate_name", "file_name", "ai_fit_score", "skill_similarity",
+                            "rerank_score")
+
+def encode_cursor(created_at: datetime, run_id: ObjectId) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{run_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        created_at, run_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(run_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def history_projection(fields: str) -> dict:
+    projection = {
+        "_id": 1,
+        "job_details_id": 1,
+        "job_role": {"$arrayElemAt": ["$job_details.job_role", 0]},
+        "batch_id": 1,
+        "batch_ids": {"$ifNull": ["$batch_ids", ["$batch_id"]]},
+        "run_start_time": 1,
+        "run_end_time": 1,
+        "time_taken": {"$divide": [{"$subtract": ["$run_end_time", "$run_start_time"]}, 1000]},
+        "created_at": 1
+    }
+    if fields == "summary":
+        candidate = {field: f"$$c.{field}" for field in SUMMARY_CANDIDATE_FIELDS}
+        candidate["analysis_status"] = {"$ifNull": ["$$c.analysis_status", "completed"]}
+        candidate["questions_generated"] = {"$ifNull": ["$$c.questions_generated", False]}
+        projection["candidates"] = {"$map": {"input": {"$ifNull": ["$candidates", []]}, "as": "c", "in": candidate}}
+    else:
+        projection["job_description"] = {"$arrayElemAt": ["$job_details.job_description", 0]}
+        projection["candidates"] = {"$ifNull": ["$candidates", []]}
+    return projection
+
+def history_pipeline(query: dict, fields: str, limit: int, skip: int = 0) -> List[dict]:
+    return [
+        {"$match": query},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$skip": skip},
+        # One extra run tells whether there is a next page
+        {"$limit": limit + 1},
+        # job_details_id is stored as a string
+        {"$addFields": {"job_details_oid": {"$convert": {"input": "$job_details_id", "to": "objectId",
+                                                         "onError": None, "onNull": None}}}},
+        {"$lookup": {"from": "job_details", "localField": "job_details_oid", "foreignField": "_id",
+                     "as": "job_details"}},
+        {"$project": history_projection(fields)}
+    ]
+
+def legacy_candidate(candidate: dict) -> dict:
+    """Defaults for candidate entries stored by older versions."""
+    if not isinstance(candidate.get("skill_assessment"), dict):
+        candidate["skill_assessment"] = {}
+    for key in ("exact_matches", "transferable_skills", "non_technical_skills"):
+        candidate["skill_assessment"].setdefault(key, [])
+    return candidate
 
 @router.get("/", response_model=PaginatedScreeningRunResponse)
 async def get_screening_runs(
     user_id: str = Query(..., description="User ID to fetch screening runs for"),
     start_date: Optional[str] = Query(None, description="Start date in ISO format (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date in ISO format (YYYY-MM-DD)"),
-    page: int = Query(1, ge=1, description="Page number for pagination"),
-    limit: int = Query(10, ge=1, le=100, description="Number of items per page")
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    page: Optional[int] = Query(None, ge=1, deprecated=True,
+                                description="Deprecated, use cursor: page number for offset pagination"),
+    limit: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    fields: Literal["full", "summary"] = Query("full", description="summary: run metadata and candidate scores only"),
+    include_total: bool = Query(False, description="Also count all matching runs (an extra query)")
 ):
-    # Build query filter
-    query = {"user_id": user_id}
+    # Build query filter; background jobs still queued, running or failed are
+    # not finished runs (older documents have no status field)
+    query = {"user_id": user_id, "status": {"$in": [None, "completed"]}}
     
     # Add date filters if provided
     date_filter = {}
@@ -84,99 +183,39 @@ async def get_screening_runs(
     if date_filter:
         query["created_at"] = date_filter
     
-    # Fetch screening runs collection
-    screening_runs_collection = get_screening_runs_collection()
-    job_details_collection = get_job_details_collection()
-    
-    # Count total documents matching the query
-    total = screening_runs_collection.count_documents(query)
+    if cursor and page:
+        raise HTTPException(status_code=400, detail="Pass either cursor or page, not both")
     
-    # Calculate pagination values
-    total_pages = math.ceil(total / limit) if total > 0 else 1
-    skip = (page - 1) * limit
+    # Requests without a cursor keep the deprecated page/total/total_pages
+    # response until page is removed
+    paged = cursor is None
+    screening_runs_collection = get_screening_runs_collection()
+    total = await screening_runs_collection.count_documents(query) if include_total or paged else None
     
-    # Fetch paginated screening runs
-    runs = list(
-        screening_runs_collection.find(query)
-        .sort("created_at", -1)
-        .skip(skip)
-        .limit(limit)
-    )
+    # Keyset: runs strictly after the last one of the previous page in
+    # (created_at, _id) descending order
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": cursor_created_at}},
+            {"created_at": cursor_created_at, "_id": {"$lt": cursor_id}}
+        ]}]}
     
-    if not runs:
-        return PaginatedScreeningRunResponse(
-            total=total,
-            page=page,
-            limit=limit,
-            total_pages=total_pages,
-            results=[]
-        )
+    skip = (page - 1) * limit if page else 0
+    runs = await screening_runs_collection.aggregate(
+        history_pipeline(query, fields, limit, skip)
+    ).to_list(length=limit + 1)
+    next_cursor = encode_cursor(runs[limit - 1]["created_at"], runs[limit - 1]["_id"]) if len(runs) > limit else None
     
-    # Process and format the response
     results = []
-    for run in runs:
-        # Fetch job details
-        job_role = None
-        job_description = None
-        if run.get("job_details_id"):
-            job_details = job_details_collection.find_one(
-                {"_id": ObjectId(run["job_details_id"])}
-            )
-            if job_details:
-                job_role = job_details.get("job_role")
-                job_description = job_details.get("job_description")
-        
-        # Calculate time taken for screening
-        time_taken = (run["run_end_time"] - run["run_start_time"]).total_seconds()
-        
-        # Process candidates
-        candidates = []
-        for candidate in run.get("candidates", []):
-            # Handle skill_assessment structure
-            skill_assessment = candidate.get("skill_assessment", {})
-            if not isinstance(skill_assessment, dict):
-                skill_assessment = {}
-                
-            candidates.append(ScreeningCandidate(
-                resume_id=candidate["resume_id"],
-                candidate_name=candidate["candidate_name"],
-                file_name=candidate["file_name"],
-                ai_fit_score=candidate["ai_fit_score"],
-                skill_similarity=candidate["skill_similarity"],
-                candidate_summary=candidate["candidate_summary"],
-                skill_assessment=SkillAssessment(
-                    exact_matches=skill_assessment.get("exact_matches", []),
-                    transferable_skills=skill_assessment.get("transferable_skills", []),
-                    non_technical_skills=skill_assessment.get("non_technical_skills", [])
-                ),
-                experience_highlights=candidate["experience_highlights"],
-                education_highlights=candidate["education_highlights"],
-                gaps=candidate["gaps"],
-                ai_justification=candidate["ai_justification"],
-                resume_content_preview=candidate["resume_content_preview"],
-                questions_generated=candidate["questions_generated"],
-                generated_questions=[
-                    GeneratedQuestion(**q) for q in candidate.get("generated_questions", [])
-                ]
-            ))
-        
-        results.append(ScreeningRunResponse(
-            id=str(run["_id"]),
-            job_details_id=run["job_details_id"],
-            job_role=job_role,
-            job_description=job_description,
-            batch_id=run["batch_id"],
-            run_start_time=run["run_start_time"],
-            run_end_time=run["run_end_time"],
-            time_taken=time_taken,
-            created_at=run["created_at"],
-            candidates=candidates
-        ))
+    for run in runs[:limit]:
+        run["id"] = str(run.pop("_id"))
+        if fields == "full":
+            run["candidates"] = [legacy_candidate(c) for c in run["candidates"]]
+        results.append(run)
     
-    return PaginatedScreeningRunResponse(
-        total=total,
-        page=page,
-        limit=limit,
-        total_pages=total_pages,
-        results=results
-    )
\ No newline at end of file
+    response = {"limit": limit, "next_cursor": next_cursor, "total": total, "results": results}
+    if paged:
+        response["page"] = page or 1
+        response["total_pages"] = math.ceil(total / limit) if total > 0 else 1
+    return response
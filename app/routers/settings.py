@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Form
 from datetime import datetime
-from config import get_settings_collection, get_user_collection, log_activity
+from database import get_settings_collection, get_user_collection
+from services.activity_log import log_activity
 from bson import ObjectId
 from pydantic import BaseModel
 from typing import Optional
@@ -11,6 +12,7 @@ class UserSettings(BaseModel):
     phase1_ranking_number: Optional[int]
     phase2_ranking_number: Optional[int]
     number_of_questions_to_generate: Optional[int]
+    cross_encoder_shortlist_number: Optional[int]
 
 @router.post("/")
 async def update_ranking_settings(
@@ -18,10 +20,14 @@ async def update_ranking_settings(
     phase1_ranking_number: Optional[int] = Form(...),
     phase2_ranking_number: Optional[int] = Form(...),
     number_of_questions_to_generate: Optional[int] = Form(...),
+    cross_encoder_shortlist_number: Optional[int] = Form(None),
 ):
     """
     Update or create ranking settings for a user
     - Stores phase1_ranking_number and phase2_ranking_number in MongoDB
+    - cross_encoder_shortlist_number > phase1 enables cross-encoder re-ranking
+      of that many bi-encoder candidates (0 disables it, omitted keeps the
+      stored value unless it is below the new Phase 1, which disables it)
     - Uses upsert to create if not exists, update if exists
     - Validates input numbers
     """
@@ -45,13 +51,28 @@ async def update_ranking_settings(
             detail="Phase 1 ranking number must be greater than or equal to Phase 2"
         )
     
-    user = get_user_collection().find_one({"_id": ObjectId(user_id)})
+    if cross_encoder_shortlist_number and cross_encoder_shortlist_number < phase1_ranking_number:
+        raise HTTPException(
+            status_code=400,
+            detail="Cross-encoder shortlist number must be 0 (disabled) or at least Phase 1"
+        )
+    
+    user = await get_user_collection().find_one({"_id": ObjectId(user_id)})
     if user is None:
         raise HTTPException(
             status_code=404,
             detail="User not found"
         )
     
+    if cross_encoder_shortlist_number is None:
+        stored = await get_settings_collection().find_one(
+            {"user_id": user_id}, {"cross_encoder_shortlist_number": 1}
+        )
+        cross_encoder_shortlist_number = (stored or {}).get("cross_encoder_shortlist_number")
+        if cross_encoder_shortlist_number and cross_encoder_shortlist_number < phase1_ranking_number:
+            # Would be rejected if sent; a larger Phase 1 turns the re-ranking off instead
+            cross_encoder_shortlist_number = 0
+    
     # Prepare update document
     update_data = {
         "phase1_ranking_number": phase1_ranking_number,
@@ -59,10 +80,12 @@ async def update_ranking_settings(
         "number_of_questions_to_generate": number_of_questions_to_generate,
         "updated_at": datetime.now()
     }
+    if cross_encoder_shortlist_number is not None:
+        update_data["cross_encoder_shortlist_number"] = cross_encoder_shortlist_number
     
     # MongoDB upsert operation
     try:
-        result = get_settings_collection().update_one(
+        result = await get_settings_collection().update_one(
             {"user_id": user_id},
             {"$set": update_data, 
              "$setOnInsert": {"created_at": datetime.now()}},
@@ -90,5 +113,6 @@ async def update_ranking_settings(
         "user_id": user_id,
         "phase1_ranking_number": phase1_ranking_number,
         "phase2_ranking_number": phase2_ranking_number,
-        "number_of_questions_to_generate": number_of_questions_to_generate
+        "number_of_questions_to_generate": number_of_questions_to_generate,
+        "cross_encoder_shortlist_number": cross_encoder_shortlist_number
     }
\ No newline at end of file
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+from pymongo.errors import PyMongoError
+from config import (
+    ACTIVITY_LOG_BATCH_SIZE,
+    ACTIVITY_LOG_FLUSH_SECONDS,
+    ACTIVITY_LOG_MAX_QUEUE,
+    ACTIVITY_LOG_FLUSH_RETRIES
+)
+from database import get_activity_logs_collection
+
+class ActivityLogWriter:
+    """
+    In-process buffered writer for activity_logs.
+    Events are queued without touching Mongo and flushed with insert_many when
+    the batch is full or the flush interval passes. When Mongo is unavailable
+    the queue fills up and further events are dropped and counted.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int, flush_retries: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flush_retries = flush_retries
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.task: Optional[asyncio.Task] = None
+        self.closing = False
+        self.stats = {"written": 0, "dropped": 0, "failed_flushes": 0}
+
+    def log(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    def start(self):
+        if self.task is None:
+            self.closing = False
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background loop and flush everything still queued."""
+        if self.task is None:
+            return
+        self.closing = True
+        await self.task
+        self.task = None
+        remaining = []
+        while not self.queue.empty():
+            remaining.append(self.queue.get_nowait())
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+
+    async def _next_batch(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = []
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while not self.closing:
+            batch = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        for attempt in range(self.flush_retries + 1):
+            try:
+                await get_activity_logs_collection().insert_many(batch, ordered=False)
+                self.stats["written"] += len(batch)
+                return
+            except PyMongoError as e:
+                self.stats["failed_flushes"] += 1
+                print(f"Activity log flush failed ({attempt + 1}/{self.flush_retries + 1}): {str(e)}")
+                if attempt < self.flush_retries and not self.closing:
+                    await asyncio.sleep(min(2 ** attempt, 30))
+        self.stats["dropped"] += len(batch)
+
+_writer: Optional[ActivityLogWriter] = None
+
+def get_writer() -> ActivityLogWriter:
+    global _writer
+    if _writer is None:
+        _writer = ActivityLogWriter(
+            batch_size=ACTIVITY_LOG_BATCH_SIZE,
+            flush_interval=ACTIVITY_LOG_FLUSH_SECONDS,
+            max_queue=ACTIVITY_LOG_MAX_QUEUE,
+            flush_retries=ACTIVITY_LOG_FLUSH_RETRIES
+        )
+    return _writer
+
+def get_stats() -> dict:
+    writer = get_writer()
+    return {**writer.stats, "queued": writer.queue.qsize()}
+
+# Activity logging
+def log_activity(user_id: str, activity_type: str, details: str, ref_id: str = None):
+    """Queue an activity event; never waits on Mongo."""
+    get_writer().log({
+        "user_id": user_id,
+        "type": activity_type,
+        "ref_id": ref_id,
+        "timestamp": datetime.now(),
+        "details": details
+    })
@@ -1,3 +1,120 @@
-async def find_alternatives(employee_id: str):
-    # TODO: Retrieve employee cluster and return top-N similar
-    return {"alternatives": ["emp_123", "emp_456"]}
+import asyncio
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException
+from database import get_resumes_collection
+from ml import vector_index
+from ml.kmeans import normalize_rows
+from ml.embedding_codec import decode_embedding, decode_matrix, HAS_EMBEDDING, EMBEDDING_MODEL_KEY
+
+# Every upload stores its own resume row, so a PDF uploaded for several roles
+# has several copies with identical embeddings. Alternatives are distinct by
+# content hash and never include copies of the queried resume.
+MAX_SEARCH_ROUNDS = 4
+
+def distinct_by_content(matches: List[Tuple[str, float]], hashes: Dict[str, str],
+                        exclude_hash: Optional[str], k: int) -> List[Tuple[str, float]]:
+    """Best match per content hash, best first; rows without a hash are kept."""
+    seen = {exclude_hash} if exclude_hash else set()
+    distinct = []
+    for match_id, score in matches:
+        content_hash = hashes.get(match_id)
+        if content_hash is not None:
+            if content_hash in seen:
+                continue
+            seen.add(content_hash)
+        distinct.append((match_id, score))
+        if len(distinct) == k:
+            break
+    return distinct
+
+async def search_index(resume: Dict, user_id: str, k: int) -> List[Tuple[str, float]]:
+    """Top-k from the vector index, widening the search while copies crowd out distinct matches."""
+    index = vector_index.get_index()
+    query = decode_embedding(resume)
+    resume_id = str(resume["_id"])
+    fetch = 2 * k + 8
+    hashes = {}
+    for _ in range(MAX_SEARCH_ROUNDS):
+        try:
+            # Memory-mapped pages may fault in from disk, so search off the loop
+            matches = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: index.search(query, fetch, user_id=user_id, exclude_ids=[resume_id])
+            )
+        except RuntimeError as e:
+            raise HTTPException(503, str(e))
+        unknown = [ObjectId(match_id) for match_id, _ in matches if match_id not in hashes]
+        if unknown:
+            async for doc in get_resumes_collection().find({"_id": {"$in": unknown}}, {"content_hash": 1}):
+                hashes[str(doc["_id"])] = doc.get("content_hash")
+        distinct = distinct_by_content(matches, hashes, resume.get("content_hash"), k)
+        if len(distinct) == k or len(matches) < fetch:
+            break
+        fetch *= 4
+    return distinct
+
+async def search_cluster(resume: Dict, user_id: str, k: int) -> List[Tuple[str, float]]:
+    """Exact top-k within the resume's talent cluster of the user's pool."""
+    cursor = get_resumes_collection().find(
+        {
+            "user_id": user_id,
+            "cluster_id": resume["cluster_id"],
+            "cluster_version": resume.get("cluster_version"),
+            "_id": {"$ne": resume["_id"]},
+            "embedding_model": EMBEDDING_MODEL_KEY
+        },
+        {"embedding": 1, "embedding_dtype": 1, "content_hash": 1}
+    )
+    members = await cursor.to_list(length=None)
+    if not members:
+        return []
+    scores = normalize_rows(decode_matrix(members)) @ normalize_rows(decode_embedding(resume)[None, :])[0]
+    ranked = [(str(members[i]["_id"]), float(scores[i])) for i in np.argsort(-scores)]
+    hashes = {str(member["_id"]): member.get("content_hash") for member in members}
+    return distinct_by_content(ranked, hashes, resume.get("content_hash"), k)
+
+async def find_alternatives(resume_id: str, user_id: str, k: int = 10, cluster_only: bool = False) -> Dict:
+    """
+    Resumes in the user's pool most similar to the given one, best first.
+    With cluster_only only the resume's talent cluster is scanned.
+    """
+    if not ObjectId.is_valid(resume_id):
+        raise HTTPException(404, "Resume not found")
+    resumes = get_resumes_collection()
+    resume = await resumes.find_one(
+        {"_id": ObjectId(resume_id), "user_id": user_id, **HAS_EMBEDDING},
+        {"embedding": 1, "embedding_dtype": 1, "cluster_id": 1, "cluster_version": 1, "content_hash": 1}
+    )
+    if resume is None:
+        raise HTTPException(404, "Resume not found")
+
+    if cluster_only:
+        if resume.get("cluster_id") is None:
+            raise HTTPException(409, "Resume has not been assigned to a cluster yet")
+        matches = await search_cluster(resume, user_id, k)
+    else:
+        matches = await search_index(resume, user_id, k)
+
+    docs = {}
+    if matches:
+        cursor = resumes.find(
+            {"_id": {"$in": [ObjectId(match_id) for match_id, _ in matches]}},
+            {"candidate_name": 1, "file_name": 1, "email": 1, "batch_id": 1}
+        )
+        docs = {str(doc["_id"]): doc async for doc in cursor}
+    return {
+        "resume_id": resume_id,
+        "cluster_id": resume.get("cluster_id"),
+        "alternatives": [
+            {
+                "resume_id": match_id,
+                "similarity": round(score, 4),
+                "candidate_name": docs[match_id].get("candidate_name"),
+                "file_name": docs[match_id].get("file_name"),
+                "email": docs[match_id].get("email", ""),
+                "batch_id": docs[match_id].get("batch_id")
+            }
+            for match_id, score in matches if match_id in docs
+        ]
+    }
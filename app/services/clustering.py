@@ -0,0 +1,230 @@
+import os
+import time
+import socket
+import asyncio
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from bson import Binary
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from config import (
+    get_clusters_collection,
+    get_resumes_collection,
+    CLUSTER_COUNT,
+    CLUSTER_SAMPLE_SIZE,
+    CLUSTER_REFIT_HOURS,
+    CLUSTER_RELOAD_SECONDS
+)
+from ml.kmeans import MiniBatchKMeans
+from ml.embedding_codec import decode_matrix, HAS_EMBEDDING, EMBEDDING_MODEL_KEY
+
+# Talent clusters: mini-batch k-means over all stored resume embeddings.
+# Centroids live in the clusters collection; every resume carries the
+# cluster_id (and cluster_version) it was assigned on insert, so talent-pool
+# queries can read one cluster instead of every vector. A background task
+# refits periodically; a lease document makes sure only one worker does it.
+# Database work runs on the sync client in executor threads; the refit task
+# awaits each step, so shutdown can stop it between steps (and between
+# reassign batches) and release the lease before the clients are closed.
+
+MODEL_ID = "resume_clusters"
+LEASE_ID = "resume_clusters_refit_lease"
+LEASE_SECONDS = 3600
+CHECK_SECONDS = 600
+REASSIGN_BATCH_SIZE = 1000
+LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+_model_lock = threading.Lock()
+_model: Optional[Tuple[MiniBatchKMeans, int]] = None
+_model_loaded_at = 0.0
+_refit_task: Optional[asyncio.Task] = None
+_stop = threading.Event()
+_wake: Optional[asyncio.Event] = None
+
+def _load_model_doc() -> Optional[dict]:
+    doc = get_clusters_collection().find_one({"_id": MODEL_ID})
+    if doc is None or doc.get("model") != EMBEDDING_MODEL_KEY:
+        return None
+    return doc
+
+def _model_from_doc(doc: dict) -> Tuple[MiniBatchKMeans, int]:
+    centroids = np.frombuffer(doc["centroids"], dtype="<f4").reshape(doc["k"], doc["dim"])
+    return MiniBatchKMeans.from_centroids(centroids), doc["version"]
+
+def get_model() -> Optional[Tuple[MiniBatchKMeans, int]]:
+    """(fitted model, version) cached per process, or None before the first fit."""
+    global _model, _model_loaded_at
+    with _model_lock:
+        if time.monotonic() - _model_loaded_at >= CLUSTER_RELOAD_SECONDS:
+            doc = _load_model_doc()
+            if doc is not None and (_model is None or _model[1] != doc["version"]):
+                _model = _model_from_doc(doc)
+            elif doc is None:
+                _model = None
+            _model_loaded_at = time.monotonic()
+        return _model
+
+def assign(embeddings: np.ndarray) -> Tuple[List[Optional[int]], Optional[int]]:
+    """Nearest-centroid cluster ids for new resumes plus the model version."""
+    model = get_model()
+    if model is None or not len(embeddings):
+        return [None] * len(embeddings), None
+    kmeans, version = model
+    return kmeans.predict(embeddings).tolist(), version
+
+# --- Refit ---
+def _reassign(kmeans: MiniBatchKMeans, version: int) -> int:
+    """Assign resumes on other versions to the new centroids; stops early on shutdown."""
+    resumes = get_resumes_collection()
+    query = {"embedding_model": EMBEDDING_MODEL_KEY, "cluster_version": {"$ne": version}, **HAS_EMBEDDING}
+    updated = 0
+    batch = []
+
+    def flush():
+        labels = kmeans.predict(decode_matrix(batch))
+        result = resumes.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"cluster_id": int(label), "cluster_version": version}})
+            for doc, label in zip(batch, labels)
+        ], ordered=False)
+        return result.modified_count
+
+    for doc in resumes.find(query, {"embedding": 1, "embedding_dtype": 1}, batch_size=REASSIGN_BATCH_SIZE):
+        batch.append(doc)
+        if len(batch) >= REASSIGN_BATCH_SIZE:
+            updated += flush()
+            batch = []
+            if _stop.is_set():
+                return updated
+    if batch:
+        updated += flush()
+    return updated
+
+def _mark_reassigned(version: int):
+    get_clusters_collection().update_one({"_id": MODEL_ID, "version": version}, {"$set": {"reassigned": True}})
+
+def fit_clusters(sample_size: int = CLUSTER_SAMPLE_SIZE,
+                 n_clusters: int = CLUSTER_COUNT) -> Optional[Tuple[MiniBatchKMeans, int]]:
+    """
+    Fit new centroids on a random sample of stored embeddings and persist
+    them; returns (model, version), or None when there are not enough
+    resumes yet or shutdown began during the fit.
+    """
+    sample = list(get_resumes_collection().aggregate([
+        {"$match": {"embedding_model": EMBEDDING_MODEL_KEY, **HAS_EMBEDDING}},
+        {"$sample": {"size": sample_size}},
+        {"$project": {"embedding": 1, "embedding_dtype": 1}}
+    ], allowDiskUse=True))
+    if len(sample) < n_clusters:
+        print(f"Clustering: {len(sample)} resumes, need at least {n_clusters} to fit")
+        return None
+
+    start = time.time()
+    kmeans = MiniBatchKMeans(n_clusters).fit(decode_matrix(sample))
+    if _stop.is_set():
+        return None
+    previous = _load_model_doc()
+    version = (previous["version"] + 1) if previous else 1
+    get_clusters_collection().update_one({"_id": MODEL_ID}, {"$set": {
+        "model": EMBEDDING_MODEL_KEY,
+        "version": version,
+        "k": n_clusters,
+        "dim": int(kmeans.centroids.shape[1]),
+        "centroids": Binary(kmeans.centroids.astype("<f4").tobytes()),
+        "sample_size": len(sample),
+        "fitted_at": datetime.now(),
+        "reassigned": False
+    }}, upsert=True)
+    print(f"Clustering: fitted {n_clusters} clusters on {len(sample)} resumes in {time.time() - start:.1f}s (v{version})")
+    return kmeans, version
+
+async def _wait_for_stop(seconds: float) -> bool:
+    """Sleep up to `seconds`; returns True as soon as shutdown has begun."""
+    try:
+        await asyncio.wait_for(_wake.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+    return _stop.is_set()
+
+async def reassign_all(kmeans: MiniBatchKMeans, version: int) -> int:
+    """Move every resume to `version`, then again once workers stop assigning with older centroids."""
+    loop = asyncio.get_running_loop()
+    updated = await loop.run_in_executor(None, _reassign, kmeans, version)
+    # Workers keep assigning with the old centroids until their cache expires
+    if await _wait_for_stop(CLUSTER_RELOAD_SECONDS):
+        return updated
+    updated += await loop.run_in_executor(None, _reassign, kmeans, version)
+    if not _stop.is_set():
+        await loop.run_in_executor(None, _mark_reassigned, version)
+    print(f"Clustering: reassigned {updated} resumes to v{version}")
+    return updated
+
+def _acquire_lease() -> bool:
+    now = datetime.now()
+    try:
+        get_clusters_collection().find_one_and_update(
+            {"_id": LEASE_ID, "lease_until": {"$lt": now}},
+            {"$set": {"lease_until": now + timedelta(seconds=LEASE_SECONDS), "owner": LEASE_OWNER}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # Lease document exists and is still held by another worker
+        return False
+
+def _release_lease():
+    get_clusters_collection().update_one(
+        {"_id": LEASE_ID, "owner": LEASE_OWNER},
+        {"$set": {"lease_until": datetime.min}}
+    )
+
+async def refit_if_due() -> Optional[int]:
+    """
+    Refit when the centroids are older than CLUSTER_REFIT_HOURS, or finish
+    the reassignment a stopped refit left behind. Returns the version the
+    resumes were moved to, or None when nothing was due.
+    """
+    loop = asyncio.get_running_loop()
+    doc = await loop.run_in_executor(None, _load_model_doc)
+    fresh = doc is not None and doc["fitted_at"] > datetime.now() - timedelta(hours=CLUSTER_REFIT_HOURS)
+    if fresh and doc.get("reassigned", True):
+        return None
+    if not await loop.run_in_executor(None, _acquire_lease):
+        return None
+    try:
+        fitted = _model_from_doc(doc) if fresh else await loop.run_in_executor(None, fit_clusters)
+        if fitted is None:
+            return None
+        await reassign_all(*fitted)
+        return fitted[1]
+    finally:
+        await loop.run_in_executor(None, _release_lease)
+
+async def _refit_periodically():
+    while not _stop.is_set():
+        try:
+            await refit_if_due()
+        except Exception as e:
+            print(f"Clustering refit failed: {str(e)}")
+        await _wait_for_stop(CHECK_SECONDS)
+
+def start_refit_task():
+    global _refit_task, _wake
+    if CLUSTER_REFIT_HOURS > 0 and _refit_task is None:
+        _stop.clear()
+        _wake = asyncio.Event()
+        _refit_task = asyncio.create_task(_refit_periodically())
+
+async def stop_refit_task():
+    """Stop refitting after the step in progress; the lease is released before this returns."""
+    global _refit_task
+    if _refit_task is not None:
+        _stop.set()
+        _wake.set()
+        await asyncio.gather(_refit_task, return_exceptions=True)
+        _refit_task = None
+
+def get_stats() -> dict:
+    model = _model
+    return {"clusters": model[0].n_clusters if model else 0, "version": model[1] if model else None}
@@ -0,0 +1,70 @@
+import re
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List
+from pymongo import UpdateOne
+from config import LLM_CACHE_TTL_DAYS
+from database import get_llm_cache_collection
+
+# LLM results are cached on (kind, normalized JD hash, resume hash, prompt
+# version, model). Documents carry an expires_at date evicted by a TTL index
+# (see indexes.py).
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+def _record(hits: int, misses: int):
+    with _stats_lock:
+        _stats["hits"] += hits
+        _stats["misses"] += misses
+
+def get_stats() -> Dict:
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / total, 4) if total else 0.0}
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def normalize_jd(jd_text: str) -> str:
+    """Collapse whitespace and case so cosmetic JD edits still hit the cache."""
+    return re.sub(r"\s+", " ", jd_text).strip().lower()
+
+def make_key(kind: str, jd_hash: str, resume_hash: str, prompt_version: str, model: str) -> str:
+    return text_hash("|".join([kind, jd_hash, resume_hash, prompt_version, model]))
+
+async def get_many(keys: List[str]) -> Dict[str, dict]:
+    """Return cached results for the given keys in one query."""
+    if not keys:
+        return {}
+    cursor = get_llm_cache_collection().find(
+        {"_id": {"$in": list(set(keys))}, "expires_at": {"$gt": datetime.now()}},
+        {"result": 1}
+    )
+    found = {doc["_id"]: doc["result"] async for doc in cursor}
+    _record(sum(1 for k in keys if k in found), sum(1 for k in keys if k not in found))
+    return found
+
+async def put_many(entries: Dict[str, dict], kind: str, prompt_version: str, model: str):
+    """Upsert results so forced re-analysis refreshes existing entries."""
+    if not entries:
+        return
+    now = datetime.now()
+    expires_at = now + timedelta(days=LLM_CACHE_TTL_DAYS)
+    await get_llm_cache_collection().bulk_write([
+        UpdateOne(
+            {"_id": key},
+            {"$set": {
+                "kind": kind,
+                "prompt_version": prompt_version,
+                "model": model,
+                "result": result,
+                "created_at": now,
+                "expires_at": expires_at
+            }},
+            upsert=True
+        )
+        for key, result in entries.items()
+    ], ordered=False)
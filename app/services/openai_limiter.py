@@ -0,0 +1,186 @@
+import time
+import random
+import asyncio
+from typing import Optional
+from openai import (
+    AsyncOpenAI,
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError
+)
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_REQUESTS_PER_MINUTE,
+    OPENAI_TOKENS_PER_MINUTE,
+    OPENAI_MAX_CONCURRENCY,
+    OPENAI_MAX_RETRIES
+)
+
+# Shared limiter for every OpenAI call in the worker: token buckets on
+# requests/min and tokens/min, AIMD concurrency driven by 429s and the
+# x-ratelimit-* response headers, and jittered exponential backoff.
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+LOW_HEADROOM_FRACTION = 0.1  # shrink concurrency when under 10% of the quota remains
+
+class TokenBucket:
+    """Refills continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def debit(self, amount: float):
+        """Charge extra usage discovered after the call (may go negative)."""
+        self._refill()
+        self.tokens -= amount
+
+    def drain(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+class AdaptiveConcurrency:
+    """Additive-increase / multiplicative-decrease cap on in-flight calls."""
+
+    def __init__(self, maximum: int, minimum: int = 1):
+        self.maximum = float(maximum)
+        self.minimum = float(minimum)
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def increase(self):
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def decrease(self, factor: float = 0.5):
+        self.limit = max(self.minimum, self.limit * factor)
+
+def _header_float(headers, name: str) -> Optional[float]:
+    try:
+        value = headers.get(name)
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    retry_ms = _header_float(response.headers, "retry-after-ms")
+    if retry_ms is not None:
+        return retry_ms / 1000.0
+    return _header_float(response.headers, "retry-after")
+
+def estimate_tokens(messages, max_tokens: Optional[int]) -> int:
+    """Rough prompt estimate (~4 characters per token) plus the completion allowance."""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return prompt_chars // 4 + (max_tokens or 1000)
+
+class OpenAIRateLimiter:
+    def __init__(self, client: AsyncOpenAI, requests_per_minute: int, tokens_per_minute: int,
+                 max_concurrency: int, max_retries: int):
+        self.client = client
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+
+    def _observe_headers(self, headers):
+        remaining = _header_float(headers, "x-ratelimit-remaining-requests")
+        limit = _header_float(headers, "x-ratelimit-limit-requests")
+        remaining_tokens = _header_float(headers, "x-ratelimit-remaining-tokens")
+        limit_tokens = _header_float(headers, "x-ratelimit-limit-tokens")
+        low_requests = remaining is not None and limit and remaining / limit < LOW_HEADROOM_FRACTION
+        low_tokens = remaining_tokens is not None and limit_tokens and remaining_tokens / limit_tokens < LOW_HEADROOM_FRACTION
+        if low_requests or low_tokens:
+            self.concurrency.decrease(0.75)
+        else:
+            self.concurrency.increase()
+
+    async def chat_completion(self, **kwargs):
+        """
+        chat.completions.create with rate limiting and retries.
+        Raises the last error once retries are exhausted or on non-retryable errors.
+        """
+        estimate = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+        attempt = 0
+        while True:
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimate)
+            await self.concurrency.acquire()
+            try:
+                raw = await self.client.chat.completions.with_raw_response.create(**kwargs)
+                self._observe_headers(raw.headers)
+                completion = raw.parse()
+                usage = getattr(completion, "usage", None)
+                if usage is not None and usage.total_tokens > estimate:
+                    self.tokens.debit(usage.total_tokens - estimate)
+                return completion
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, RateLimitError):
+                    self.concurrency.decrease()
+                    self.requests.drain()
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    # Full jitter exponential backoff
+                    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                print(f"OpenAI {type(e).__name__}, retry {attempt}/{self.max_retries} in {delay:.1f}s "
+                      f"(concurrency limit {self.concurrency.limit:.1f})")
+            finally:
+                await self.concurrency.release()
+            # Back off without holding a concurrency slot
+            await asyncio.sleep(delay)
+
+_limiter: Optional[OpenAIRateLimiter] = None
+
+def get_limiter() -> OpenAIRateLimiter:
+    global _limiter
+    if _limiter is None:
+        # Retries are handled here, so the SDK's own retry loop is disabled
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
+        _limiter = OpenAIRateLimiter(
+            client,
+            requests_per_minute=OPENAI_REQUESTS_PER_MINUTE,
+            tokens_per_minute=OPENAI_TOKENS_PER_MINUTE,
+            max_concurrency=OPENAI_MAX_CONCURRENCY,
+            max_retries=OPENAI_MAX_RETRIES
+        )
+    return _limiter
+
+async def chat_completion(**kwargs):
+    return await get_limiter().chat_completion(**kwargs)
@@ -1,3 +1,1372 @@
-async def screen_resume(file):
-    # TODO: Add logic for parsing and scoring
-    return {"score": 0.85, "match": True}
\ No newline at end of file
+import re
+import time
+import torch
+import numpy as np
+import json
+import asyncio
+import contextlib
+from functools import partial
+from typing import AsyncIterator, BinaryIO, List, Dict, Optional, Tuple
+from fastapi import HTTPException
+from datetime import datetime, timedelta
+from config import EMBED_BATCH_SIZE, RANK_JOB_CONCURRENCY, RANK_PROGRESS_FLUSH_SECONDS
+from database import (
+    get_job_details_collection,
+    get_resumes_collection,
+    get_batches_collection,
+    get_screening_runs_collection,
+    get_screening_run_rankings_collection,
+    get_settings_collection
+)
+from services.activity_log import log_activity
+from bson import ObjectId
+from pymongo import UpdateOne
+from ml import model_registry, vector_index
+from ml.encoding import encode_texts, top_k_by_similarity, cross_encoder_scores
+from ml.embedding_codec import encode_embedding, decode_embedding
+from models.ranking import Candidate
+from utils.pdf_pool import extract_texts
+from utils.ingestion import create_workdir, remove_workdir, iter_upload_pdfs
+from utils import condense
+from services import resume_cache, llm_cache, clustering
+from services.openai_limiter import chat_completion
+
+# Resume ranking pipeline shared by the synchronous /rank/ endpoint and the
+# background job mode. Phases: extraction -> embedding + similarity shortlist
+# -> LLM analysis -> final results.
+
+class RankingProgress:
+    """
+    Per-phase counters for one run. When a run_id is given they are written to
+    the screening run document (throttled to one write per flush interval,
+    plus every phase change) so clients can poll a background job.
+    """
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id
+        self.phase = "queued"
+        self.counters = {
+            "files_extracted": 0,
+            "cache_hits": 0,
+            "extraction_errors": 0,
+            "candidates_embedded": 0,
+            "candidates_total": 0,
+            "llm_analyses_done": 0,
+            "llm_analyses_total": 0
+        }
+        self.last_flush = 0.0
+
+    async def set_phase(self, phase: str, **counters):
+        self.phase = phase
+        self.counters.update(counters)
+        await self.flush()
+
+    async def add(self, counter: str, amount: int = 1):
+        self.counters[counter] += amount
+        if time.monotonic() - self.last_flush >= RANK_PROGRESS_FLUSH_SECONDS:
+            await self.flush()
+
+    async def flush(self):
+        self.last_flush = time.monotonic()
+        if self.run_id is None:
+            return
+        await get_screening_runs_collection().update_one(
+            {"_id": ObjectId(self.run_id)},
+            {"$set": {
+                "status": "running",
+                "progress": {"phase": self.phase, **self.counters},
+                "updated_at": datetime.now()
+            }}
+        )
+
+# --- Extraction Helpers ---
+def extract_contact_details(text: str) -> Dict[str, str]:
+    """Extract email and phone via regex."""
+    emails = re.findall(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", text)
+    phones = re.findall(r"\+?\d[\d\s().-]{8,}\d", text)
+    return {"email": emails[0] if emails else "", "mobile_number": phones[0] if phones else ""}
+
+# Words that mark a capitalized first line as a heading, job title, place or
+# contact label rather than a personal name
+NAME_HEADER_WORDS = {
+    "resume", "curriculum", "vitae", "cv", "profile", "summary", "contact", "objective",
+    "experience", "education", "skills", "engineer", "developer", "manager", "analyst",
+    "senior", "junior", "lead", "principal", "head", "chief", "intern", "trainee", "associate",
+    "assistant", "specialist", "consultant", "scientist", "architect", "designer", "administrator",
+    "coordinator", "director", "officer", "executive", "technician", "data", "software",
+    "machine", "learning", "full", "stack", "frontend", "backend", "product", "project", "marketing",
+    "sales", "email", "e-mail", "phone", "mobile", "tel", "address", "linkedin", "github", "portfolio",
+    "city", "street", "road", "avenue", "state", "county", "district", "province", "new", "san", "los",
+    "united", "kingdom", "states", "republic"
+}
+# Placeholders the analysis returns when it found no name
+UNKNOWN_NAMES = {"", "unknown", "n/a", "na", "none", "not provided", "not found", "candidate"}
+
+def extract_candidate_name(text: str) -> Optional[str]:
+    """
+    Fallback name heuristic: the first non-empty line when it looks like a
+    2-4 word personal name. Returns None when not confident.
+    """
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        words = line.split()
+        if not 2 <= len(words) <= 4:
+            return None
+        if any(w.lower().strip(".,:") in NAME_HEADER_WORDS for w in words):
+            return None
+        if all(re.fullmatch(r"[A-Z][A-Za-z'\-]*\.?", w) for w in words):
+            return " ".join(w.title() if w.isupper() else w for w in words)
+        return None
+    return None
+
+# --- Async LLM Functions ---
+LLM_MODEL = "gpt-4o-mini"
+# Bump when the prompt changes so cached results from the old prompt are ignored
+ANALYSIS_PROMPT_VERSION = "2"
+
+FAILED_ANALYSIS = {
+    "analysis_status": "failed",
+    "candidate_name": "Unknown",
+    "overall_summary": "Analysis failed",
+    "fit_score": None,
+    "technical_skills": {"exact_matches": [], "transferable_skills": []},
+    "non_technical_skills": [],
+    "experience_highlights": "",
+    "education_highlights": "",
+    "justification": "",
+    "gaps": []
+}
+
+async def analyze_one_resume_with_llm(jd_text: str, resume_text: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """Analyze one candidate with LLM (async). Returns (analysis, error)."""
+    SYSTEM_PROMPT = """
+    You are an expert HR analyst. Analyze a candidate's resume against a job description and provide:
+    1. The candidate's full name ("Unknown" if not found)
+    2. Overall summary (1-2 sentences)
+    3. Comprehensive fit score (0-100%) 
+    4. Skill highlights (technical and non-technical)
+    5. Experience highlights
+    6. Education highlights
+    7. Justification for the fit score
+    8. List of identified skill/experience gaps
+    
+    Output format (JSON):
+    {
+        "candidate_name": "",
+        "overall_summary": "",
+        "fit_score": 0,
+        "technical_skills": {
+            "exact_matches": [],
+            "transferable_skills": []
+        },
+        "non_technical_skills": [],
+        "experience_highlights": "",
+        "education_highlights": "",
+        "justification": "",
+        "gaps": []
+    }
+    """
+    
+    try:
+        response = await chat_completion(
+            model=LLM_MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Job Description:\n{jd_text}\n\nResume:\n{resume_text}"}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.0
+        )
+        
+        analysis = json.loads(response.choices[0].message.content)
+        analysis["analysis_status"] = "completed"
+        return analysis, None
+    except Exception as e:
+        print(f"LLM Error: {str(e)}")
+        return None, f"{type(e).__name__}: {str(e)}"
+
+async def iter_llm_analyses(jd_text: str, resume_texts: List[str],
+                            use_cache: bool = True) -> AsyncIterator[Tuple[int, Dict]]:
+    """
+    Yield (index, analysis) for each resume as soon as its analysis is ready:
+    cached analyses of the same JD/resume pair first, then LLM calls in
+    completion order. Failed analyses are reported per candidate and not
+    cached, so they are retried next time.
+    """
+    jd_hash = llm_cache.text_hash(llm_cache.normalize_jd(jd_text))
+    keys = [
+        llm_cache.make_key("analysis", jd_hash, llm_cache.text_hash(text), ANALYSIS_PROMPT_VERSION, LLM_MODEL)
+        for text in resume_texts
+    ]
+    cached = await llm_cache.get_many(keys) if use_cache else {}
+    
+    misses = [i for i, key in enumerate(keys) if key not in cached]
+    print(f"  LLM cache: {len(keys) - len(misses)} hits, {len(misses)} calls needed")
+    for i, key in enumerate(keys):
+        if key in cached:
+            yield i, dict(cached[key])
+    
+    async def analyze(i: int):
+        analysis, error = await analyze_one_resume_with_llm(jd_text, resume_texts[i])
+        return i, analysis, error
+    
+    tasks = [asyncio.create_task(analyze(i)) for i in misses]
+    fresh = {}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            i, analysis, error = await next_done
+            if analysis is None:
+                yield i, dict(FAILED_ANALYSIS, error=error)
+            else:
+                fresh[keys[i]] = analysis
+                yield i, dict(analysis)
+    finally:
+        # Consumer went away early (e.g. a streaming client disconnected)
+        for task in tasks:
+            task.cancel()
+        await llm_cache.put_many(fresh, "analysis", ANALYSIS_PROMPT_VERSION, LLM_MODEL)
+
+async def analyze_with_llm_batch(jd_text: str, resume_texts: List[str], use_cache: bool = True) -> List[Dict]:
+    """Batch analyze candidates with LLM; results are in input order."""
+    analyses = [None] * len(resume_texts)
+    async for i, analysis in iter_llm_analyses(jd_text, resume_texts, use_cache):
+        analyses[i] = analysis
+    return analyses
+
+# --- Database Helpers ---
+def build_resume_doc(user_id: str, batch_id: str, file_name: str, file_type: str,
+                     content: str, embedding: np.ndarray, candidate_name: str,
+                     content_hash: str = None, contact: Dict[str, str] = None,
+                     cluster_id: int = None, cluster_version: int = None,
+                     condensed: Dict = None, resume_id: str = None) -> dict:
+    """Fully populated resume document with a client-side ObjectId."""
+    contact = contact or {}
+    return {
+        "_id": ObjectId(resume_id) if resume_id else ObjectId(),
+        "user_id": user_id,
+        "batch_id": batch_id,
+        "file_name": file_name,
+        "file_type": file_type,
+        "content": content,
+        "content_hash": content_hash,
+        **(condensed or {}),
+        "email": contact.get("email", ""),
+        "mobile_number": contact.get("mobile_number", ""),
+        **encode_embedding(embedding),
+        "embedding_model": resume_cache.EMBEDDING_MODEL_KEY,
+        "cluster_id": cluster_id,
+        "cluster_version": cluster_version,
+        "candidate_name": candidate_name,
+        "created_at": datetime.now()
+    }
+
+async def store_resumes(resume_docs: List[dict]) -> List[str]:
+    """Insert all resume documents of a batch in one round-trip."""
+    if resume_docs:
+        await get_resumes_collection().insert_many(resume_docs, ordered=False)
+    return [str(doc["_id"]) for doc in resume_docs]
+
+def index_resumes(user_id: str, resume_ids: List[str], embeddings: List[np.ndarray]):
+    """Append new resumes to the alternatives vector index; never fails the run."""
+    try:
+        vector_index.get_index().add(resume_ids, [user_id] * len(resume_ids), np.stack(embeddings))
+    except Exception as e:
+        print(f"Vector index update failed: {str(e)}")
+
+async def update_candidate_names(names_by_resume_id: Dict[str, str]):
+    """Set candidate names computed in phase 3 with one unordered bulk write."""
+    if not names_by_resume_id:
+        return
+    await get_resumes_collection().bulk_write([
+        UpdateOne({"_id": ObjectId(resume_id)}, {"$set": {"candidate_name": name}})
+        for resume_id, name in names_by_resume_id.items()
+    ], ordered=False)
+
+async def store_condensed(candidates: List[dict]):
+    """Persist condensed fields recomputed for already stored resumes."""
+    if not candidates:
+        return
+    await get_resumes_collection().bulk_write([
+        UpdateOne({"_id": ObjectId(c["resume_id"])}, {"$set": c["condensed"]})
+        for c in candidates
+    ], ordered=False)
+
+async def store_embeddings(user_id: str, candidates: List[dict]):
+    """
+    Persist embeddings re-encoded for already stored resumes (e.g. after an
+    embedding model change) with their model key and talent cluster, and
+    index them, so later runs reuse them.
+    """
+    if not candidates:
+        return
+    loop = asyncio.get_running_loop()
+    embeddings = [c["embedding"] for c in candidates]
+    cluster_ids, cluster_version = await loop.run_in_executor(None, clustering.assign, np.stack(embeddings))
+    await get_resumes_collection().bulk_write([
+        UpdateOne({"_id": ObjectId(c["resume_id"])}, {"$set": {
+            **encode_embedding(c["embedding"]),
+            "embedding_model": resume_cache.EMBEDDING_MODEL_KEY,
+            "cluster_id": cluster_id,
+            "cluster_version": cluster_version
+        }})
+        for c, cluster_id in zip(candidates, cluster_ids)
+    ], ordered=False)
+    await loop.run_in_executor(None, index_resumes, user_id, [c["resume_id"] for c in candidates], embeddings)
+
+async def create_job_detail(user_id: str, job_role: str, job_description: str) -> str:
+    job_doc = {
+        "user_id": user_id,
+        "job_role": job_role,
+        "job_description": job_description,
+        "created_at": datetime.now(),
+        "updated_at": datetime.now()
+    }
+    result = await get_job_details_collection().insert_one(job_doc)
+    return str(result.inserted_id)
+
+async def create_batch(user_id: str, job_details_id: str, resume_ids: List[str], batch_id: str = None) -> str:
+    batch_doc = {
+        "_id": ObjectId(batch_id) if batch_id else ObjectId(),
+        "user_id": user_id,
+        "job_details_id": job_details_id,
+        "resumes": resume_ids,
+        "created_at": datetime.now()
+    }
+    result = await get_batches_collection().insert_one(batch_doc)
+    return str(result.inserted_id)
+
+async def create_pending_run(user_id: str, job_role: str) -> str:
+    """Insert the run document of a background job before any work starts."""
+    now = datetime.now()
+    run_doc = {
+        "user_id": user_id,
+        "job_role": job_role,
+        "status": "queued",
+        "progress": {"phase": "queued"},
+        "created_at": now,
+        "updated_at": now
+    }
+    result = await get_screening_runs_collection().insert_one(run_doc)
+    return str(result.inserted_id)
+
+async def mark_run_failed(run_id: str, error: str):
+    now = datetime.now()
+    await get_screening_runs_collection().update_one(
+        {"_id": ObjectId(run_id)},
+        {"$set": {"status": "failed", "error": error, "progress.phase": "failed",
+                  "run_end_time": now, "updated_at": now}}
+    )
+
+async def store_screening_run(run_id: str, user_id: str, job_details_id: str, batch_ids: List[str],
+                              run_start: datetime, run_end: datetime, candidates: List[dict],
+                              window: dict) -> str:
+    """
+    Write the finished run; upserts so background jobs complete their pending
+    document. batch_id is the first screened batch (the only one for uploads).
+    """
+    window = await store_rankings(run_id, window)
+    run_doc = {
+        "user_id": user_id,
+        "job_details_id": job_details_id,
+        "batch_id": batch_ids[0],
+        "batch_ids": batch_ids,
+        "run_start_time": run_start,
+        "run_end_time": run_end,
+        "candidates": candidates,
+        "window": window,
+        "status": "completed",
+        "progress.phase": "completed",
+        "updated_at": datetime.now()
+    }
+    await get_screening_runs_collection().update_one(
+        {"_id": ObjectId(run_id)},
+        {"$set": run_doc, "$setOnInsert": {"created_at": datetime.now()}},
+        upsert=True
+    )
+    return run_id
+
+# --- Pipeline ---
+async def get_phase_limits(user_id: str) -> Tuple[int, int, int]:
+    """
+    Phase 1/2 ranking numbers from the user's settings, plus the width of the
+    bi-encoder shortlist the cross-encoder re-ranks (0 when disabled).
+    """
+    user_settings = await get_settings_collection().find_one({"user_id": user_id})
+    
+    # Set default values if settings not found
+    phase1_limit = user_settings.get("phase1_ranking_number", 20) if user_settings else 20
+    phase2_limit = user_settings.get("phase2_ranking_number", 10) if user_settings else 10
+    rerank_limit = (user_settings.get("cross_encoder_shortlist_number") or 0) if user_settings else 0
+    validate_phase_limits(phase1_limit, phase2_limit)
+    return phase1_limit, phase2_limit, rerank_limit
+
+def validate_phase_limits(phase1_limit: int, phase2_limit: int):
+    if phase1_limit <= 0 or phase2_limit <= 0:
+        raise HTTPException(400, "Ranking numbers must be positive values")
+    if phase1_limit < phase2_limit:
+        raise HTTPException(400, "Phase1 limit must be greater than or equal to Phase2 limit")
+
+def condense_candidates(candidate_data: List[dict]) -> List[dict]:
+    """
+    Fill in the condensed resume fields where the stored ones are missing or
+    stale. Returns the candidates that were condensed now.
+    """
+    condensed_now = []
+    raw_tokens = condensed_tokens = 0
+    for candidate in candidate_data:
+        if candidate["condensed"] is None:
+            candidate["condensed"] = condense.condensed_fields(candidate["resume_text"])
+            condensed_now.append(candidate)
+        raw_tokens += candidate["condensed"]["content_tokens"]
+        condensed_tokens += candidate["condensed"]["condensed_tokens"]
+    print(f"  Condensed resumes: {raw_tokens} -> {condensed_tokens} tokens")
+    return condensed_now
+
+async def extract_candidates(uploads: List[Tuple[str, BinaryIO]], progress: RankingProgress) -> List[dict]:
+    """
+    Phase 1: candidate dicts (filename, resume_text, contact, content_hash,
+    embedding) for every readable PDF in the uploads.
+    """
+    await progress.set_phase("extracting")
+    candidate_data = []
+    
+    # Uploads are spooled to disk and ZIP members are read lazily, so memory is
+    # bounded by the extraction in-flight window rather than the archive size.
+    # PDFs seen before (same content hash) skip extraction and encoding.
+    cache_hits = []
+    workdir = create_workdir()
+    try:
+        new_pdfs = resume_cache.split_cached(iter_upload_pdfs(uploads, workdir), cache_hits)
+        async for pdf, resume_text, error in extract_texts(new_pdfs):
+            if error:
+                print(f"    Error processing {pdf.name}: {error}")
+                await progress.add("extraction_errors")
+                continue
+            if not resume_text.strip():
+                print(f"    Warning: Empty PDF content for {pdf.name}")
+                await progress.add("extraction_errors")
+                continue
+            
+            candidate_data.append({
+                "filename": pdf.name,
+                "resume_text": resume_text,
+                "contact": extract_contact_details(resume_text),
+                "content_hash": pdf.content_hash,
+                "embedding": None,
+                "condensed": None
+            })
+            await progress.add("files_extracted")
+    finally:
+        remove_workdir(workdir)
+    
+    stamp = condense.condense_stamp()
+    for pdf, cached in cache_hits:
+        candidate_data.append({
+            "filename": pdf.name,
+            "resume_text": cached["content"],
+            "contact": {"email": cached.get("email", ""), "mobile_number": cached.get("mobile_number", "")},
+            "content_hash": pdf.content_hash,
+            "embedding": cached["embedding"],
+            "condensed": ({field: cached[field] for field in condense.CONDENSED_FIELDS}
+                          if cached.get("condensed_version") == stamp else None)
+        })
+    await progress.add("cache_hits", len(cache_hits))
+    print(f"  Resume cache: {len(cache_hits)} hits, {len(candidate_data) - len(cache_hits)} newly extracted")
+    
+    # Token-budgeted form used in LLM prompts, computed once per resume
+    await asyncio.get_running_loop().run_in_executor(None, condense_candidates, candidate_data)
+    return candidate_data
+
+STORED_CANDIDATE_FIELDS = {
+    "file_name": 1, "content": 1, "content_hash": 1, "email": 1, "mobile_number": 1,
+    "embedding": 1, "embedding_dtype": 1, "embedding_model": 1, **{field: 1 for field in condense.CONDENSED_FIELDS}
+}
+
+def stored_candidate(doc: dict, resume_id: str, batch_id: str, stamp: str) -> dict:
+    """Candidate dict for a stored resume; embeddings from another model are left for embed_candidates."""
+    reusable = doc.get("embedding_model") == resume_cache.EMBEDDING_MODEL_KEY and len(doc.get("embedding") or [])
+    return {
+        "resume_id": resume_id,
+        "batch_id": batch_id,
+        "filename": doc["file_name"],
+        "resume_text": doc["content"],
+        "contact": {"email": doc.get("email", ""), "mobile_number": doc.get("mobile_number", "")},
+        "content_hash": doc.get("content_hash"),
+        "embedding": decode_embedding(doc) if reusable else None,
+        "condensed": ({field: doc[field] for field in condense.CONDENSED_FIELDS}
+                      if doc.get("condensed_version") == stamp else None)
+    }
+
+async def load_batch_candidates(user_id: str, batch_ids: List[str], progress: RankingProgress) -> List[dict]:
+    """
+    Phase 1 for re-ranks: candidate dicts for the stored resumes of the user's
+    batches, in batch order. A resume uploaded in several batches is screened
+    once. Embeddings from another model are left for embed_candidates.
+    """
+    await progress.set_phase("loading")
+    batches = {
+        str(batch["_id"]): batch
+        async for batch in get_batches_collection().find(
+            {"_id": {"$in": [ObjectId(b) for b in batch_ids]}, "user_id": user_id}, {"resumes": 1}
+        )
+    }
+    missing = [b for b in batch_ids if b not in batches]
+    if missing:
+        raise HTTPException(404, f"Batch not found: {', '.join(missing)}")
+    batch_of = {}
+    for batch_id in batch_ids:
+        for resume_id in batches[batch_id]["resumes"]:
+            batch_of.setdefault(resume_id, batch_id)
+    docs = {
+        str(doc["_id"]): doc
+        async for doc in get_resumes_collection().find(
+            {"_id": {"$in": [ObjectId(r) for r in batch_of]}, "user_id": user_id}, STORED_CANDIDATE_FIELDS
+        )
+    }
+    
+    stamp = condense.condense_stamp()
+    candidate_data = []
+    seen_hashes = set()
+    for resume_id, batch_id in batch_of.items():
+        doc = docs.get(resume_id)
+        if doc is None or doc.get("content_hash") in seen_hashes:
+            continue
+        if doc.get("content_hash"):
+            seen_hashes.add(doc["content_hash"])
+        candidate_data.append(stored_candidate(doc, resume_id, batch_id, stamp))
+    await progress.add("cache_hits", len(candidate_data))
+    print(f"  Loaded {len(candidate_data)} stored resumes from {len(batch_ids)} batches")
+    
+    condensed_now = await asyncio.get_running_loop().run_in_executor(None, condense_candidates, candidate_data)
+    await store_condensed(condensed_now)
+    return candidate_data
+
+async def embed_candidates(candidate_data: List[dict], progress: RankingProgress):
+    """Encode the resumes that have no usable stored embedding."""
+    to_encode = [c for c in candidate_data if c["embedding"] is None]
+    await progress.set_phase("embedding", candidates_total=len(candidate_data),
+                             candidates_embedded=len(candidate_data) - len(to_encode))
+    DEVICE = model_registry.get_model_device()
+    bi_encoder = model_registry.get_bi_encoder()
+    
+    # Encoding runs in a worker thread so the event loop keeps serving
+    # status polls and other requests meanwhile
+    print(f"  Encoding {len(to_encode)} resumes in batches of {EMBED_BATCH_SIZE}...")
+    new_embs = await asyncio.get_running_loop().run_in_executor(
+        None, encode_texts, bi_encoder, [c["resume_text"] for c in to_encode], DEVICE
+    )
+    for candidate, embedding in zip(to_encode, new_embs.cpu().numpy()):
+        candidate["embedding"] = embedding
+    await progress.add("candidates_embedded", len(to_encode))
+
+async def store_candidates(user_id: str, job_details_id: str, candidate_data: List[dict],
+                           batch_id: str = None) -> str:
+    """
+    Insert embedded candidates as a new batch, or append them to `batch_id`,
+    and index them; returns the batch_id. Keeps resume ids already assigned
+    to the candidates.
+    """
+    loop = asyncio.get_running_loop()
+    # Nearest talent cluster, assigned on insert without refitting
+    cluster_ids, cluster_version = await loop.run_in_executor(
+        None, clustering.assign, np.stack([c["embedding"] for c in candidate_data])
+    )
+    
+    # Batch id is generated client-side so resumes are inserted fully populated
+    # in a single insert_many instead of insert + per-field updates
+    new_batch = batch_id is None
+    batch_id = batch_id or str(ObjectId())
+    resume_docs = [
+        build_resume_doc(
+            user_id=user_id,
+            batch_id=batch_id,
+            file_name=candidate["filename"],
+            file_type="pdf",
+            content=candidate["resume_text"],
+            embedding=candidate["embedding"],
+            candidate_name="Pending",
+            content_hash=candidate["content_hash"],
+            contact=candidate["contact"],
+            cluster_id=cluster_id,
+            cluster_version=cluster_version,
+            condensed=candidate["condensed"],
+            resume_id=candidate.get("resume_id")
+        )
+        for candidate, cluster_id in zip(candidate_data, cluster_ids)
+    ]
+    resume_ids = await store_resumes(resume_docs)
+    for candidate, resume_id in zip(candidate_data, resume_ids):
+        candidate["resume_id"] = resume_id
+        candidate["batch_id"] = batch_id
+    await loop.run_in_executor(None, index_resumes, user_id, resume_ids, [c["embedding"] for c in candidate_data])
+    
+    if new_batch:
+        await create_batch(user_id, job_details_id, resume_ids, batch_id=batch_id)
+        log_activity(user_id, "batch_created", f"Created batch with {len(resume_ids)} resumes", batch_id)
+    else:
+        await get_batches_collection().update_one(
+            {"_id": ObjectId(batch_id)}, {"$push": {"resumes": {"$each": resume_ids}}}
+        )
+        log_activity(user_id, "batch_appended", f"Added {len(resume_ids)} resumes to batch", batch_id)
+    return batch_id
+
+async def select_shortlist(job_desc: str, candidate_data: List[dict], phase1_limit: int,
+                           progress: RankingProgress, rerank_limit: int = 0) -> Tuple[List[dict], dict]:
+    """
+    Top phase1_limit embedded candidates for the job description, best first,
+    plus the window stored with the run for later re-slices and appends.
+    With a rerank_limit above phase1_limit, that many candidates are taken by
+    similarity and the cross-encoder picks the phase1_limit passed on to the LLM.
+    """
+    DEVICE = model_registry.get_model_device()
+    bi_encoder = model_registry.get_bi_encoder()
+    loop = asyncio.get_running_loop()
+    print(f"  Encoding job description...")
+    job_desc_emb = await loop.run_in_executor(
+        None, partial(bi_encoder.encode, job_desc, convert_to_tensor=True, device=DEVICE)
+    )
+    
+    # One similarity pass over the whole matrix, then top-k selection
+    resume_embs = torch.from_numpy(np.stack([c["embedding"] for c in candidate_data])).to(job_desc_emb.device)
+    cross_encoder = model_registry.get_cross_encoder()
+    if rerank_limit > phase1_limit and cross_encoder is None:
+        print("  Cross-encoder re-ranking requested but no cross-encoder is loaded; skipping")
+    rerank = rerank_limit > phase1_limit and cross_encoder is not None
+    similarities, top_indices = top_k_by_similarity(job_desc_emb, resume_embs,
+                                                    rerank_limit if rerank else phase1_limit)
+    for candidate, similarity in zip(candidate_data, similarities):
+        candidate["similarity"] = similarity
+    shortlist = [candidate_data[i] for i in top_indices]
+    
+    if rerank:
+        # Local batched scoring of the wider shortlist so fewer, better-ordered
+        # candidates reach the LLM
+        await progress.set_phase("reranking")
+        print(f"  Re-ranking top {len(shortlist)} with the cross-encoder...")
+        scores = await loop.run_in_executor(
+            None, cross_encoder_scores, cross_encoder, job_desc, [c["resume_text"] for c in shortlist]
+        )
+        for candidate, score in zip(shortlist, scores):
+            candidate["rerank_score"] = score
+        shortlist.sort(key=lambda c: c["rerank_score"], reverse=True)
+    
+    # Full similarity ordering with the cross-encoder scores of the pool, so
+    # the run can later be re-sliced or appended to without re-scoring. The
+    # sort is stable over the top-k order, so ties rank as they were shortlisted
+    shortlisted = set(top_indices)
+    order = top_indices + [i for i in range(len(candidate_data)) if i not in shortlisted]
+    order.sort(key=lambda i: candidate_data[i]["similarity"], reverse=True)
+    window = {
+        "phase1_limit": phase1_limit,
+        "rerank_limit": rerank_limit if rerank else 0,
+        "ranked": [window_member(candidate_data[i]) for i in order]
+    }
+    
+    # Use phase1_limit instead of hardcoded 20 (already ordered best first)
+    topp1 = shortlist[:phase1_limit]
+    print(f"Selected top {phase1_limit} candidates based on {'cross-encoder score' if rerank else 'similarity'}:\n")
+    for candidate in topp1:
+        rerank_note = f" | Cross-encoder: {candidate['rerank_score']:.3f}" if rerank else ""
+        print(f"  {candidate['filename']} | Similarity: {candidate['similarity']*100:.2f}%{rerank_note}")
+    return topp1, window
+
+async def shortlist_candidates(user_id: str, job_desc: str, job_details_id: str, candidate_data: List[dict],
+                               phase1_limit: int, progress: RankingProgress,
+                               rerank_limit: int = 0) -> Tuple[str, List[dict], dict]:
+    """
+    Phase 2: embed uncached resumes, store the batch and return
+    (batch_id, top phase1_limit candidates best first, window).
+    """
+    await embed_candidates(candidate_data, progress)
+    batch_id = await store_candidates(user_id, job_details_id, candidate_data)
+    topp1, window = await select_shortlist(job_desc, candidate_data, phase1_limit, progress, rerank_limit)
+    return batch_id, topp1, window
+
+
+def detail_candidate(candidate: dict, analysis: Dict) -> dict:
+    """Combine a shortlisted candidate with its LLM analysis."""
+    # The analysis reads the name in context; the heuristic only covers failed analyses
+    llm_name = (analysis.get("candidate_name") or "").strip()
+    if llm_name.lower() in UNKNOWN_NAMES:
+        llm_name = None
+    name = llm_name or extract_candidate_name(candidate["resume_text"]) or "Unknown"
+    failed = analysis.get("analysis_status", "completed") == "failed"
+    fit_score = None if failed else (analysis.get("fit_score") or 0) / 100.0
+    return {
+        "resume_id": candidate["resume_id"],
+        "batch_id": candidate["batch_id"],
+        "filename": candidate["filename"],
+        "name": name,
+        "resume_text": candidate["resume_text"],
+        "contact": candidate["contact"],
+        "overall_sim": candidate["similarity"],
+        "rerank_score": candidate.get("rerank_score"),
+        "llm_analysis": analysis,
+        "llm_fit_score": fit_score
+    }
+
+def order_candidates(detailed_candidates: List[dict]) -> List[dict]:
+    """Sort by LLM fit score; candidates whose analysis failed go last instead of scoring 0"""
+    num_failed = sum(1 for c in detailed_candidates if c["llm_fit_score"] is None)
+    if num_failed:
+        print(f"  WARNING: LLM analysis failed for {num_failed} candidates")
+    return sorted(
+        detailed_candidates,
+        key=lambda x: (x["llm_fit_score"] is not None, x["llm_fit_score"] or 0, x["overall_sim"]),
+        reverse=True
+    )
+
+def build_candidate(candidate: dict) -> Candidate:
+    """Response model for one analyzed candidate."""
+    analysis = candidate["llm_analysis"]
+    fit_percent = round(candidate["llm_fit_score"] * 100, 1) if candidate["llm_fit_score"] is not None else None
+    return Candidate(
+        id=candidate["resume_id"],
+        name=candidate["name"],
+        file_name=candidate["filename"],
+        fitScore=fit_percent,
+        overall_similarity=round(candidate["overall_sim"], 4),
+        llm_fit_score=fit_percent,
+        analysis_status=analysis.get("analysis_status", "completed"),
+        analysis_error=analysis.get("error"),
+        total_experience=0,  # Placeholder
+        skills={
+            "exact_matches": analysis["technical_skills"].get("exact_matches", []),
+            "transferable": analysis["technical_skills"].get("transferable_skills", []),
+            "non_technical": analysis.get("non_technical_skills", [])
+        },
+        education_highlights=analysis.get("education_highlights", ""),
+        experience_highlights=analysis.get("experience_highlights", ""),
+        summary=analysis.get("overall_summary", ""),
+        justification=analysis.get("justification", ""),
+        email=candidate["contact"]["email"],
+        mobile_number=candidate["contact"]["mobile_number"],
+        resume_content=candidate["resume_text"]
+    )
+
+def build_screening_candidate(candidate: dict, final_candidate: Candidate) -> dict:
+    """Screening run entry stored for one analyzed candidate."""
+    return {
+        "resume_id": candidate["resume_id"],
+        "candidate_name": candidate["name"],
+        "batch_id": candidate["batch_id"],
+        "file_name": candidate["filename"],
+        "file_type": "pdf",
+        "ai_fit_score": final_candidate.fitScore,
+        "analysis_status": final_candidate.analysis_status,
+        "analysis_error": final_candidate.analysis_error,
+        "skill_similarity": candidate["overall_sim"],
+        "rerank_score": candidate.get("rerank_score"),
+        "candidate_summary": final_candidate.summary,
+        "skill_assessment": {
+            "exact_matches": final_candidate.skills["exact_matches"],
+            "transferable_skills": final_candidate.skills["transferable"],
+            "non_technical_skills": final_candidate.skills["non_technical"]
+        },
+        "experience_highlights": final_candidate.experience_highlights,
+        "education_highlights": final_candidate.education_highlights,
+        "gaps": candidate["llm_analysis"].get("gaps", []),
+        "ai_justification": final_candidate.justification,
+        "resume_content_preview": candidate["resume_text"][:1000],
+        "questions_generated": False,
+        "generated_questions": [],
+        "alternate_candidate_searched": False,
+        "alternate_candidate": {}
+    }
+
+def window_member(candidate: dict) -> dict:
+    """Ranking keys of one candidate in a stored window's similarity ordering."""
+    return {
+        "resume_id": candidate["resume_id"],
+        "batch_id": candidate["batch_id"],
+        "similarity": candidate["similarity"],
+        "rerank_score": candidate.get("rerank_score")
+    }
+
+def reranked_phase1(window: dict) -> bool:
+    """Whether the window's phase-1 shortlist is picked by cross-encoder score."""
+    return window["rerank_limit"] > window["phase1_limit"]
+
+def phase1_sort(window: dict) -> List[Tuple[str, int]]:
+    """
+    Order of the window's phase-1 shortlist, the way select_shortlist picks it:
+    by cross-encoder score within the scored pool when the run was re-ranked
+    wider than phase 1, else by similarity. seq keeps ties in ranking order.
+    """
+    if reranked_phase1(window):
+        return [("rerank_score", -1), ("similarity", -1), ("seq", 1)]
+    return [("similarity", -1), ("seq", 1)]
+
+def phase1_key(window: dict):
+    """phase1_sort as a sort key for members held in memory."""
+    sort = phase1_sort(window)
+    return lambda m: tuple(-m[field] if direction < 0 else m[field] for field, direction in sort)
+
+def entry_order_key(entry: dict) -> tuple:
+    """order_candidates' ordering for stored screening entries."""
+    return (entry["ai_fit_score"] is not None, entry["ai_fit_score"] or 0, entry["skill_similarity"])
+
+async def iter_screening_phases(user_id: str, run_id: str, job_desc: str, job_details_id: str,
+                                batch_ids: List[str], topp1: List[dict], window: dict, phase2_limit: int,
+                                force_reanalysis: bool, progress: RankingProgress,
+                                run_start: datetime) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Phases 3-4 shared by upload and batch re-rank runs: yield the shortlist,
+    analyze it with the LLM yielding each candidate, store the screening run
+    (with its window, see Stored Windows) and yield "done".
+    """
+    yield "shortlist", {
+        "run_id": run_id,
+        "batch_id": batch_ids[0],
+        "batch_ids": batch_ids,
+        "candidates": [
+            {"id": c["resume_id"], "file_name": c["filename"], "overall_similarity": round(c["similarity"], 4),
+             "rerank_score": c.get("rerank_score")}
+            for c in topp1
+        ]
+    }
+    
+    # Phase 3: Async LLM Processing, one candidate at a time in completion order
+    print(f"\n[PHASE 3] ASYNC LLM PROCESSING")
+    llm_start = time.time()
+    await progress.set_phase("analyzing", llm_analyses_total=len(topp1))
+    detailed_candidates = []
+    final_by_id = {}
+    resume_texts_topp1 = [candidate["condensed"]["condensed_content"] for candidate in topp1]
+    async for i, analysis in iter_llm_analyses(job_desc, resume_texts_topp1, use_cache=not force_reanalysis):
+        candidate = detail_candidate(topp1[i], analysis)
+        detailed_candidates.append(candidate)
+        final_by_id[candidate["resume_id"]] = build_candidate(candidate)
+        await progress.add("llm_analyses_done")
+        yield "candidate", final_by_id[candidate["resume_id"]]
+    await update_candidate_names({c["resume_id"]: c["name"] for c in detailed_candidates})
+    
+    # Use phase2_limit instead of hardcoded 10
+    topp2 = order_candidates(detailed_candidates)[:phase2_limit]
+    window = dict(window, phase2_limit=phase2_limit, analyses={
+        c["resume_id"]: build_screening_candidate(c, final_by_id[c["resume_id"]]) for c in detailed_candidates
+    })
+    llm_time = time.time() - llm_start
+    print(f"\n[PHASE 3 COMPLETE] LLM processing completed in {llm_time:.2f} seconds")
+    
+    # Prepare final response and screening run data
+    print(f"\n[PHASE 4] PREPARING FINAL RESULTS")
+    await progress.set_phase("finalizing")
+    final_results = []
+    screening_candidates = []
+    for i, candidate in enumerate(topp2):
+        final_candidate = final_by_id[candidate["resume_id"]]
+        final_results.append(final_candidate)
+        screening_candidates.append(build_screening_candidate(candidate, final_candidate))
+        print(f"  Prepared candidate {i+1}: {candidate['name']} - Fit: {final_candidate.fitScore}")
+    
+    # Store screening run
+    await store_screening_run(
+        run_id=run_id,
+        user_id=user_id,
+        job_details_id=job_details_id,
+        batch_ids=batch_ids,
+        run_start=run_start,
+        run_end=datetime.now(),
+        candidates=screening_candidates,
+        window=window
+    )
+    
+    yield "done", {
+        "run_id": run_id,
+        "user_id": user_id,
+        "ordering": [c.id for c in final_results],
+        "candidates": final_results
+    }
+
+async def iter_ranking_pipeline(user_id: str, job_role: str, job_desc: str,
+                                uploads: List[Tuple[str, BinaryIO]], force_reanalysis: bool = False,
+                                run_id: Optional[str] = None,
+                                progress: Optional[RankingProgress] = None) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Rank uploaded resumes against a job description and store the screening run,
+    yielding (event, payload) as results become available:
+      "shortlist"  once phase 2 picks the phase1 candidates (best similarity first)
+      "candidate"  for each shortlisted Candidate as soon as its analysis completes
+      "done"       the RankingResponse payload plus the final phase2 "ordering"
+    Raises HTTPException for invalid settings or uploads without readable PDFs.
+    """
+    progress = progress or RankingProgress()
+    run_id = run_id or str(ObjectId())
+    phase1_limit, phase2_limit, rerank_limit = await get_phase_limits(user_id)
+    
+    total_start = datetime.now()
+    print(f"\n{'='*80}")
+    print(f"STARTING RESUME SCREENING PROCESS (Phase1: {phase1_limit}, Phase2: {phase2_limit})")
+    print(f"{'='*80}")
+    
+    # Create job detail
+    job_details_id = await create_job_detail(user_id, job_role, job_desc)
+    log_activity(user_id, "job_created", f"Created job: {job_role}", job_details_id)
+    
+    # Phase 1: File Processing
+    print("\n[PHASE 1] PROCESSING UPLOADED FILES")
+    file_start = time.time()
+    candidate_data = await extract_candidates(uploads, progress)
+    if not candidate_data:
+        print("\nERROR: No valid PDFs found in uploaded files")
+        raise HTTPException(400, "No valid PDFs found.")
+    file_time = time.time() - file_start
+    print(f"\n[PHASE 1 COMPLETE] Processed {len(candidate_data)} PDFs in {file_time:.2f} seconds")
+    
+    # Phase 2: Initial Screening
+    print(f"\n[PHASE 2] INITIAL SCREENING")
+    screen_start = time.time()
+    batch_id, topp1, window = await shortlist_candidates(user_id, job_desc, job_details_id, candidate_data,
+                                                         phase1_limit, progress, rerank_limit)
+    screen_time = time.time() - screen_start
+    print(f"\n[PHASE 2 COMPLETE] Top {phase1_limit} candidates selected in {screen_time:.2f} seconds")
+    
+    # Phases 3-4
+    analysis_start = time.time()
+    async for event, payload in iter_screening_phases(user_id, run_id, job_desc, job_details_id, [batch_id],
+                                                      topp1, window, phase2_limit, force_reanalysis, progress,
+                                                      total_start):
+        if event == "done":
+            log_activity(user_id, "screening_run", 
+                         f"Screening run completed for {len(candidate_data)} candidates (Phase1: {phase1_limit}, Phase2: {phase2_limit})", 
+                         run_id)
+            total_time = (datetime.now() - total_start).total_seconds()
+            top = payload["candidates"][0]
+            
+            # Performance summary - updated with dynamic limits
+            print(f"\n{'='*80}")
+            print("PROCESSING SUMMARY")
+            print(f"{'='*80}")
+            print(f"Total candidates processed: {len(candidate_data)}")
+            print(f"Files processed: {len(uploads)} ({len(candidate_data)} PDFs extracted)")
+            print(f"Initial screening time: {screen_time:.2f} seconds")
+            print(f"LLM processing time: {time.time() - analysis_start:.2f} seconds")
+            print(f"Total processing time: {total_time:.2f} seconds")
+            print(f"Phase1 candidates: {phase1_limit}")
+            print(f"Phase2 candidates: {phase2_limit}")
+            print(f"Top candidate: {top.name} - Fit: {top.fitScore}")
+            print(f"{'='*80}")
+        yield event, payload
+
+async def iter_batch_rerank_pipeline(user_id: str, job_role: str, job_desc: str, batch_ids: List[str],
+                                     force_reanalysis: bool = False, run_id: Optional[str] = None,
+                                     progress: Optional[RankingProgress] = None) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Re-screen already uploaded batches against a new job description. Stored
+    texts and embeddings are reused, so phase 2 is one similarity pass and
+    only the shortlist's LLM analyses are new. Yields the same events as
+    iter_ranking_pipeline and stores a new screening run.
+    """
+    progress = progress or RankingProgress()
+    run_id = run_id or str(ObjectId())
+    phase1_limit, phase2_limit, rerank_limit = await get_phase_limits(user_id)
+    total_start = datetime.now()
+    print(f"\nRE-RANKING {len(batch_ids)} BATCHES (Phase1: {phase1_limit}, Phase2: {phase2_limit})")
+    
+    candidate_data = await load_batch_candidates(user_id, batch_ids, progress)
+    if not candidate_data:
+        raise HTTPException(400, "The batches contain no resumes.")
+    job_details_id = await create_job_detail(user_id, job_role, job_desc)
+    log_activity(user_id, "job_created", f"Created job: {job_role}", job_details_id)
+    
+    # Only resumes stored without a current-model embedding are encoded
+    # again, and stored so the next re-rank reuses them
+    reencoded = [c for c in candidate_data if c["embedding"] is None]
+    await embed_candidates(candidate_data, progress)
+    await store_embeddings(user_id, reencoded)
+    topp1, window = await select_shortlist(job_desc, candidate_data, phase1_limit, progress, rerank_limit)
+    
+    async for event, payload in iter_screening_phases(user_id, run_id, job_desc, job_details_id, batch_ids,
+                                                      topp1, window, phase2_limit, force_reanalysis, progress,
+                                                      total_start):
+        if event == "done":
+            log_activity(user_id, "screening_run",
+                         f"Re-ranked {len(candidate_data)} stored candidates from {len(batch_ids)} batches "
+                         f"(Phase1: {phase1_limit}, Phase2: {phase2_limit})",
+                         run_id)
+            print(f"Re-rank completed in {(datetime.now() - total_start).total_seconds():.2f} seconds")
+        yield event, payload
+
+async def final_payload(events: AsyncIterator[Tuple[str, dict]]) -> dict:
+    """Drain a pipeline and return its "done" (RankingResponse) payload."""
+    async for event, payload in events:
+        if event == "done":
+            return payload
+
+async def run_ranking_pipeline(*args, **kwargs) -> dict:
+    """Run the whole pipeline and return the RankingResponse payload."""
+    return await final_payload(iter_ranking_pipeline(*args, **kwargs))
+
+async def run_batch_rerank_pipeline(*args, **kwargs) -> dict:
+    """Re-rank stored batches and return the RankingResponse payload."""
+    return await final_payload(iter_batch_rerank_pipeline(*args, **kwargs))
+
+# --- Stored Windows ---
+# Finished runs keep their window: the phase limits on the run document, and
+# every screened resume in screening_run_rankings (similarity, cross-encoder
+# score for the re-ranked pool, seq in ranking order, and the LLM analysis once
+# computed), so large batches never approach MongoDB's 16 MB document limit.
+# Re-slicing with other phase limits and appending new resumes both read only
+# the phase-1 slice of that ordering, so only candidates that newly enter the
+# phase-1 shortlist reach the LLM. A lease on the run document keeps
+# concurrent updates of the same run apart.
+RUN_LEASE_SECONDS = 1800
+RANKING_FIELDS = {"_id": 0, "resume_id": 1, "batch_id": 1, "similarity": 1, "rerank_score": 1, "seq": 1,
+                  "analysis": 1}
+
+def ranking_doc(run_id: str, member: dict) -> dict:
+    return {"run_id": run_id, **member}
+
+async def store_rankings(run_id: str, window: dict) -> dict:
+    """
+    Write a new run's full ordering ("ranked", best first) with its analyses
+    to screening_run_rankings; returns the window kept on the run document.
+    """
+    analyses = window.get("analyses", {})
+    docs = []
+    for seq, member in enumerate(window["ranked"]):
+        doc = ranking_doc(run_id, dict(member, seq=seq))
+        if member["resume_id"] in analyses:
+            doc["analysis"] = analyses[member["resume_id"]]
+        docs.append(doc)
+    rankings = get_screening_run_rankings_collection()
+    # A retried background job rewrites its run from scratch
+    await rankings.delete_many({"run_id": run_id})
+    if docs:
+        await rankings.insert_many(docs, ordered=False)
+    return {
+        "phase1_limit": window["phase1_limit"],
+        "phase2_limit": window["phase2_limit"],
+        "rerank_limit": window["rerank_limit"],
+        "ranked_count": len(docs)
+    }
+
+async def load_phase1_members(run_id: str, window: dict) -> List[dict]:
+    """The window's phase-1 shortlist, best first (see phase1_sort)."""
+    query = {"run_id": run_id}
+    if reranked_phase1(window):
+        query["rerank_score"] = {"$ne": None}
+    cursor = get_screening_run_rankings_collection().find(query, RANKING_FIELDS)
+    return await cursor.sort(phase1_sort(window)).limit(window["phase1_limit"]).to_list(None)
+
+async def acquire_run_lease(run_id: str, user_id: str) -> dict:
+    """Lock a finished run for an update and return it; raises 404/409."""
+    now = datetime.now()
+    run = await get_screening_runs_collection().find_one_and_update(
+        {"_id": ObjectId(run_id), "user_id": user_id,
+         "$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lt": now}}]},
+        {"$set": {"lease_until": now + timedelta(seconds=RUN_LEASE_SECONDS)}},
+        {"candidates": 1, "window": 1, "batch_id": 1, "batch_ids": 1, "job_details_id": 1, "status": 1}
+    )
+    if run is None:
+        exists = await get_screening_runs_collection().count_documents({"_id": ObjectId(run_id), "user_id": user_id})
+        if not exists:
+            raise HTTPException(404, "Screening run not found")
+        raise HTTPException(409, "Another update of this screening run is in progress")
+    if run.get("status", "completed") != "completed" or "ranked_count" not in (run.get("window") or {}):
+        await release_run_lease(run_id)
+        if run.get("status", "completed") != "completed":
+            raise HTTPException(409, "Screening run has not completed")
+        raise HTTPException(409, "Screening run predates stored rankings; re-rank its batch with /rank/batches")
+    return run
+
+async def release_run_lease(run_id: str):
+    await get_screening_runs_collection().update_one(
+        {"_id": ObjectId(run_id)}, {"$unset": {"lease_until": ""}}
+    )
+
+async def get_run_job_description(run: dict) -> str:
+    job = await get_job_details_collection().find_one(
+        {"_id": ObjectId(run["job_details_id"])}, {"job_description": 1}
+    )
+    if job is None:
+        raise HTTPException(404, "Job details not found")
+    return job["job_description"]
+
+async def merge_into_window(job_desc: str, run_id: str, window: dict, members: List[dict],
+                            newcomers: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """
+    Score newcomers like the original shortlist and merge them into the
+    window's phase-1 members. Returns (phase-1 members, best first, the
+    newcomers' window members); nothing is written until store_window.
+    """
+    DEVICE = model_registry.get_model_device()
+    bi_encoder = model_registry.get_bi_encoder()
+    loop = asyncio.get_running_loop()
+    job_desc_emb = await loop.run_in_executor(
+        None, partial(bi_encoder.encode, job_desc, convert_to_tensor=True, device=DEVICE)
+    )
+    embs = torch.from_numpy(np.stack([c["embedding"] for c in newcomers])).to(job_desc_emb.device)
+    similarities, _ = top_k_by_similarity(job_desc_emb, embs, len(newcomers))
+    for candidate, similarity in zip(newcomers, similarities):
+        candidate["similarity"] = similarity
+    
+    if window["rerank_limit"] > 0:
+        cross_encoder = model_registry.get_cross_encoder()
+        if cross_encoder is None:
+            raise HTTPException(409, "This run was re-ranked with the cross-encoder, which is not loaded")
+        # Only newcomers that would have made the original similarity pool are
+        # scored; the pool threshold is not raised as it grows
+        pool_query = {"run_id": run_id, "rerank_score": {"$ne": None}}
+        rankings = get_screening_run_rankings_collection()
+        pool_size = await rankings.count_documents(pool_query)
+        lowest = await rankings.find_one(pool_query, {"similarity": 1}, sort=[("similarity", 1)])
+        contenders = [c for c in newcomers
+                      if pool_size < window["rerank_limit"] or lowest is None or c["similarity"] >= lowest["similarity"]]
+        scores = await loop.run_in_executor(
+            None, cross_encoder_scores, cross_encoder, job_desc, [c["resume_text"] for c in contenders]
+        )
+        for candidate, score in zip(contenders, scores):
+            candidate["rerank_score"] = score
+    
+    # Newcomers rank after stored members with the same scores
+    new_members = [dict(window_member(c), seq=window["ranked_count"] + i) for i, c in enumerate(newcomers)]
+    window["ranked_count"] += len(new_members)
+    eligible = [m for m in new_members if not reranked_phase1(window) or m["rerank_score"] is not None]
+    return sorted(members + eligible, key=phase1_key(window))[:window["phase1_limit"]], new_members
+
+async def load_window_candidates(user_id: str, members: List[dict]) -> List[dict]:
+    """Candidate dicts for stored window members that still need an analysis."""
+    docs = {
+        str(doc["_id"]): doc
+        async for doc in get_resumes_collection().find(
+            {"_id": {"$in": [ObjectId(m["resume_id"]) for m in members]}, "user_id": user_id},
+            STORED_CANDIDATE_FIELDS
+        )
+    }
+    stamp = condense.condense_stamp()
+    candidate_data = [
+        dict(stored_candidate(docs[m["resume_id"]], m["resume_id"], m["batch_id"], stamp),
+             similarity=m["similarity"], rerank_score=m["rerank_score"])
+        for m in members if m["resume_id"] in docs
+    ]
+    condensed_now = await asyncio.get_running_loop().run_in_executor(None, condense_candidates, candidate_data)
+    await store_condensed(condensed_now)
+    return candidate_data
+
+async def analyze_into_window(job_desc: str, members: List[dict], candidate_data: List[dict],
+                              force_reanalysis: bool, progress: RankingProgress) -> List[dict]:
+    """LLM analysis of candidates entering the phase-1 shortlist, kept on their window members."""
+    await progress.set_phase("analyzing", llm_analyses_total=len(candidate_data))
+    by_id = {m["resume_id"]: m for m in members}
+    detailed = []
+    async for i, analysis in iter_llm_analyses(job_desc, [c["condensed"]["condensed_content"] for c in candidate_data],
+                                               use_cache=not force_reanalysis):
+        candidate = detail_candidate(candidate_data[i], analysis)
+        detailed.append(candidate)
+        by_id[candidate["resume_id"]]["analysis"] = build_screening_candidate(candidate, build_candidate(candidate))
+        await progress.add("llm_analyses_done")
+    return detailed
+
+async def store_window(run_id: str, run: dict, window: dict, members: List[dict], detailed: List[dict],
+                       new_members: List[dict] = ()) -> List[dict]:
+    """
+    Write the newcomers' window members, the new analyses and the run's top
+    phase2 candidates picked from the phase-1 members; returns those
+    candidates. Candidates already in the stored top phase2 keep their
+    entries (e.g. generated questions).
+    """
+    rankings = get_screening_run_rankings_collection()
+    if new_members:
+        await rankings.insert_many([ranking_doc(run_id, m) for m in new_members], ordered=False)
+    added = {m["resume_id"] for m in new_members}
+    by_id = {m["resume_id"]: m for m in members}
+    updates = [
+        UpdateOne({"run_id": run_id, "resume_id": c["resume_id"]},
+                  {"$set": {"analysis": by_id[c["resume_id"]]["analysis"]}})
+        for c in detailed if c["resume_id"] not in added
+    ]
+    if updates:
+        await rankings.bulk_write(updates, ordered=False)
+    
+    stored = {c["resume_id"]: c for c in run.get("candidates", [])}
+    analyzed = [m for m in members if m.get("analysis")]
+    topp2 = sorted(analyzed, key=lambda m: entry_order_key(m["analysis"]), reverse=True)[:window["phase2_limit"]]
+    candidates = [stored.get(m["resume_id"], m["analysis"]) for m in topp2]
+    await get_screening_runs_collection().update_one(
+        {"_id": ObjectId(run_id)},
+        {"$set": {"candidates": candidates, "window": window, "updated_at": datetime.now()}}
+    )
+    return candidates
+
+async def append_to_run(run_id: str, user_id: str, uploads: List[Tuple[str, BinaryIO]],
+                        force_reanalysis: bool = False) -> dict:
+    """
+    Add newly uploaded resumes to a finished run and its first batch. Files
+    already in any of the run's batches are skipped. The run's top phase2 is updated in place.
+    Resumes and the run are only written once the newcomers are analyzed, so
+    a failed append can simply be retried.
+    """
+    progress = RankingProgress()
+    run = await acquire_run_lease(run_id, user_id)
+    try:
+        window = run["window"]
+        batch_id = run["batch_id"]
+        run_batch_ids = run.get("batch_ids") or [batch_id]
+        job_desc = await get_run_job_description(run)
+        
+        print(f"\nAPPENDING TO RUN {run_id} (Phase1: {window['phase1_limit']}, Phase2: {window['phase2_limit']})")
+        candidate_data = await extract_candidates(uploads, progress)
+        if not candidate_data:
+            raise HTTPException(400, "No valid PDFs found.")
+        hashes = [c["content_hash"] for c in candidate_data]
+        in_run = {
+            doc["content_hash"]
+            async for doc in get_resumes_collection().find(
+                {"batch_id": {"$in": run_batch_ids}, "content_hash": {"$in": hashes}}, {"content_hash": 1}
+            )
+        }
+        newcomers = []
+        for candidate in candidate_data:
+            if candidate["content_hash"] in in_run:
+                continue
+            in_run.add(candidate["content_hash"])
+            candidate["resume_id"] = str(ObjectId())
+            candidate["batch_id"] = batch_id
+            newcomers.append(candidate)
+        print(f"  {len(newcomers)} new resumes, {len(candidate_data) - len(newcomers)} already in the run")
+        
+        members = await load_phase1_members(run_id, window)
+        new_members = []
+        entered = []
+        if newcomers:
+            await embed_candidates(newcomers, progress)
+            members, new_members = await merge_into_window(job_desc, run_id, window, members, newcomers)
+            by_id = {c["resume_id"]: c for c in newcomers}
+            entered = [by_id[m["resume_id"]] for m in members if m["resume_id"] in by_id]
+        
+        # Only newcomers that entered the phase-1 shortlist are analyzed
+        detailed = await analyze_into_window(job_desc, members, entered, force_reanalysis, progress)
+        if newcomers:
+            await store_candidates(user_id, run["job_details_id"], newcomers, batch_id=batch_id)
+            await update_candidate_names({c["resume_id"]: c["name"] for c in detailed})
+        candidates = await store_window(run_id, run, window, members, detailed, new_members)
+    finally:
+        await release_run_lease(run_id)
+    
+    log_activity(user_id, "screening_run_appended",
+                 f"Added {len(newcomers)} resumes to screening run, {len(entered)} entered the shortlist", run_id)
+    return {
+        "run_id": run_id,
+        "user_id": user_id,
+        "resumes_added": len(newcomers),
+        "duplicates_skipped": len(candidate_data) - len(newcomers),
+        "entered_shortlist": [c["resume_id"] for c in entered],
+        "ordering": [c["resume_id"] for c in candidates],
+        "candidates": candidates
+    }
+
+async def reslice_run(run_id: str, user_id: str, phase1_limit: Optional[int] = None,
+                      phase2_limit: Optional[int] = None, force_reanalysis: bool = False) -> dict:
+    """
+    Apply other phase limits (the user's current settings unless given) to a
+    finished run. The stored ordering and analyses are reused; only
+    candidates newly inside a larger phase-1 shortlist are analyzed.
+    """
+    if phase1_limit is None or phase2_limit is None:
+        settings_phase1, settings_phase2, _ = await get_phase_limits(user_id)
+        phase1_limit = phase1_limit or settings_phase1
+        phase2_limit = phase2_limit or settings_phase2
+    validate_phase_limits(phase1_limit, phase2_limit)
+    
+    progress = RankingProgress()
+    run = await acquire_run_lease(run_id, user_id)
+    try:
+        window = dict(run["window"], phase1_limit=phase1_limit, phase2_limit=phase2_limit)
+        print(f"\nRE-SLICING RUN {run_id} (Phase1: {phase1_limit}, Phase2: {phase2_limit})")
+        members = await load_phase1_members(run_id, window)
+        unanalyzed = [m for m in members if not m.get("analysis")]
+        detailed = []
+        if unanalyzed:
+            job_desc = await get_run_job_description(run)
+            candidate_data = await load_window_candidates(user_id, unanalyzed)
+            detailed = await analyze_into_window(job_desc, members, candidate_data, force_reanalysis, progress)
+            await update_candidate_names({c["resume_id"]: c["name"] for c in detailed})
+        print(f"  {len(detailed)} candidates analyzed, {len(members) - len(unanalyzed)} stored analyses reused")
+        candidates = await store_window(run_id, run, window, members, detailed)
+    finally:
+        await release_run_lease(run_id)
+    
+    log_activity(user_id, "screening_run_resliced",
+                 f"Re-sliced screening run (Phase1: {phase1_limit}, Phase2: {phase2_limit}), "
+                 f"{len(detailed)} new analyses", run_id)
+    return {
+        "run_id": run_id,
+        "user_id": user_id,
+        "phase1_limit": phase1_limit,
+        "phase2_limit": phase2_limit,
+        "newly_analyzed": [c["resume_id"] for c in detailed],
+        "ordering": [c["resume_id"] for c in candidates],
+        "candidates": candidates
+    }
+
+# --- Background Jobs ---
+# Jobs run as tasks on the worker's event loop; the CPU-heavy parts already
+# leave the loop (PDF extraction in the process pool, encoding in a thread).
+# A semaphore caps how many pipelines run at once per worker, the rest wait
+# in "queued". Jobs do not survive a worker restart: they are marked failed.
+_jobs = set()
+_job_slots: Optional[asyncio.Semaphore] = None
+
+def _get_job_slots() -> asyncio.Semaphore:
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(RANK_JOB_CONCURRENCY)
+    return _job_slots
+
+async def _run_job(run_id: str, user_id: str, job_role: str, job_desc: str,
+                   saved_uploads: List[Tuple[str, str]], workdir: str, force_reanalysis: bool):
+    try:
+        async with _get_job_slots():
+            with contextlib.ExitStack() as stack:
+                uploads = [(name, stack.enter_context(open(path, "rb"))) for name, path in saved_uploads]
+                await run_ranking_pipeline(user_id, job_role, job_desc, uploads, force_reanalysis,
+                                           run_id=run_id, progress=RankingProgress(run_id))
+    except asyncio.CancelledError:
+        await mark_run_failed(run_id, "Interrupted by server shutdown")
+        raise
+    except HTTPException as e:
+        await mark_run_failed(run_id, str(e.detail))
+    except Exception as e:
+        print(f"Ranking job {run_id} failed: {str(e)}")
+        await mark_run_failed(run_id, f"{type(e).__name__}: {str(e)}")
+    finally:
+        remove_workdir(workdir)
+
+async def submit_ranking_job(user_id: str, job_role: str, job_desc: str,
+                             saved_uploads: List[Tuple[str, str]], workdir: str,
+                             force_reanalysis: bool = False) -> str:
+    """
+    Create the pending run and start the pipeline in the background.
+    `saved_uploads` are (filename, path) pairs inside `workdir`, which the job
+    removes when it finishes.
+    """
+    run_id = await create_pending_run(user_id, job_role)
+    task = asyncio.create_task(
+        _run_job(run_id, user_id, job_role, job_desc, saved_uploads, workdir, force_reanalysis)
+    )
+    _jobs.add(task)
+    task.add_done_callback(_jobs.discard)
+    return run_id
+
+async def shutdown_jobs():
+    """Cancel running jobs so their runs are marked failed instead of left running."""
+    for task in list(_jobs):
+        task.cancel()
+    await asyncio.gather(*_jobs, return_exceptions=True)
+
+async def get_job_status(run_id: str, user_id: str) -> Optional[dict]:
+    run = await get_screening_runs_collection().find_one(
+        {"_id": ObjectId(run_id), "user_id": user_id},
+        {"user_id": 1, "status": 1, "progress": 1, "error": 1, "job_details_id": 1,
+         "batch_id": 1, "created_at": 1, "updated_at": 1, "candidates": 1}
+    )
+    if run is None:
+        return None
+    run["run_id"] = str(run.pop("_id"))
+    run["status"] = run.get("status", "completed")
+    run["progress"] = run.get("progress", {"phase": run["status"]})
+    return run
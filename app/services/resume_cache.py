@@ -0,0 +1,77 @@
+import threading
+from typing import Dict, Iterable, Iterator, List, Tuple
+from config import get_resumes_collection
+from utils.ingestion import SpooledPdf
+from utils.condense import CONDENSED_FIELDS
+from ml.embedding_codec import decode_embedding, HAS_EMBEDDING, EMBEDDING_MODEL_KEY
+
+LOOKUP_CHUNK_SIZE = 64
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+def _record(hits: int, misses: int):
+    with _stats_lock:
+        _stats["hits"] += hits
+        _stats["misses"] += misses
+
+def get_stats() -> Dict:
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+        "embedding_model": EMBEDDING_MODEL_KEY
+    }
+
+def lookup(content_hashes: List[str]) -> Dict[str, dict]:
+    """
+    Fetch previously processed resumes by PDF content hash in one query.
+    Embeddings are returned decoded as float32 NumPy vectors.
+    """
+    if not content_hashes:
+        return {}
+    cursor = get_resumes_collection().find(
+        {
+            "content_hash": {"$in": content_hashes},
+            "embedding_model": EMBEDDING_MODEL_KEY,
+            **HAS_EMBEDDING
+        },
+        {"content_hash": 1, "content": 1, "email": 1, "mobile_number": 1,
+         "embedding": 1, "embedding_dtype": 1, **{field: 1 for field in CONDENSED_FIELDS}}
+    )
+    cached = {}
+    for doc in cursor:
+        if doc["content_hash"] not in cached:
+            doc["embedding"] = decode_embedding(doc)
+            cached[doc["content_hash"]] = doc
+    return cached
+
+def _resolve(chunk: List[SpooledPdf], hits: List[Tuple[SpooledPdf, dict]]) -> Iterator[SpooledPdf]:
+    cached = lookup(list({pdf.content_hash for pdf in chunk}))
+    misses = 0
+    for pdf in chunk:
+        doc = cached.get(pdf.content_hash)
+        if doc is not None:
+            hits.append((pdf, doc))
+        else:
+            misses += 1
+            yield pdf
+    _record(len(chunk) - misses, misses)
+
+def split_cached(pdfs: Iterable[SpooledPdf], hits: List[Tuple[SpooledPdf, dict]]) -> Iterator[SpooledPdf]:
+    """
+    Pass through only the PDFs that have never been processed before.
+    Lookups are done in chunks as the source is consumed; cache hits are
+    appended to `hits` as (pdf, cached resume document).
+    """
+    chunk = []
+    for pdf in pdfs:
+        chunk.append(pdf)
+        if len(chunk) >= LOOKUP_CHUNK_SIZE:
+            yield from _resolve(chunk, hits)
+            chunk = []
+    if chunk:
+        yield from _resolve(chunk, hits)
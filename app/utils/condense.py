@@ -0,0 +1,247 @@
+import re
+import textwrap
+import threading
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from config import RESUME_TOKEN_BUDGET, LLM_TOKENIZER_ENCODING
+
+# Resume condensation for LLM prompts. Raw PDF text is normalized, page
+# numbers, running page headers/footers and sections such as references and
+# hobbies are dropped, the rest is split into sections and packed into a token budget: every section first gets its
+# share of the budget, leftover tokens go to sections in priority order,
+# and kept lines are emitted in document order. The result does not depend
+# on the job description, so it is computed once per resume and stored.
+
+# Bump when the condensation rules change so stored results are recomputed
+CONDENSE_VERSION = "3"
+CONDENSED_FIELDS = ("condensed_content", "condensed_tokens", "content_tokens", "condensed_version")
+
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "career summary", "profile", "professional profile",
+                "objective", "career objective", "about me", "executive summary"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history", "relevant experience",
+                   "internships", "internship experience"),
+    "skills": ("skills", "technical skills", "key skills", "core skills", "core competencies",
+               "competencies", "expertise", "areas of expertise", "technologies", "tools",
+               "skills and tools", "tech stack"),
+    "education": ("education", "academic background", "qualifications", "academic qualifications",
+                  "education and training"),
+    "projects": ("projects", "key projects", "personal projects", "selected projects", "academic projects"),
+    "certifications": ("certifications", "certificates", "licenses", "licenses and certifications",
+                       "courses", "training"),
+    "other": ("awards", "achievements", "honors", "publications", "languages", "volunteering",
+              "volunteer experience", "activities", "leadership"),
+    # Never worth prompt tokens
+    "drop": ("references", "referees", "hobbies", "interests", "hobbies and interests",
+             "declaration", "personal details", "personal information")
+}
+HEADING_KINDS = {heading: kind for kind, headings in SECTION_HEADINGS.items() for heading in headings}
+
+# Share of the budget each kind is guaranteed before leftovers are handed out
+BUDGET_SHARES = {
+    "header": 0.08, "summary": 0.10, "experience": 0.45, "skills": 0.15,
+    "education": 0.10, "projects": 0.07, "certifications": 0.03, "other": 0.02
+}
+LEFTOVER_PRIORITY = ("experience", "skills", "summary", "education", "projects", "certifications", "header", "other")
+
+# Longer lines (e.g. PDFs extracted without line breaks) are wrapped so
+# packing can keep part of them
+MAX_LINE_CHARS = 200
+# Extracted pages are separated by form feeds; lines repeated within the
+# first/last PAGE_EDGE_LINES of several pages are running headers/footers.
+# Text without page breaks (stored before they were kept) only loses short
+# non-bullet lines outside the experience section seen REPEATED_LINE_MIN_COUNT times.
+PAGE_BREAK = "\f"
+PAGE_EDGE_LINES = 2
+REPEATED_LINE_MIN_COUNT = 3
+REPEATED_LINE_MAX_CHARS = 60
+BULLET_RE = re.compile(r"^[•●▪■◦‣∙·➢✓*>\-]+\s*")
+PAGE_NUMBER_RE = re.compile(r"^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$", re.IGNORECASE)
+TITLE_LINE_RE = re.compile(r"^(curriculum vitae|resume|résumé|cv)$", re.IGNORECASE)
+BOILERPLATE_RE = re.compile(r"^references (are )?available (up)?on request\.?$", re.IGNORECASE)
+
+# --- Token counting ---
+_counter_lock = threading.Lock()
+_counter: Optional[Tuple[str, Callable[[str], int]]] = None
+
+def _load_counter() -> Tuple[str, Callable[[str], int]]:
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(LLM_TOKENIZER_ENCODING)
+        return f"tiktoken:{LLM_TOKENIZER_ENCODING}", lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        # tiktoken missing or its encoding file not downloadable (offline host)
+        print(f"Tokenizer {LLM_TOKENIZER_ENCODING} unavailable ({type(e).__name__}: {str(e)}); estimating tokens")
+        return "estimate", lambda text: (len(text) + 3) // 4
+
+def _get_counter() -> Tuple[str, Callable[[str], int]]:
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = _load_counter()
+        return _counter
+
+def count_tokens(text: str) -> int:
+    return _get_counter()[1](text)
+
+def condense_stamp(budget: int = RESUME_TOKEN_BUDGET) -> str:
+    """Identifies how a stored condensation was made; recompute when it differs."""
+    return f"{CONDENSE_VERSION}:{budget}:{_get_counter()[0]}"
+
+# --- Cleaning ---
+def normalize_text(text: str) -> List[str]:
+    """Non-empty, whitespace-collapsed lines with uniform bullets."""
+    text = unicodedata.normalize("NFKC", text)
+    lines = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not line:
+            continue
+        bullet = BULLET_RE.match(line)
+        if bullet and bullet.end() < len(line):
+            line = "- " + line[bullet.end():]
+        elif bullet:
+            continue  # lone bullet glyph
+        lines.extend(textwrap.wrap(line, MAX_LINE_CHARS) if len(line) > MAX_LINE_CHARS else [line])
+    return lines
+
+def normalize_pages(text: str) -> List[List[str]]:
+    """normalize_text per page (a single page when the text has no page breaks)."""
+    return [normalize_text(page) for page in text.split(PAGE_BREAK)]
+
+def strip_boilerplate(pages: List[List[str]]) -> List[str]:
+    """
+    Join normalized pages, dropping page numbers, title lines and repeats of
+    running headers/footers. The first occurrence of a repeated line is kept,
+    and bullets and experience lines are never dropped as repeats.
+    """
+    edge_counts = Counter()
+    for page in pages:
+        edge_counts.update({line.lower() for line in page[:PAGE_EDGE_LINES] + page[-PAGE_EDGE_LINES:]})
+    running = {key for key, count in edge_counts.items() if count > 1}
+    line_counts = Counter(line.lower() for page in pages for line in page)
+    
+    seen = set()
+    kept = []
+    kind = "header"
+    for page in pages:
+        for i, line in enumerate(page):
+            key = line.lower()
+            if PAGE_NUMBER_RE.match(line) or TITLE_LINE_RE.match(line) or BOILERPLATE_RE.match(line):
+                continue
+            at_edge = i < PAGE_EDGE_LINES or i >= len(page) - PAGE_EDGE_LINES
+            if key in seen and at_edge and key in running:
+                continue
+            heading = heading_kind(line)
+            if heading is not None:
+                kind = heading
+            elif (key in seen and len(pages) == 1 and kind != "experience" and not line.startswith("- ")
+                  and len(line) <= REPEATED_LINE_MAX_CHARS and line_counts[key] >= REPEATED_LINE_MIN_COUNT):
+                continue
+            seen.add(key)
+            kept.append(line)
+    return kept
+
+def heading_kind(line: str) -> Optional[str]:
+    key = re.sub(r"[^a-z& ]", "", line.lower().rstrip(":")).replace("&", " and ")
+    key = " ".join(key.split())
+    if len(key.split()) > 5:
+        return None
+    return HEADING_KINDS.get(key)
+
+def drop_sections(lines: List[str]) -> List[str]:
+    """Lines without the sections that are never kept (references, hobbies, ...), headings included."""
+    kept = []
+    dropping = False
+    for line in lines:
+        kind = heading_kind(line)
+        if kind is not None:
+            dropping = kind == "drop"
+        if not dropping:
+            kept.append(line)
+    return kept
+
+def split_sections(lines: List[str]) -> List[Tuple[str, Optional[str], List[str]]]:
+    """(kind, heading line, body lines) in document order; text before the first heading is the header."""
+    sections = [("header", None, [])]
+    for line in lines:
+        kind = heading_kind(line)
+        if kind is not None:
+            sections.append((kind, line, []))
+        else:
+            sections[-1][2].append(line)
+    return [s for s in sections if s[2] and s[0] != "drop"]
+
+# --- Budget packing ---
+def _pack(sections: List[Tuple[str, Optional[str], List[str]]], budget: int) -> List[List[str]]:
+    """Lines kept per section within `budget` tokens (each line costs its tokens plus a newline)."""
+    costs = [[count_tokens(line) + 1 for line in body] for _, _, body in sections]
+    heading_costs = [count_tokens(heading) + 1 if heading else 0 for _, heading, _ in sections]
+    taken = [0] * len(sections)
+    used = 0
+
+    def fill(index: int, limit: int) -> int:
+        """Take further lines of one section while they fit in `limit`; returns tokens spent."""
+        spent = 0
+        if taken[index] == 0:
+            # A heading is only worth its tokens together with its first line
+            if heading_costs[index] + costs[index][0] > limit:
+                return 0
+            spent += heading_costs[index]
+        # Stop at the first line that does not fit so sections stay contiguous
+        while taken[index] < len(costs[index]) and spent + costs[index][taken[index]] <= limit:
+            spent += costs[index][taken[index]]
+            taken[index] += 1
+        return spent
+
+    # Pass 1: each kind spends up to its share, its sections in document order
+    for kind, share in BUDGET_SHARES.items():
+        quota = int(budget * share)
+        for index, (section_kind, _, _) in enumerate(sections):
+            if section_kind == kind and quota > 0:
+                spent = fill(index, quota)
+                quota -= spent
+                used += spent
+    # Pass 2: leftovers by priority
+    for kind in LEFTOVER_PRIORITY:
+        for index, (section_kind, _, _) in enumerate(sections):
+            if section_kind == kind and budget - used > 0:
+                used += fill(index, budget - used)
+    return [body[:count] for (_, _, body), count in zip(sections, taken)]
+
+def condense_resume(text: str, budget: int = RESUME_TOKEN_BUDGET) -> Tuple[str, int, int]:
+    """
+    Condense raw resume text to at most `budget` tokens.
+    Returns (condensed text, its token count, token count of the raw text).
+    """
+    raw_tokens = count_tokens(text)
+    lines = drop_sections(strip_boilerplate(normalize_pages(text)))
+    cleaned = "\n".join(lines)
+    cleaned_tokens = count_tokens(cleaned)
+    if cleaned_tokens <= budget:
+        return cleaned, cleaned_tokens, raw_tokens
+
+    sections = split_sections(lines)
+    blocks = []
+    for (_, heading, _), kept in zip(sections, _pack(sections, budget)):
+        if kept:
+            blocks.append("\n".join(([heading] if heading else []) + kept))
+    condensed = "\n\n".join(blocks)
+    tokens = count_tokens(condensed)
+    # Per-line counts are an approximation of the joined text; trim if it overshoots
+    while tokens > budget and "\n" in condensed:
+        condensed = condensed.rsplit("\n", 1)[0].rstrip()
+        tokens = count_tokens(condensed)
+    return condensed, tokens, raw_tokens
+
+def condensed_fields(text: str, budget: int = RESUME_TOKEN_BUDGET) -> Dict:
+    """Resume document fields holding the condensed form of `text`."""
+    condensed, tokens, raw_tokens = condense_resume(text, budget)
+    return {
+        "condensed_content": condensed,
+        "condensed_tokens": tokens,
+        "content_tokens": raw_tokens,
+        "condensed_version": condense_stamp(budget)
+    }
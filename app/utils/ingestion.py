@@ -0,0 +1,99 @@
+import os
+import hashlib
+import shutil
+import tempfile
+import zipfile
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Tuple
+from config import SPOOL_DIR
+
+COPY_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+class SpooledPdf(NamedTuple):
+    name: str  # original file name (archive member path for ZIP entries)
+    path: str  # location of the spooled copy on disk
+    content_hash: str  # SHA-256 hex digest of the PDF bytes
+
+def create_workdir() -> str:
+    """Per-request scratch directory for spooled PDFs; caller removes it."""
+    if SPOOL_DIR:
+        os.makedirs(SPOOL_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix="kandidex-", dir=SPOOL_DIR)
+
+def remove_workdir(workdir: str):
+    shutil.rmtree(workdir, ignore_errors=True)
+
+def _spool(source: BinaryIO, workdir: str, suffix: str) -> Tuple[str, str]:
+    """Copy a file object to disk in fixed-size chunks, hashing as it goes.
+    Returns (path, sha256 hex digest)."""
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=workdir)
+    with os.fdopen(fd, "wb") as out:
+        while True:
+            chunk = source.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return path, digest.hexdigest()
+
+def _is_pdf(name: str) -> bool:
+    return name.lower().replace('\\', '/').endswith('.pdf')
+
+def _is_zip(name: str) -> bool:
+    return name.lower().replace('\\', '/').endswith('.zip')
+
+# --- Recursive Zip Processing ---
+def iter_zip_pdfs(z: zipfile.ZipFile, workdir: str, prefix: str = "") -> Iterator[SpooledPdf]:
+    """Lazily spool every PDF in a zip archive to disk, descending into nested ZIPs."""
+    for info in z.infolist():
+        entry = info.filename
+        if info.is_dir() or '.' not in entry:
+            continue
+
+        try:
+            if _is_pdf(entry):
+                with z.open(info) as member:
+                    path, content_hash = _spool(member, workdir, ".pdf")
+                yield SpooledPdf(prefix + entry, path, content_hash)
+            elif _is_zip(entry):
+                with z.open(info) as member:
+                    nested_path, _ = _spool(member, workdir, ".zip")
+                try:
+                    with zipfile.ZipFile(nested_path) as nested:
+                        yield from iter_zip_pdfs(nested, workdir, prefix=f"{prefix}{entry}/")
+                finally:
+                    os.remove(nested_path)
+        except Exception as e:
+            print(f"      Error reading {prefix}{entry}: {str(e)}")
+
+def iter_upload_pdfs(uploads: Iterable[Tuple[str, BinaryIO]], workdir: str) -> Iterator[SpooledPdf]:
+    """
+    Yield spooled PDFs from uploaded (filename, file object) pairs one at a time.
+    ZIP archives are read member by member straight from their file object, so
+    nothing larger than a single copy chunk is held in memory.
+    """
+    for filename, fileobj in uploads:
+        print(f"  Processing file: {filename}")
+        try:
+            fileobj.seek(0)
+            if _is_zip(filename):
+                with zipfile.ZipFile(fileobj) as z:
+                    yield from iter_zip_pdfs(z, workdir)
+            elif _is_pdf(filename):
+                path, content_hash = _spool(fileobj, workdir, ".pdf")
+                yield SpooledPdf(filename, path, content_hash)
+        except Exception as e:
+            print(f"    Error processing {filename}: {str(e)}")
+
+def persist_uploads(uploads: Iterable[Tuple[str, BinaryIO]], workdir: str) -> List[Tuple[str, str]]:
+    """
+    Copy uploaded files into `workdir` so they outlive the request (background
+    ranking jobs). Returns (filename, path) pairs in upload order.
+    """
+    saved = []
+    for filename, fileobj in uploads:
+        fileobj.seek(0)
+        suffix = ".zip" if _is_zip(filename) else ".pdf"
+        path, _ = _spool(fileobj, workdir, suffix)
+        saved.append((filename, path))
+    return saved
@@ -0,0 +1,113 @@
+import asyncio
+import signal
+import multiprocessing
+import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Iterable, Optional, Tuple
+from config import PDF_WORKERS, PDF_EXTRACTION_TIMEOUT, PDF_MAX_PAGES, PDF_MAX_IN_FLIGHT
+from utils.ingestion import SpooledPdf
+
+# Bounded process pool for CPU-bound PDF text extraction. Workers are spawned
+# (not forked) so they never inherit torch threads or Mongo sockets.
+_pool: Optional[ProcessPoolExecutor] = None
+
+# The extraction timeout is enforced inside the worker, so time spent queued
+# for a worker does not count against a file. SIGALRM (wall clock) raises
+# TimeoutError at the next Python instruction; a PDF stuck inside PyMuPDF's
+# C code is stopped by SIGPROF (CPU time, twice the timeout), whose default
+# action terminates the worker, and the pool is replaced. Platforms without
+# interval timers fall back to timing the whole submission.
+IN_WORKER_TIMEOUT = hasattr(signal, "setitimer")
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError(f"extraction timed out after {PDF_EXTRACTION_TIMEOUT}s")
+
+def _init_worker():
+    if IN_WORKER_TIMEOUT:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+def extract_text_from_pdf_path(path: str) -> str:
+    """Extract plain text from a PDF on disk using PyMuPDF (runs in a worker process)."""
+    if IN_WORKER_TIMEOUT:
+        signal.setitimer(signal.ITIMER_REAL, PDF_EXTRACTION_TIMEOUT)
+        signal.setitimer(signal.ITIMER_PROF, PDF_EXTRACTION_TIMEOUT * 2)
+    try:
+        with fitz.open(path, filetype="pdf") as doc:
+            # Cap page count so a pathological PDF cannot pin a worker indefinitely
+            pages = min(doc.page_count, PDF_MAX_PAGES)
+            # Form feeds keep page breaks for the condenser's header/footer detection
+            return "\n\f".join(doc[i].get_text() for i in range(pages))
+    finally:
+        if IN_WORKER_TIMEOUT:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+    return _pool
+
+def shutdown_extraction_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _replace_broken_pool(broken: ProcessPoolExecutor):
+    """Drop the pool only if it is still the one that broke, not a fresh one another task created."""
+    global _pool
+    if _pool is broken:
+        _pool = None
+        broken.shutdown(wait=False)
+
+async def _extract_one(pdf: SpooledPdf, retry_broken: bool = True) -> Tuple[SpooledPdf, str, Optional[str]]:
+    loop = asyncio.get_running_loop()
+    pool = get_extraction_pool()
+    try:
+        future = loop.run_in_executor(pool, extract_text_from_pdf_path, pdf.path)
+        text = await (future if IN_WORKER_TIMEOUT else asyncio.wait_for(future, timeout=PDF_EXTRACTION_TIMEOUT))
+        return pdf, text, None
+    except (TimeoutError, asyncio.TimeoutError):
+        return pdf, "", f"extraction timed out after {PDF_EXTRACTION_TIMEOUT}s"
+    except BrokenProcessPool:
+        # A worker died (crashed on a malformed PDF or was stopped by SIGPROF),
+        # failing every file in flight on that pool; retry once on a fresh pool
+        # so only the file that kills its worker again is reported
+        _replace_broken_pool(pool)
+        if retry_broken:
+            return await _extract_one(pdf, retry_broken=False)
+        return pdf, "", "extraction worker crashed"
+    except Exception as e:
+        return pdf, "", str(e)
+
+async def extract_texts(pdfs: Iterable[SpooledPdf],
+                        max_in_flight: int = PDF_MAX_IN_FLIGHT) -> AsyncIterator[Tuple[SpooledPdf, str, Optional[str]]]:
+    """
+    Extract text from spooled PDFs in parallel across the pool.
+    The source iterable is pulled lazily (off the event loop) and at most
+    `max_in_flight` files are pending at once. Yields (pdf, text, error) in
+    completion order; error is None on success.
+    """
+    loop = asyncio.get_running_loop()
+    source = iter(pdfs)
+    pending = set()
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) < max_in_flight:
+            pdf = await loop.run_in_executor(None, next, source, None)
+            if pdf is None:
+                exhausted = True
+                break
+            pending.add(asyncio.ensure_future(_extract_one(pdf)))
+        if not pending:
+            break
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield task.result()
@@ -0,0 +1,57 @@
+"""
+Requests/sec per worker for Mongo-bound endpoints.
+
+Start a single worker (uvicorn main:app --workers 1 from app/) and run this
+against it before and after a data-layer change:
+
+    python benchmarks/db_layer_rps.py --user-id <id> --email <email> --password <pw>
+
+Needs httpx (pip install httpx); it is not a runtime dependency of the app.
+"""
+import time
+import asyncio
+import argparse
+import httpx
+
+async def _worker(client: httpx.AsyncClient, make_request, deadline: float, counts: dict):
+    while time.monotonic() < deadline:
+        try:
+            response = await make_request(client)
+            counts["ok" if response.status_code < 400 else "errors"] += 1
+        except httpx.HTTPError:
+            counts["errors"] += 1
+
+async def measure(name: str, make_request, base_url: str, concurrency: int, duration: float):
+    counts = {"ok": 0, "errors": 0}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.monotonic() + duration
+        start = time.monotonic()
+        await asyncio.gather(*(_worker(client, make_request, deadline, counts) for _ in range(concurrency)))
+        elapsed = time.monotonic() - start
+    print(f"{name:<20} {counts['ok'] / elapsed:>10.1f} req/s  "
+          f"({counts['ok']} ok, {counts['errors']} errors, concurrency {concurrency})")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    await measure(
+        "screening_runs",
+        lambda c: c.get("/screening_runs/", params={"user_id": args.user_id, "limit": 10}),
+        args.base_url, args.concurrency, args.duration
+    )
+    await measure(
+        "login",
+        lambda c: c.post("/login", data={"username": args.email, "password": args.password}),
+        args.base_url, args.concurrency, args.duration
+    )
+
+if __name__ == "__main__":
+    asyncio.run(main())
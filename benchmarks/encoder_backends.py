@@ -0,0 +1,94 @@
+"""
+Parity and throughput of the bi-encoder backends on CPU.
+
+Export the model first (scripts/export_onnx_encoder.py), then from the
+repository root:
+
+    python benchmarks/encoder_backends.py [--texts-file resumes.txt] [--threads 4]
+
+Parity: per-text cosine between the PyTorch embeddings and the ONNX fp32 /
+int8 embeddings. Exits non-zero when the minimum falls below --min-cosine
+(fp32) or --min-cosine-int8. Throughput: texts/second per backend at the
+configured batch size. --texts-file holds one text per line; without it a
+synthetic resume-like corpus is used.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from sentence_transformers import SentenceTransformer  # noqa: E402
+from config import BI_ENCODER_MODEL, ONNX_MODEL_DIR, EMBED_BATCH_SIZE  # noqa: E402
+from ml.onnx_encoder import OnnxEncoder  # noqa: E402
+
+WORDS = ("python java kubernetes react sql aws docker team lead managed delivered designed built "
+         "pipeline service platform customers revenue latency analytics machine learning degree "
+         "university engineer senior project stakeholders agile testing migration cloud").split()
+
+def synthetic_texts(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 600))) for _ in range(count)]
+
+def throughput(encoder, texts, batch_size: int) -> float:
+    encoder.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    start = time.perf_counter()
+    encoder.encode(texts, batch_size=batch_size)
+    return len(texts) / (time.perf_counter() - start)
+
+def row_cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=BI_ENCODER_MODEL)
+    parser.add_argument("--onnx-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--texts-file")
+    parser.add_argument("--count", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=0, help="torch threads and ONNX intra-op threads (0 = default)")
+    parser.add_argument("--min-cosine", type=float, default=0.999)
+    parser.add_argument("--min-cosine-int8", type=float, default=0.98)
+    args = parser.parse_args()
+
+    if args.texts_file:
+        with open(args.texts_file) as f:
+            texts = [line.strip() for line in f if line.strip()][:args.count]
+    else:
+        texts = synthetic_texts(args.count)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    onnx_fp32 = OnnxEncoder(args.onnx_dir, quantized=False, intra_op_threads=args.threads)
+    onnx_int8 = OnnxEncoder(args.onnx_dir, quantized=True, intra_op_threads=args.threads)
+    reference = SentenceTransformer(args.model, device="cpu")
+    # Compare at the truncation length the export was made with
+    reference.max_seq_length = onnx_fp32.max_seq_length
+    backends = {
+        "torch-fp32": (reference, None),
+        "onnx-fp32": (onnx_fp32, args.min_cosine),
+        "onnx-int8": (onnx_int8, args.min_cosine_int8)
+    }
+    expected = reference.encode(texts, batch_size=args.batch_size, convert_to_numpy=True)
+
+    failed = False
+    print(f"{len(texts)} texts, batch size {args.batch_size}, max_seq_length {reference.max_seq_length}")
+    for name, (encoder, min_cosine) in backends.items():
+        rate = throughput(encoder, texts, args.batch_size)
+        line = f"{name:<12} {rate:>8.1f} texts/s"
+        if min_cosine is not None:
+            cosines = row_cosine(expected, np.asarray(encoder.encode(texts, batch_size=args.batch_size)))
+            ok = cosines.min() >= min_cosine
+            failed |= not ok
+            line += f"   cosine vs torch: min {cosines.min():.5f} mean {cosines.mean():.5f} {'ok' if ok else 'FAIL'}"
+        print(line)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
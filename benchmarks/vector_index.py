@@ -0,0 +1,90 @@
+"""
+Latency of the /find_alternatives vector index at scale, on synthetic rows.
+
+From the repository root:
+
+    python benchmarks/vector_index.py [--rows 1000000] [--dim 384] [--nlist N] [--path DIR]
+
+Builds and trains a throwaway index (in a temporary directory unless --path
+is given), then reports:
+  remap    time for a reader to pick up the index after another worker
+           appended rows (what every worker pays once per add)
+  search   p50/p95 of a global probe and of a per-user search
+The index files need about rows * (dim + 5) * 4 bytes of disk.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from bson import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from ml.vector_index import VectorIndex, GROW_ROWS, default_nlist  # noqa: E402
+
+def percentiles(samples_ms):
+    return f"p50 {np.percentile(samples_ms, 50):7.2f} ms  p95 {np.percentile(samples_ms, 95):7.2f} ms"
+
+def add_rows(index: VectorIndex, rng: np.random.Generator, rows: int, dim: int, users: int):
+    for start in range(0, rows, GROW_ROWS):
+        n = min(GROW_ROWS, rows - start)
+        index.add([str(ObjectId()) for _ in range(n)],
+                  [f"user{u}" for u in rng.integers(0, users, n)],
+                  rng.standard_normal((n, dim), dtype=np.float32))
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--nlist", type=int, default=0, help="coarse lists (default as in the build script)")
+    parser.add_argument("--sample-size", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--path", help="index directory (default: a temporary one, removed afterwards)")
+    args = parser.parse_args()
+
+    path = args.path or os.path.join(tempfile.mkdtemp(prefix="vector_index_bench_"), "index")
+    rng = np.random.default_rng(0)
+    try:
+        index = VectorIndex(path)
+        start = time.perf_counter()
+        add_rows(index, rng, args.rows, args.dim, args.users)
+        print(f"build    {args.rows} rows x {args.dim} in {time.perf_counter() - start:.1f} s")
+        start = time.perf_counter()
+        nlist = args.nlist or default_nlist(args.rows)
+        index.train(nlist, args.sample_size)
+        print(f"train    {nlist} lists in {time.perf_counter() - start:.1f} s")
+
+        reader = VectorIndex(path)
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        reader.search(queries[0], 10)
+
+        def add_then_remap():
+            add_rows(index, rng, 10, args.dim, args.users)
+            reader._current()
+
+        add_only = timed(lambda: add_rows(index, rng, 10, args.dim, args.users), 20)
+        add_remap = timed(add_then_remap, 20)
+        remap = np.maximum(np.array(add_remap) - np.median(add_only), 0)
+        print(f"remap    {percentiles(remap)}")
+
+        global_ms = timed(lambda q=iter(queries): reader.search(next(q), 10), args.queries)
+        print(f"search   global    {percentiles(global_ms)}")
+        user_ms = timed(lambda q=iter(queries): reader.search(next(q), 10, user_id="user0"), args.queries)
+        print(f"search   per-user  {percentiles(user_ms)}")
+    finally:
+        shutil.rmtree(os.path.dirname(path) if not args.path else path, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
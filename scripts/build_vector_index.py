@@ -0,0 +1,81 @@
+"""
+Rebuild the /find_alternatives vector index from every stored resume embedding.
+
+Run from the repository root with the app's config.json / .env in place:
+
+    python scripts/build_vector_index.py [--nlist N] [--sample-size 100000] [--iterations 100]
+
+The index is built next to VECTOR_INDEX_DIR, trained (IVF coarse centroids from mini-batch k-means,
+nlist defaults to ~4 * sqrt(rows)) and swapped in atomically; running workers
+remap it on their next query. Resumes stored while the build runs are added
+afterwards, so the script can run against a live deployment.
+"""
+import os
+import sys
+import shutil
+import argparse
+from datetime import datetime
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from config import get_resumes_collection, close_client, VECTOR_INDEX_DIR  # noqa: E402
+from ml.embedding_codec import decode_embedding, HAS_EMBEDDING, EMBEDDING_MODEL_KEY  # noqa: E402
+from ml.vector_index import VectorIndex, swap_in, default_nlist  # noqa: E402
+
+MIN_ROWS_FOR_TRAINING = 10000  # smaller pools are scanned exactly
+ADD_BATCH_SIZE = 10000
+
+def add_resumes(index: VectorIndex, query: dict) -> int:
+    added = 0
+    batch = []
+
+    def flush():
+        index.add([str(d["_id"]) for d in batch], [d["user_id"] for d in batch],
+                  np.stack([decode_embedding(d) for d in batch]))
+
+    projection = {"user_id": 1, "embedding": 1, "embedding_dtype": 1}
+    for doc in get_resumes_collection().find(query, projection, batch_size=1000):
+        batch.append(doc)
+        if len(batch) >= ADD_BATCH_SIZE:
+            flush()
+            added += len(batch)
+            batch = []
+            print(f"  indexed {added}")
+    if batch:
+        flush()
+        added += len(batch)
+    return added
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nlist", type=int, default=0, help="coarse lists (default ~4 * sqrt(rows))")
+    parser.add_argument("--sample-size", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=100, help="mini-batch k-means steps")
+    args = parser.parse_args()
+
+    base_query = {"embedding_model": EMBEDDING_MODEL_KEY, **HAS_EMBEDDING}
+    build_path = f"{os.path.normpath(VECTOR_INDEX_DIR)}.build"
+    shutil.rmtree(build_path, ignore_errors=True)
+    try:
+        build_start = datetime.now()
+        build = VectorIndex(build_path, model_key=EMBEDDING_MODEL_KEY)
+        rows = add_resumes(build, {**base_query, "created_at": {"$lt": build_start}})
+        print(f"Indexed {rows} resumes")
+        if not rows:
+            return
+        if rows >= MIN_ROWS_FOR_TRAINING:
+            nlist = args.nlist or default_nlist(rows)
+            print(f"Training {nlist} coarse lists on up to {args.sample_size} rows...")
+            build.train(nlist, args.sample_size, args.iterations)
+
+        swap_in(build_path, VECTOR_INDEX_DIR)
+        live = VectorIndex(VECTOR_INDEX_DIR, model_key=EMBEDDING_MODEL_KEY)
+        caught_up = add_resumes(live, {**base_query, "created_at": {"$gte": build_start}})
+        print(f"Swapped in new index; added {caught_up} resumes stored during the build")
+    finally:
+        shutil.rmtree(build_path, ignore_errors=True)
+        close_client()
+
+if __name__ == "__main__":
+    main()
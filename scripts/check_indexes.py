@@ -0,0 +1,42 @@
+"""
+Check that every hot query is served by an index.
+
+Run from the repository root with the app's config.json / .env in place:
+
+    python scripts/check_indexes.py [--ensure]
+
+Each query shape in indexes.HOT_QUERIES is explained against the configured
+database; the script exits non-zero if any winning plan is not an index scan.
+--ensure reconciles the index registry first (the app does this at startup).
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from config import close_client  # noqa: E402
+import indexes  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ensure", action="store_true", help="reconcile the index registry before checking")
+    args = parser.parse_args()
+
+    try:
+        if args.ensure:
+            indexes.ensure_indexes()
+        results = indexes.explain_hot_queries()
+    finally:
+        close_client()
+
+    for label, indexed, stages in results:
+        print(f"{'ok  ' if indexed else 'FAIL'} {label}: {' <- '.join(stages)}")
+    failed = [label for label, indexed, _ in results if not indexed]
+    if failed:
+        print(f"{len(failed)} of {len(results)} hot queries are not index scans")
+        sys.exit(1)
+    print(f"All {len(results)} hot queries use an index")
+
+if __name__ == "__main__":
+    main()
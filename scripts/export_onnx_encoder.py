@@ -0,0 +1,121 @@
+"""
+Export a SentenceTransformer bi-encoder to ONNX for ENCODER_BACKEND=onnx.
+
+    python scripts/export_onnx_encoder.py [--model all-MiniLM-L6-v2] [--output-dir DIR] [--no-quantize]
+
+--model also accepts a local directory, e.g. the fine-tuned bert-mini written
+by app/ml/bert.py (output_bert_mini_job_resume). The output directory
+(ONNX_MODEL_DIR by default) gets model.onnx, a dynamically int8-quantized
+model.int8.onnx, the tokenizer files and encoder_config.json (pooling,
+normalization, max length, dimension, source model). The app only loads an
+export whose source model is BI_ENCODER_MODEL.
+
+Needs onnx and onnxruntime (pip install onnx onnxruntime). Verify the export
+with benchmarks/encoder_backends.py before switching the backend.
+"""
+import os
+import sys
+import json
+import argparse
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from sentence_transformers import SentenceTransformer, models  # noqa: E402
+from config import BI_ENCODER_MODEL, BI_ENCODER_MAX_SEQ_LENGTH, ONNX_MODEL_DIR  # noqa: E402
+from ml.onnx_encoder import ENCODER_CONFIG_FILE, FP32_MODEL_FILE, INT8_MODEL_FILE  # noqa: E402
+
+class _HiddenStates(torch.nn.Module):
+    """Positional-argument wrapper returning last_hidden_state for tracing."""
+
+    def __init__(self, auto_model, input_names):
+        super().__init__()
+        self.auto_model = auto_model
+        self.input_names = input_names
+
+    def forward(self, *inputs):
+        return self.auto_model(**dict(zip(self.input_names, inputs)), return_dict=True).last_hidden_state
+
+def _fuse(path: str, model_type: str):
+    """
+    Fuse attention, LayerNorm and GELU subgraphs with ONNX Runtime's
+    transformer optimizer where it knows the architecture. The fused graph is
+    also what gets quantized, so int8 MatMuls land inside the fused kernels.
+    """
+    from onnxruntime.transformers.optimizer import optimize_model
+    from onnxruntime.transformers.optimizer import MODEL_TYPES
+    fusion_type = model_type if model_type in MODEL_TYPES else "bert" if "bert" in model_type else None
+    if fusion_type is None:
+        print(f"No ONNX Runtime fusions for {model_type}, keeping the plain export")
+        return
+    # num_heads/hidden_size 0: read them from the graph
+    optimize_model(path, model_type=fusion_type, num_heads=0, hidden_size=0).save_model_to_file(path)
+    print(f"Applied {fusion_type} fusions to {path}")
+
+def export(model_name: str, output_dir: str, max_seq_length: int, quantize: bool, opset: int):
+    model = SentenceTransformer(model_name, device="cpu")
+    model.max_seq_length = max_seq_length
+    transformer = model[0]
+    pooling = next(m for m in model if isinstance(m, models.Pooling)).get_config_dict()
+    # Older sentence-transformers releases store one flag per pooling mode
+    pooling_mode = pooling.get("pooling_mode") or (
+        "cls" if pooling.get("pooling_mode_cls_token")
+        else "mean" if pooling.get("pooling_mode_mean_tokens") else None
+    )
+    if pooling_mode not in ("cls", "mean"):
+        raise ValueError("Only mean and CLS pooling can be exported")
+    normalize = any(isinstance(m, models.Normalize) for m in model)
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = transformer.tokenizer
+    sample = tokenizer(["Export sample sentence.", "Another one"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    fp32_path = os.path.join(output_dir, FP32_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            _HiddenStates(transformer.auto_model.eval(), input_names),
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            # TorchScript exporter: takes dynamic_axes as-is and needs no onnxscript
+            dynamo=False
+        )
+    if model_type := transformer.auto_model.config.model_type:
+        _fuse(fp32_path, model_type)
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, ENCODER_CONFIG_FILE), "w") as f:
+        json.dump({
+            "source_model": model_name,
+            "max_seq_length": max_seq_length,
+            "pooling": pooling_mode,
+            "normalize": normalize,
+            "dim": model.get_sentence_embedding_dimension()
+        }, f, indent=2)
+    print(f"Exported {model_name} to {fp32_path} ({pooling_mode} pooling, normalize={normalize})")
+
+    if quantize:
+        from onnx import TensorProto
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        int8_path = os.path.join(output_dir, INT8_MODEL_FILE)
+        # Shape inference cannot type the outputs of fused contrib ops
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8,
+                         extra_options={"DefaultTensorType": TensorProto.FLOAT})
+        print(f"Quantized to {int8_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=BI_ENCODER_MODEL)
+    parser.add_argument("--output-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--max-seq-length", type=int, default=BI_ENCODER_MAX_SEQ_LENGTH)
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    export(args.model, args.output_dir, args.max_seq_length, not args.no_quantize, args.opset)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Rewrite resume embeddings stored as BSON arrays into packed Binary vectors.
+
+Run from the repository root with the app's config.json / .env in place:
+
+    python scripts/migrate_embeddings.py [--dtype float32|float16] [--batch-size 500] [--dry-run]
+
+Safe to re-run: only documents whose embedding is still an array are touched.
+"""
+import os
+import sys
+import argparse
+from pymongo import UpdateOne
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from config import get_resumes_collection, close_client  # noqa: E402
+from ml.embedding_codec import encode_embedding, STORAGE_DTYPES  # noqa: E402
+
+def migrate(dtype: str, batch_size: int, dry_run: bool) -> int:
+    resumes = get_resumes_collection()
+    query = {"embedding": {"$type": "array"}}
+    print(f"{resumes.count_documents(query)} resumes still store embeddings as arrays")
+    if dry_run:
+        return 0
+
+    migrated = 0
+    ops = []
+    # Updated documents drop out of the query, so the cursor only sees each one once
+    for doc in resumes.find(query, {"embedding": 1}, batch_size=batch_size):
+        if doc["embedding"]:
+            update = {"$set": encode_embedding(doc["embedding"], dtype)}
+        else:
+            update = {"$unset": {"embedding": ""}}
+        ops.append(UpdateOne({"_id": doc["_id"]}, update))
+        if len(ops) >= batch_size:
+            migrated += resumes.bulk_write(ops, ordered=False).modified_count
+            ops = []
+            print(f"  migrated {migrated}")
+    if ops:
+        migrated += resumes.bulk_write(ops, ordered=False).modified_count
+    return migrated
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dtype", choices=sorted(STORAGE_DTYPES), default="float32")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    try:
+        migrated = migrate(args.dtype, args.batch_size, args.dry_run)
+        print(f"Migrated {migrated} resumes to packed {args.dtype} embeddings")
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+import json
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+# Tests load the real config module from a config file holding only the
+# required keys, so every other setting has its default regardless of the
+# local config.json. Set KANDIDEX_CONFIG to run them against another file.
+TEST_CONFIG = {
+    "MONGODB_URI": "mongodb://localhost:27017",
+    "MONGODB_DB_NAME": "KandidexTest",
+    "JWT_SECRET_KEY": "test-secret",
+    "JWT_ALGORITHM": "HS256",
+    "OPENAI_API_KEY": "test-key"
+}
+
+if "KANDIDEX_CONFIG" not in os.environ:
+    _config_dir = tempfile.mkdtemp(prefix="kandidex_test_config_")
+    os.environ["KANDIDEX_CONFIG"] = os.path.join(_config_dir, "config.json")
+    with open(os.environ["KANDIDEX_CONFIG"], "w") as f:
+        json.dump(TEST_CONFIG, f)
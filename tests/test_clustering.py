@@ -0,0 +1,109 @@
+import time
+import asyncio
+from functools import partial
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from services import clustering  # noqa: E402
+from ml.embedding_codec import encode_embedding, EMBEDDING_MODEL_KEY  # noqa: E402
+
+CLUSTERS = 4
+
+def bulk_write(collection, requests, ordered=True):
+    # mongomock's bulk_write does not accept the operations of this pymongo version
+    modified = sum(collection.update_one(op._filter, op._doc).modified_count for op in requests)
+    return SimpleNamespace(modified_count=modified)
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient()["clustering_test"]
+    monkeypatch.setattr(clustering, "get_clusters_collection", lambda: db.clusters)
+    monkeypatch.setattr(clustering, "get_resumes_collection", lambda: db.resumes)
+    monkeypatch.setattr(mongomock.Collection, "bulk_write", bulk_write)
+    monkeypatch.setattr(clustering, "fit_clusters", partial(clustering.fit_clusters, n_clusters=CLUSTERS))
+    monkeypatch.setattr(clustering, "CLUSTER_REFIT_HOURS", 24)
+    monkeypatch.setattr(clustering, "_model", None)
+    monkeypatch.setattr(clustering, "_model_loaded_at", 0.0)
+    monkeypatch.setattr(clustering, "_refit_task", None)
+    monkeypatch.setattr(clustering, "_stop", clustering.threading.Event())
+    monkeypatch.setattr(clustering, "CLUSTER_RELOAD_SECONDS", 0)
+    rng = np.random.default_rng(0)
+    centers = np.eye(16, dtype=np.float32)[:CLUSTERS] * 10
+    labels = np.repeat(np.arange(CLUSTERS), 50)
+    vectors = centers[labels] + rng.standard_normal((labels.shape[0], 16), dtype=np.float32)
+    db.resumes.insert_many([
+        {"embedding_model": EMBEDDING_MODEL_KEY, "blob": int(label), **encode_embedding(vector, "float32")}
+        for vector, label in zip(vectors, labels)
+    ])
+    return db
+
+def run(coroutine_fn):
+    async def main():
+        clustering._wake = asyncio.Event()
+        return await coroutine_fn()
+    return asyncio.run(main())
+
+def lease(db):
+    return db.clusters.find_one({"_id": clustering.LEASE_ID})
+
+def test_refit_assigns_every_resume_and_releases_the_lease(db):
+    version = run(clustering.refit_if_due)
+    assert version == 1
+    resumes = list(db.resumes.find())
+    assert all(r["cluster_version"] == 1 for r in resumes)
+    by_blob = {}
+    for r in resumes:
+        by_blob.setdefault(r["blob"], set()).add(r["cluster_id"])
+    assert all(len(ids) == 1 for ids in by_blob.values()) and len(set.union(*by_blob.values())) == CLUSTERS
+    model = db.clusters.find_one({"_id": clustering.MODEL_ID})
+    assert model["reassigned"] and model["k"] == CLUSTERS
+    assert lease(db)["lease_until"] == datetime.min
+    # Fresh and fully reassigned: nothing to do
+    assert run(clustering.refit_if_due) is None
+
+def test_assign_is_stable_for_a_stored_model(db):
+    run(clustering.refit_if_due)
+    stored = {r["_id"]: r["cluster_id"] for r in db.resumes.find()}
+    docs = list(db.resumes.find())
+    vectors = np.stack([np.frombuffer(d["embedding"], dtype="<f4") for d in docs])
+    for _ in range(2):
+        ids, version = clustering.assign(vectors)
+        assert version == 1
+        assert ids == [stored[d["_id"]] for d in docs]
+
+def test_lease_held_elsewhere_skips_the_refit(db):
+    db.clusters.insert_one({"_id": clustering.LEASE_ID, "owner": "other:1",
+                            "lease_until": datetime.now() + timedelta(hours=1)})
+    assert run(clustering.refit_if_due) is None
+    assert db.clusters.find_one({"_id": clustering.MODEL_ID}) is None
+    assert lease(db)["owner"] == "other:1"
+
+def test_shutdown_during_reassign_releases_the_lease(db, monkeypatch):
+    # The second reassign pass waits out the model reload interval; stop during that wait
+    monkeypatch.setattr(clustering, "CLUSTER_RELOAD_SECONDS", 60)
+
+    async def main():
+        clustering.start_refit_task()
+        deadline = time.monotonic() + 30
+        while db.clusters.find_one({"_id": clustering.MODEL_ID}) is None or \
+                db.resumes.find_one({"cluster_version": {"$exists": False}}) is not None:
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.01)
+        assert lease(db)["lease_until"] > datetime.now()
+        started = time.monotonic()
+        await clustering.stop_refit_task()
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 5
+    assert lease(db)["lease_until"] == datetime.min
+    # The interrupted refit is finished by the next one, without refitting
+    assert db.clusters.find_one({"_id": clustering.MODEL_ID})["reassigned"] is False
+    monkeypatch.setattr(clustering, "CLUSTER_RELOAD_SECONDS", 0)
+    monkeypatch.setattr(clustering, "_stop", clustering.threading.Event())
+    assert run(clustering.refit_if_due) == 1
+    assert db.clusters.find_one({"_id": clustering.MODEL_ID})["reassigned"] is True
@@ -0,0 +1,93 @@
+from utils import condense
+from utils.condense import normalize_text, normalize_pages, strip_boilerplate, drop_sections, split_sections, _pack
+
+
+def test_normalize_text_collapses_whitespace_and_bullets():
+    text = "  Jane   Doe \n\n• Built  APIs\n●\n▪ Led team"
+    assert normalize_text(text) == ["Jane Doe", "- Built APIs", "- Led team"]
+
+
+def test_normalize_text_wraps_long_lines():
+    lines = normalize_text("word " * 100)
+    assert len(lines) > 1
+    assert all(len(line) <= condense.MAX_LINE_CHARS for line in lines)
+
+
+def test_normalize_pages_splits_on_form_feeds():
+    assert normalize_pages("a\nb\n\fc") == [["a", "b"], ["c"]]
+
+
+def test_strip_boilerplate_keeps_repeated_job_titles():
+    lines = normalize_text(
+        "Jane Doe\nExperience\nSoftware Engineer\nAcme 2018 - 2021\n- Built APIs\n"
+        "Software Engineer\nGlobex 2021 - Present\n- Built APIs\nSoftware Engineer\nInitech 2016 - 2018"
+    )
+    kept = strip_boilerplate([lines])
+    assert kept.count("Software Engineer") == 3
+    assert kept.count("- Built APIs") == 2
+    assert kept.index("Globex 2021 - Present") == kept.index("Software Engineer", 3) + 1
+
+
+def test_strip_boilerplate_drops_running_headers_and_page_numbers():
+    pages = normalize_pages(
+        "Jane Doe - Resume\nExperience\n- Built APIs\nPage 1 of 2\n\f"
+        "Jane Doe - Resume\nSkills\nPython\nPage 2 of 2"
+    )
+    assert strip_boilerplate(pages) == ["Jane Doe - Resume", "Experience", "- Built APIs", "Skills", "Python"]
+
+
+def test_strip_boilerplate_repeats_inside_a_page_are_kept():
+    pages = normalize_pages("Header\nSkills\nPython\nPython\nFooter\n\fHeader\nEducation\nBSc\nFooter")
+    assert strip_boilerplate(pages) == ["Header", "Skills", "Python", "Python", "Footer", "Education", "BSc"]
+
+
+def test_strip_boilerplate_drops_frequent_short_lines_without_page_breaks():
+    lines = ["Jane Doe", "Confidential", "Skills", "Python", "Confidential", "Education", "BSc", "Confidential"]
+    assert strip_boilerplate([lines]) == ["Jane Doe", "Confidential", "Skills", "Python", "Education", "BSc"]
+
+
+def test_split_sections_groups_lines_under_headings():
+    lines = ["Jane Doe", "Work Experience:", "- Built APIs", "References", "Available", "Skills", "Python"]
+    assert split_sections(lines) == [
+        ("header", None, ["Jane Doe"]),
+        ("experience", "Work Experience:", ["- Built APIs"]),
+        ("skills", "Skills", ["Python"])
+    ]
+
+
+def test_drop_sections_removes_references_and_hobbies():
+    lines = ["Jane Doe", "References", "John Smith, Acme", "Skills", "Python", "Hobbies", "Chess"]
+    assert drop_sections(lines) == ["Jane Doe", "Skills", "Python"]
+
+
+def test_pack_keeps_sections_contiguous_within_budget():
+    sections = [
+        ("header", None, ["Jane Doe"]),
+        ("experience", "Experience", ["- " + "built things " * 5] * 20),
+        ("skills", "Skills", ["Python, SQL"])
+    ]
+    kept = _pack(sections, 100)
+    assert kept[0] == ["Jane Doe"]
+    assert kept[2] == ["Python, SQL"]
+    assert 0 < len(kept[1]) < 20
+    used = sum(condense.count_tokens(line) + 1 for body in kept for line in body)
+    assert used <= 100
+
+
+def test_pack_everything_fits():
+    sections = [("header", None, ["Jane Doe"]), ("skills", "Skills", ["Python"])]
+    assert _pack(sections, 1000) == [["Jane Doe"], ["Python"]]
+
+
+def test_condense_resume_respects_budget():
+    text = "Jane Doe\nExperience\n" + "\n".join(f"- Shipped feature {i} across teams" for i in range(300))
+    condensed, tokens, raw_tokens = condense.condense_resume(text, budget=200)
+    assert tokens <= 200 < raw_tokens
+    assert condensed.startswith("Jane Doe")
+
+
+def test_condense_resume_under_budget_still_drops_references():
+    text = "Jane Doe\nSkills\nPython\nReferences\nJohn Smith, Acme Corp\nAvailable on request"
+    condensed, tokens, raw_tokens = condense.condense_resume(text, budget=1000)
+    assert condensed == "Jane Doe\nSkills\nPython"
+    assert tokens < raw_tokens
@@ -0,0 +1,65 @@
+import pytest
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+mongomock = pytest.importorskip("mongomock")
+
+import indexes  # noqa: E402
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient()["indexes_test"]
+    monkeypatch.setattr(indexes, "get_db", lambda: db)
+    return db
+
+def test_creates_missing_indexes_then_leaves_them(db):
+    counts = indexes.ensure_indexes()
+    assert counts["created"] == len(indexes.INDEXES) and counts["failed"] == 0
+    assert indexes.ensure_indexes()["unchanged"] == len(indexes.INDEXES)
+
+def test_rebuild_replaces_the_old_index_after_building_the_new_one(db):
+    db.users.create_index("email", name="email_1")
+    counts = indexes.ensure_indexes()
+    assert counts["rebuilt"] == 1
+    info = db.users.index_information()
+    assert "email_1" not in info and info["email_1_rebuild"]["unique"]
+    assert indexes.ensure_indexes()["unchanged"] == len(indexes.INDEXES)
+
+def test_failed_rebuild_keeps_the_existing_index(db):
+    db.users.create_index("email", name="email_1")
+    db.users.insert_many([{"email": "a@example.com"}, {"email": "a@example.com"}])
+    counts = indexes.ensure_indexes()
+    assert counts["failed"] == 1
+    info = db.users.index_information()
+    assert "email_1" in info and not info["email_1"].get("unique")
+    assert "email_1_rebuild" not in info
+
+def test_server_conflict_changes_options_in_place(db, monkeypatch):
+    db.llm_cache.create_index("expires_at", name="expires_at_1", expireAfterSeconds=60)
+    create_index = mongomock.Collection.create_index
+
+    def one_index_per_key_pattern(self, keys, **kwargs):
+        if kwargs.get("name", "").endswith(indexes.REBUILD_SUFFIX):
+            raise OperationFailure("Index already exists with a different name", code=85)
+        return create_index(self, keys, **kwargs)
+
+    commands = []
+    monkeypatch.setattr(mongomock.Collection, "create_index", one_index_per_key_pattern)
+    monkeypatch.setattr(db, "command", lambda *args, **kwargs: commands.append((args, kwargs)))
+    assert indexes.ensure_indexes()["rebuilt"] == 1
+    assert commands == [(("collMod", "llm_cache"), {"index": {"name": "expires_at_1", "expireAfterSeconds": 0}})]
+    assert "expires_at_1" in db.llm_cache.index_information()
+
+def test_change_that_cannot_be_made_in_place_is_left_alone(db, monkeypatch):
+    db.users.create_index("email", name="email_1", unique=True, expireAfterSeconds=60)
+    monkeypatch.setattr(mongomock.Collection, "create_index",
+                        lambda self, keys, **kwargs: (_ for _ in ()).throw(OperationFailure("conflict", code=85)))
+    counts = indexes.ensure_indexes()
+    assert counts["failed"] == len(indexes.INDEXES)
+    assert "email_1" in db.users.index_information()
+
+def test_unreachable_server_is_logged_not_raised(db, monkeypatch):
+    def unreachable(self):
+        raise ServerSelectionTimeoutError("no servers")
+
+    monkeypatch.setattr(mongomock.Collection, "index_information", unreachable)
+    assert indexes.ensure_indexes()["failed"] == len(indexes.INDEXES)
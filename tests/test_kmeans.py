@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from ml.kmeans import MiniBatchKMeans
+
+def blobs(seed: int = 0, clusters: int = 4, per_cluster: int = 300, dim: int = 16):
+    """Well separated spherical blobs: (points, true labels, unit centers)."""
+    rng = np.random.default_rng(seed)
+    centers = np.eye(dim, dtype=np.float32)[:clusters] * 10
+    labels = np.repeat(np.arange(clusters), per_cluster)
+    points = centers[labels] + rng.standard_normal((labels.shape[0], dim), dtype=np.float32)
+    return points, labels, centers / 10
+
+def test_converges_on_separable_blobs():
+    points, labels, centers = blobs()
+    kmeans = MiniBatchKMeans(4, batch_size=256, max_iter=200, seed=0).fit(points)
+    predicted = kmeans.predict(points)
+    # Every blob lands in one cluster and no two blobs share one
+    mapping = {true: set(predicted[labels == true]) for true in range(4)}
+    assert all(len(found) == 1 for found in mapping.values())
+    assert len(set.union(*mapping.values())) == 4
+    # Centroids sit on the blob centers (cosine, since the model is spherical)
+    for true, found in mapping.items():
+        assert kmeans.centroids[found.pop()] @ centers[true] > 0.95
+
+def test_stops_once_centroids_settle():
+    points, _, _ = blobs()
+    kmeans = MiniBatchKMeans(4, batch_size=256, max_iter=1000, tol=1e-3, seed=0)
+    steps = []
+    original = kmeans.partial_fit
+    kmeans.partial_fit = lambda X: steps.append(1) or original(X)
+    kmeans.fit(points)
+    assert len(steps) < 1000
+
+def test_same_seed_gives_the_same_assignment():
+    points, _, _ = blobs(seed=1)
+    first = MiniBatchKMeans(4, batch_size=128, seed=7).fit(points)
+    second = MiniBatchKMeans(4, batch_size=128, seed=7).fit(points)
+    np.testing.assert_array_equal(first.centroids, second.centroids)
+    np.testing.assert_array_equal(first.predict(points), second.predict(points))
+
+def test_from_centroids_assigns_like_the_fitted_model():
+    points, _, _ = blobs(seed=2)
+    fitted = MiniBatchKMeans(4, seed=0).fit(points)
+    stored = fitted.centroids.astype("<f4").tobytes()
+    restored = MiniBatchKMeans.from_centroids(np.frombuffer(stored, dtype="<f4").reshape(4, -1))
+    np.testing.assert_array_equal(restored.predict(points), fitted.predict(points))
+
+def test_too_few_points_and_unfitted_predict_raise():
+    with pytest.raises(ValueError):
+        MiniBatchKMeans(8).fit(np.ones((4, 3)))
+    with pytest.raises(RuntimeError):
+        MiniBatchKMeans(2).predict(np.ones((1, 3)))
@@ -0,0 +1,64 @@
+import os
+import random
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from config import BI_ENCODER_MODEL, ONNX_MODEL_DIR  # noqa: E402
+from ml.onnx_encoder import OnnxEncoder, ENCODER_CONFIG_FILE, FP32_MODEL_FILE, INT8_MODEL_FILE  # noqa: E402
+
+# Thresholds match benchmarks/encoder_backends.py: per-text cosine against the
+# PyTorch embeddings, and overlap of the top-k ranking for a job description.
+MIN_COSINE = {False: 0.999, True: 0.98}
+MIN_TOP_K_OVERLAP = {False: 0.9, True: 0.8}
+TOP_K = 10
+
+WORDS = ("python java kubernetes react sql aws docker team lead managed delivered designed built "
+         "pipeline service platform customers revenue latency analytics machine learning degree "
+         "university engineer senior project stakeholders agile testing migration cloud").split()
+JOB_DESCRIPTION = ("Senior backend engineer to lead a cloud migration: python, kubernetes, aws, "
+                   "sql, designing latency-sensitive services for customers.")
+
+missing = [f for f in (ENCODER_CONFIG_FILE, FP32_MODEL_FILE, INT8_MODEL_FILE)
+           if not os.path.exists(os.path.join(ONNX_MODEL_DIR, f))]
+pytestmark = pytest.mark.skipif(
+    bool(missing), reason=f"no exported model in {ONNX_MODEL_DIR}; run scripts/export_onnx_encoder.py"
+)
+
+def synthetic_texts(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 600))) for _ in range(count)]
+
+def normalized(embeddings: np.ndarray) -> np.ndarray:
+    return embeddings / np.linalg.norm(embeddings, axis=-1, keepdims=True)
+
+@pytest.fixture(scope="module")
+def reference():
+    try:
+        model = sentence_transformers.SentenceTransformer(BI_ENCODER_MODEL, device="cpu")
+    except OSError as e:
+        pytest.skip(f"reference model {BI_ENCODER_MODEL} unavailable: {e}")
+    return model
+
+@pytest.fixture(scope="module")
+def texts():
+    return synthetic_texts(64)
+
+@pytest.mark.parametrize("quantized", [False, True], ids=["fp32", "int8"])
+def test_onnx_embeddings_match_pytorch(reference, texts, quantized):
+    encoder = OnnxEncoder(ONNX_MODEL_DIR, quantized=quantized)
+    reference.max_seq_length = encoder.max_seq_length
+
+    expected = normalized(reference.encode(texts, convert_to_numpy=True))
+    actual = normalized(encoder.encode(texts))
+    assert actual.shape == expected.shape
+    cosine = (expected * actual).sum(axis=1)
+    assert cosine.min() >= MIN_COSINE[quantized]
+
+    query = normalized(reference.encode(JOB_DESCRIPTION, convert_to_numpy=True))
+    onnx_query = normalized(encoder.encode(JOB_DESCRIPTION))
+    expected_top = set(np.argsort(-(expected @ query))[:TOP_K])
+    actual_top = set(np.argsort(-(actual @ onnx_query))[:TOP_K])
+    assert len(expected_top & actual_top) / TOP_K >= MIN_TOP_K_OVERLAP[quantized]
@@ -0,0 +1,136 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import RateLimitError
+
+from services import openai_limiter
+from services.openai_limiter import TokenBucket, AdaptiveConcurrency
+
+COMPLETION = {
+    "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-test",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+}
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """Serves scripted (status, headers) responses to /v1/chat/completions, then 200s."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeHandler)
+        self.script = []
+        self.request_times = []
+
+class FakeHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        self.server.request_times.append(time.monotonic())
+        status, headers = self.server.script.pop(0) if self.server.script else (200, {})
+        body = json.dumps(COMPLETION if status == 200 else {"error": {"message": "scripted", "type": "test"}}).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeOpenAI()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(openai_limiter, "OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setattr(openai_limiter, "OPENAI_MAX_RETRIES", 2)
+    monkeypatch.setattr(openai_limiter, "_limiter", None)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_token_bucket_refills_at_the_configured_rate(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(openai_limiter.time, "monotonic", lambda: clock[0])
+    bucket = TokenBucket(per_minute=60)
+    bucket.debit(60)
+    assert bucket.tokens == 0
+    clock[0] += 10
+    bucket._refill()
+    assert bucket.tokens == pytest.approx(10)
+    clock[0] += 600
+    bucket._refill()
+    assert bucket.tokens == bucket.capacity
+    bucket.drain()
+    assert bucket.tokens == 0
+
+def test_token_bucket_acquire_waits_for_refill():
+    async def run():
+        bucket = TokenBucket(per_minute=600)  # 10 per second
+        await bucket.acquire(600)
+        start = time.monotonic()
+        await bucket.acquire(3)
+        return time.monotonic() - start
+
+    assert 0.25 <= asyncio.run(run()) < 1.0
+
+def test_adaptive_concurrency_is_aimd():
+    concurrency = AdaptiveConcurrency(maximum=8)
+    concurrency.decrease()
+    assert concurrency.limit == 4
+    concurrency.increase()
+    assert concurrency.limit == pytest.approx(4.25)
+    for _ in range(100):
+        concurrency.increase()
+    assert concurrency.limit == 8
+    for _ in range(10):
+        concurrency.decrease()
+    assert concurrency.limit == 1
+
+def test_adaptive_concurrency_caps_in_flight_calls():
+    async def run():
+        concurrency = AdaptiveConcurrency(maximum=2)
+        await concurrency.acquire()
+        await concurrency.acquire()
+        waiter = asyncio.ensure_future(concurrency.acquire())
+        await asyncio.sleep(0.05)
+        blocked = not waiter.done()
+        await concurrency.release()
+        await asyncio.wait_for(waiter, 1)
+        return blocked
+
+    assert asyncio.run(run())
+
+def test_429_honours_retry_after_and_halves_concurrency(server):
+    server.script = [(429, {"retry-after-ms": "300"})]
+    completion = asyncio.run(openai_limiter.chat_completion(model="gpt-test", messages=MESSAGES))
+    assert completion.choices[0].message.content == "ok"
+    assert len(server.request_times) == 2
+    assert server.request_times[1] - server.request_times[0] >= 0.3
+    halved = openai_limiter.OPENAI_MAX_CONCURRENCY / 2
+    assert openai_limiter.get_limiter().concurrency.limit == pytest.approx(halved + 1 / halved)
+
+def test_server_error_retries_with_jittered_exponential_backoff(server, monkeypatch):
+    bounds = []
+    monkeypatch.setattr(openai_limiter.random, "uniform", lambda low, high: bounds.append(high) or 0.0)
+    server.script = [(500, {}), (503, {})]
+    completion = asyncio.run(openai_limiter.chat_completion(model="gpt-test", messages=MESSAGES))
+    assert completion.choices[0].message.content == "ok"
+    assert bounds == [2 * openai_limiter.BACKOFF_BASE_SECONDS, 4 * openai_limiter.BACKOFF_BASE_SECONDS]
+
+def test_gives_up_after_max_retries(server):
+    server.script = [(429, {"retry-after": "0"})] * 5
+    with pytest.raises(RateLimitError):
+        asyncio.run(openai_limiter.chat_completion(model="gpt-test", messages=MESSAGES))
+    assert len(server.request_times) == openai_limiter.OPENAI_MAX_RETRIES + 1
+
+def test_low_rate_limit_headroom_shrinks_concurrency(server):
+    server.script = [(200, {"x-ratelimit-limit-requests": "100", "x-ratelimit-remaining-requests": "5"})]
+    asyncio.run(openai_limiter.chat_completion(model="gpt-test", messages=MESSAGES))
+    limiter = openai_limiter.get_limiter()
+    assert limiter.concurrency.limit == pytest.approx(openai_limiter.OPENAI_MAX_CONCURRENCY * 0.75)
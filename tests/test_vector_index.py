@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from ml import vector_index
+from ml.vector_index import VectorIndex
+
+DIM = 32
+
+def clustered_rows(rng: np.random.Generator, count: int, centers: int = 20):
+    """Rows around `centers` random directions, like embeddings of related resumes."""
+    directions = rng.standard_normal((centers, DIM)).astype(np.float32)
+    return directions[rng.integers(0, centers, count)] + 0.3 * rng.standard_normal((count, DIM), dtype=np.float32)
+
+def add(index: VectorIndex, vectors: np.ndarray, users):
+    resume_ids = [str(ObjectId()) for _ in range(len(vectors))]
+    index.add(resume_ids, list(users), vectors)
+    return resume_ids
+
+def brute_force(vectors: np.ndarray, resume_ids, query: np.ndarray, k: int):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = vectors @ (query / np.linalg.norm(query))
+    return [resume_ids[i] for i in np.argsort(-scores)[:k]]
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "index")
+
+def test_untrained_index_is_exact(index_path):
+    rng = np.random.default_rng(0)
+    vectors = clustered_rows(rng, 500)
+    index = VectorIndex(index_path)
+    resume_ids = add(index, vectors, ["u"] * 500)
+    query = vectors[7]
+    results = index.search(query, 10)
+    assert [r for r, _ in results] == brute_force(vectors, resume_ids, query, 10)
+    assert results[0] == (resume_ids[7], pytest.approx(1.0, abs=1e-5))
+
+def test_trained_search_recall_against_brute_force(index_path):
+    rng = np.random.default_rng(0)
+    vectors = clustered_rows(rng, 5000)
+    index = VectorIndex(index_path)
+    resume_ids = add(index, vectors, [f"user{u}" for u in rng.integers(0, 10, 5000)])
+    index.train(nlist=40, sample_size=5000, seed=0)
+    assert index.get_stats()["nlist"] == 40
+
+    recalls = []
+    for row in rng.integers(0, 5000, 50):
+        query = vectors[row] + 0.1 * rng.standard_normal(DIM, dtype=np.float32)
+        found = {r for r, _ in index.search(query, 10, nprobe=8)}
+        recalls.append(len(found & set(brute_force(vectors, resume_ids, query, 10))) / 10)
+    assert np.mean(recalls) >= 0.95
+
+def test_user_filter_only_returns_that_users_rows(index_path, monkeypatch):
+    rng = np.random.default_rng(1)
+    vectors = clustered_rows(rng, 3000)
+    users = [f"user{u}" for u in rng.integers(0, 3, 3000)]
+    index = VectorIndex(index_path)
+    resume_ids = add(index, vectors, users)
+    index.train(nlist=20, sample_size=3000, seed=0)
+    owned = [i for i, u in enumerate(users) if u == "user1"]
+    query = vectors[owned[0]]
+    expected = brute_force(vectors[owned], [resume_ids[i] for i in owned], query, 5)
+
+    # Small pools are scanned exactly; large ones probe the coarse lists
+    for exact_rows in (len(owned), 0):
+        monkeypatch.setattr(vector_index, "VECTOR_INDEX_EXACT_ROWS", exact_rows)
+        results = [r for r, _ in index.search(query, 5, user_id="user1", nprobe=20)]
+        assert results == expected
+    assert index.search(query, 5, user_id="nobody") == []
+
+def test_exclude_ids_are_skipped(index_path):
+    rng = np.random.default_rng(2)
+    vectors = clustered_rows(rng, 200)
+    index = VectorIndex(index_path)
+    resume_ids = add(index, vectors, ["u"] * 200)
+    results = index.search(vectors[0], 5, exclude_ids=[resume_ids[0]])
+    assert resume_ids[0] not in [r for r, _ in results] and len(results) == 5
+
+def test_reader_picks_up_rows_appended_by_another_writer(index_path):
+    rng = np.random.default_rng(3)
+    writer = VectorIndex(index_path)
+    add(writer, clustered_rows(rng, 2000), ["u"] * 2000)
+    writer.train(nlist=20, sample_size=2000, seed=0)
+
+    reader = VectorIndex(index_path)
+    assert reader.get_stats()["rows"] == 2000
+    generation = reader._current().generation
+    appended = clustered_rows(rng, 5)
+    appended_ids = add(writer, appended, ["late"] * 5)
+
+    assert reader.get_stats()["rows"] == 2005
+    assert reader._current().generation == generation  # appended rows are probed as tail, no retrain
+    for resume_id, vector in zip(appended_ids, appended):
+        assert reader.search(vector, 1)[0][0] == resume_id
+        assert reader.search(vector, 1, user_id="late")[0][0] == resume_id
+
+def test_model_mismatch_is_refused(index_path):
+    rng = np.random.default_rng(4)
+    add(VectorIndex(index_path, model_key="model-a"), clustered_rows(rng, 10), ["u"] * 10)
+    with pytest.raises(RuntimeError):
+        VectorIndex(index_path, model_key="model-b").search(rng.standard_normal(DIM), 1)